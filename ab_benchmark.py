@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Interleaved A/B benchmark of two running replicas (e.g. vLLM on 8000, SGLang on 8001)
+Both endpoints get the same workload in alternating or randomized rounds, so drift in
+thermal state or background load hits both sides equally. Reports per-metric
+differences with bootstrap confidence intervals over the paired rounds.
+"""
+
+import asyncio
+import argparse
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bench_client import check_health
+from bench_stats import paired_difference
+from comprehensive_benchmark import save_results, test_multiple_users
+from goodput import parse_request_slo
+from load_generator import test_closed_loop
+
+AB_METRICS = ['throughput_tok_s', 'steady_throughput_tok_s', 'goodput_tok_s', 'slo_attainment',
+              'latency_p50_ms', 'latency_p99_ms', 'ttft_p50_ms', 'ttft_p99_ms', 'itl_p50_ms', 'itl_p99_ms',
+              'vram_peak_gb']
+
+# Metrics where a larger value is better; everything else is a latency/cost
+HIGHER_IS_BETTER = {'throughput_tok_s', 'steady_throughput_tok_s', 'goodput_tok_s', 'goodput_rps',
+                    'slo_attainment', 'requests_per_second'}
+
+AB_ROUND_FIELDS = ['round', 'position', 'server', 'port', 'num_users', 'successful_requests',
+                   'failed_requests', 'total_time'] + AB_METRICS
+
+def round_orders(rounds: int, order: str = 'alternate', seed: int = 0) -> List[List[int]]:
+    """
+    Endpoint order per round as indexes into (A, B)
+
+    alternate: AB, BA, AB, ... (cancels linear drift over pairs of rounds)
+    random:    seeded coin flip per round
+    """
+    rng = random.Random(seed)
+    orders = []
+    for i in range(rounds):
+        if order == 'random':
+            orders.append([0, 1] if rng.random() < 0.5 else [1, 0])
+        else:
+            orders.append([0, 1] if i % 2 == 0 else [1, 0])
+    return orders
+
+def run_ab(endpoints: List[Dict], rounds: int = 6, num_users: int = 20, duration: float = 30,
+           max_tokens: int = 200, stream: bool = True, order: str = 'alternate', seed: int = 0,
+           burst: bool = False, cooldown: float = 5, metrics: List[str] = None,
+           slo: Optional[Dict[str, float]] = None) -> Dict:
+    """Run `rounds` interleaved rounds against two endpoints and compare them metric by metric"""
+    metrics = metrics or AB_METRICS
+    a, b = endpoints
+    print(f"\n{'#'*60}")
+    print(f"# A/B BENCHMARK: {a['name']} (:{a['port']}) vs {b['name']} (:{b['port']})")
+    print(f"# {rounds} rounds, {num_users} users, order={order}, seed={seed}")
+    print(f"{'#'*60}")
+
+    per_round: List[Dict] = []
+    for round_index, positions in enumerate(round_orders(rounds, order, seed)):
+        for position, endpoint_index in enumerate(positions):
+            endpoint = endpoints[endpoint_index]
+            print(f"\n🔁 Round {round_index + 1}/{rounds}: {endpoint['name']}")
+            # Same workload on both sides: prompts are chosen deterministically per user/turn
+            if burst:
+                result = asyncio.run(test_multiple_users(endpoint['port'], endpoint['name'], num_users,
+                                                         max_tokens=max_tokens, stream=stream, slo=slo))
+            else:
+                result = asyncio.run(test_closed_loop(endpoint['port'], endpoint['name'], num_users,
+                                                      duration, max_tokens, stream, slo=slo))
+            result = result or {'server': endpoint['name'], 'successful_requests': 0}
+            result.update({'round': round_index, 'position': position, 'port': endpoint['port'],
+                           'endpoint': endpoint_index})
+            per_round.append(result)
+            time.sleep(cooldown)
+
+    comparison = {}
+    for metric in metrics:
+        values = [[], []]
+        for round_index in range(rounds):
+            pair = [next((r for r in per_round if r['round'] == round_index and r['endpoint'] == e), {})
+                    for e in (0, 1)]
+            if all(metric in r for r in pair):
+                values[0].append(pair[0][metric])
+                values[1].append(pair[1][metric])
+        if values[0]:
+            comparison[metric] = paired_difference(values[0], values[1], seed=seed)
+            comparison[metric]['rounds'] = len(values[0])
+
+    print_ab_comparison(a['name'], b['name'], comparison)
+    return {'rounds': per_round, 'comparison': comparison}
+
+def print_ab_comparison(name_a: str, name_b: str, comparison: Dict[str, Dict]):
+    """Print mean A, mean B, B-A with 95% CI and a verdict per metric"""
+    print(f"\n{'='*80}")
+    print(f"📊 A/B COMPARISON: {name_a} (A) vs {name_b} (B)")
+    print(f"{'='*80}")
+    print(f"\n| Metric | {name_a} | {name_b} | B - A | 95% CI | Change | Verdict |")
+    print("|--------|------|------|-------|--------|--------|---------|")
+    for metric, c in comparison.items():
+        if not c['significant']:
+            verdict = "no difference"
+        else:
+            b_better = (c['diff'] > 0) == (metric in HIGHER_IS_BETTER)
+            verdict = f"{name_b if b_better else name_a} better"
+        print(f"| {metric:<18} | {c['mean_a']:>10.2f} | {c['mean_b']:>10.2f} | {c['diff']:>+10.2f} | "
+              f"[{c['ci_low']:+.2f}, {c['ci_high']:+.2f}] | {c['rel_diff']:>+7.1%} | {verdict} |")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interleaved A/B benchmark of two endpoints")
+    parser.add_argument('--a', default='vLLM:8000', help="name:port of endpoint A")
+    parser.add_argument('--b', default='SGLang:8001', help="name:port of endpoint B")
+    parser.add_argument('--rounds', type=int, default=6)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30, help="seconds per closed-loop round")
+    parser.add_argument('--max-tokens', type=int, default=200)
+    parser.add_argument('--order', choices=['alternate', 'random'], default='alternate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--burst', action='store_true', help="use the single-burst concurrent test per round")
+    parser.add_argument('--no-stream', action='store_true')
+    parser.add_argument('--request-slo', nargs='+', metavar='METRIC=MS',
+                        help="per-request SLO for goodput, e.g. ttft_ms=500 tpot_ms=40 latency_ms=20000")
+    args = parser.parse_args()
+
+    endpoints = []
+    for spec in (args.a, args.b):
+        name, _, port = spec.rpartition(':')
+        endpoints.append({'name': name or spec, 'port': int(port)})
+
+    for endpoint in endpoints:
+        if not check_health(f"http://localhost:{endpoint['port']}/health"):
+            print(f"❌ {endpoint['name']} is not healthy on port {endpoint['port']}")
+            raise SystemExit(1)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ab = run_ab(endpoints, args.rounds, args.users, args.duration, args.max_tokens,
+                not args.no_stream, args.order, args.seed, args.burst,
+                slo=parse_request_slo(args.request_slo))
+    save_results(ab['rounds'], f"ab_benchmark_{timestamp}", AB_ROUND_FIELDS, config=vars(args))
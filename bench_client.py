@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Shared async HTTP client for the benchmark scripts
+One pooled keep-alive aiohttp session, payloads serialized before the clock starts,
+an incremental SSE parser, and accounting of the client's own CPU cost
+"""
+
+import asyncio
+import aiohttp
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def encode_payload(payload: Dict) -> bytes:
+    """Serialize a request body once, outside the timed section"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def decode_json(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def chunk_text(chunk: Dict) -> str:
+    """Extract generated text from a completions or chat completions stream chunk"""
+    text = ''
+    for choice in chunk.get('choices') or []:
+        text += choice.get('text') or ''
+        delta = choice.get('delta') or {}
+        text += delta.get('content') or ''
+    return text
+
+class ReasoningSplitter:
+    """
+    Split chat output into reasoning and answer text
+
+    Servers running a reasoning parser (vLLM/SGLang --reasoning-parser qwen3) send thinking
+    as reasoning_content; without one, Qwen3 thinking arrives inside content wrapped in
+    <think>...</think>. Both are handled; state carries across stream chunks and is kept
+    per choice index, since parallel samples (n > 1) interleave on one stream.
+    """
+
+    def __init__(self):
+        self.in_think: Dict[int, bool] = {}
+
+    def split(self, chunk: Dict) -> Tuple[str, str]:
+        reasoning, answer = '', ''
+        for choice in chunk.get('choices') or []:
+            message = choice.get('delta') or choice.get('message') or {}
+            reasoning += message.get('reasoning_content') or message.get('reasoning') or ''
+            content = message.get('content') or choice.get('text') or ''
+            sample = choice.get('index', 0)
+            in_think = self.in_think.get(sample, False)
+            while content:
+                tag = '</think>' if in_think else '<think>'
+                index = content.find(tag)
+                part = content if index < 0 else content[:index]
+                if in_think:
+                    reasoning += part
+                else:
+                    answer += part
+                if index < 0:
+                    break
+                content = content[index + len(tag):]
+                in_think = not in_think
+            self.in_think[sample] = in_think
+        return reasoning, answer
+
+def reasoning_metrics(start_time: float, first_answer_time: Optional[float], reasoning_units: float,
+                      answer_units: float, completion_tokens: int, usage: Dict) -> Dict:
+    """
+    Reasoning vs answer token split and time to first answer token (TTFAT)
+
+    Uses usage.completion_tokens_details.reasoning_tokens when the server reports it;
+    otherwise completion tokens are split in proportion to reasoning/answer chunks (or
+    characters for non-streaming responses).
+    """
+    reasoning_tokens = (usage.get('completion_tokens_details') or {}).get('reasoning_tokens')
+    if reasoning_tokens is None:
+        units = reasoning_units + answer_units
+        reasoning_tokens = round(completion_tokens * reasoning_units / units) if units else 0
+    metrics = {
+        'reasoning_tokens': reasoning_tokens,
+        'answer_tokens': max(0, completion_tokens - reasoning_tokens)
+    }
+    if first_answer_time is not None:
+        metrics['ttfat_ms'] = (first_answer_time - start_time) * 1000
+    return metrics
+
+def stream_metrics(start_time: float, token_times: List[float], completion_tokens: int) -> Dict:
+    """Derive TTFT, inter-token latency (TPOT) and decode speed from chunk arrival times"""
+    if not token_times:
+        return {'ttft_ms': 0, 'tpot_ms': 0, 'itl_ms': [], 'decode_tok_s': 0}
+
+    first_token_time = token_times[0]
+    itl_ms = [(b - a) * 1000 for a, b in zip(token_times, token_times[1:])]
+    decode_time = token_times[-1] - first_token_time
+    decode_tokens = max(completion_tokens, len(token_times)) - 1
+
+    return {
+        'ttft_ms': (first_token_time - start_time) * 1000,
+        'tpot_ms': decode_time * 1000 / decode_tokens if decode_tokens > 0 else 0,
+        'itl_ms': itl_ms,
+        'decode_tok_s': decode_tokens / decode_time if decode_time > 0 else 0
+    }
+
+def sample_stream_metrics(start_time: float, sample_times: Dict[int, List[float]],
+                          completion_tokens: int) -> Dict:
+    """
+    stream_metrics for parallel sampling (n > 1), computed per sample and then averaged
+
+    The samples' chunks interleave on one stream, so gaps between consecutive chunks are not
+    token latencies. Completion tokens are split across samples in proportion to their chunks.
+    """
+    chunks = sum(len(times) for times in sample_times.values())
+    if not chunks:
+        return stream_metrics(start_time, [], completion_tokens)
+    per_sample = [stream_metrics(start_time, times, round(completion_tokens * len(times) / chunks))
+                  for _, times in sorted(sample_times.items()) if times]
+    return {
+        'ttft_ms': sum(m['ttft_ms'] for m in per_sample) / len(per_sample),
+        'tpot_ms': sum(m['tpot_ms'] for m in per_sample) / len(per_sample),
+        'itl_ms': [itl for m in per_sample for itl in m['itl_ms']],
+        'decode_tok_s': sum(m['decode_tok_s'] for m in per_sample) / len(per_sample),
+        'sample_ttft_ms': [m['ttft_ms'] for m in per_sample],
+        'sample_tpot_ms': [m['tpot_ms'] for m in per_sample]
+    }
+
+class SSEParser:
+    """
+    Incremental Server-Sent Events parser
+
+    feed() takes raw bytes as they arrive (chunk boundaries can fall anywhere, even
+    inside a line) and returns the `data:` payloads of every event completed so far.
+    """
+
+    def __init__(self):
+        self.buffer = b''
+        self.data_lines: List[bytes] = []
+
+    def feed(self, data: bytes) -> List[bytes]:
+        self.buffer += data
+        events = []
+        start = 0
+        while True:
+            end = self.buffer.find(b'\n', start)
+            if end < 0:
+                break
+            line = self.buffer[start:end]
+            start = end + 1
+            if line.endswith(b'\r'):
+                line = line[:-1]
+            if not line:
+                if self.data_lines:
+                    events.append(b'\n'.join(self.data_lines))
+                    self.data_lines = []
+            elif line.startswith(b'data:'):
+                value = line[5:]
+                self.data_lines.append(value[1:] if value.startswith(b' ') else value)
+            # Comments (':'), event/id/retry fields are ignored
+        self.buffer = self.buffer[start:]
+        return events
+
+    def flush(self) -> List[bytes]:
+        """Return a trailing event that was not terminated by a blank line"""
+        events = self.feed(b'\n') if self.buffer else []
+        if self.data_lines:
+            events.append(b'\n'.join(self.data_lines))
+            self.data_lines = []
+        return events
+
+class BenchClient:
+    """
+    Pooled keep-alive client shared by all benchmark scripts
+
+        async with BenchClient(pool_size=0) as client:
+            result = await client.request(url, payload, request_id=0)
+        print(client.stats())
+
+    pool_size=0 removes aiohttp's default 100-connection cap so large concurrency
+    runs are not silently throttled by the client. Pass a timeline.TimelineRecorder as
+    `timeline` to record per-request lifecycle events.
+    """
+
+    def __init__(self, pool_size: int = 0, timeout: float = 300, keepalive_timeout: float = 75,
+                 keep_text: bool = False, timeline=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.keep_text = keep_text
+        self.timeline = timeline
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.requests_made = 0
+        self.tokens_received = 0
+        self.parse_cpu_time = 0.0
+        self._cpu_start = 0.0
+        self._wall_start = 0.0
+
+    async def __aenter__(self) -> 'BenchClient':
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=0,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'Content-Type': 'application/json'},
+            trace_configs=[self._trace_config()] if self.timeline is not None else None
+        )
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    @staticmethod
+    def _trace_config() -> aiohttp.TraceConfig:
+        """Stamp pool wait, connect and response-header times into the request's timeline dict"""
+        def mark(name):
+            async def handler(session, context, params):
+                if context.trace_request_ctx is not None:
+                    context.trace_request_ctx[name] = time.perf_counter()
+            return handler
+
+        config = aiohttp.TraceConfig()
+        config.on_connection_queued_start.append(mark('pool_wait_start'))
+        config.on_connection_queued_end.append(mark('pool_wait_end'))
+        config.on_connection_create_start.append(mark('connect_start'))
+        config.on_connection_create_end.append(mark('connect_end'))
+        config.on_request_end.append(mark('first_byte'))
+        return config
+
+    async def prewarm(self, url: str, connections: int):
+        """Open `connections` keep-alive connections up front so TCP setup is not timed"""
+        async def touch():
+            try:
+                async with self.session.get(url) as response:
+                    await response.read()
+            except aiohttp.ClientError:
+                pass
+        await asyncio.gather(*(touch() for _ in range(connections)))
+
+    async def get(self, url: str) -> int:
+        """GET a URL and return the status code (used for health checks)"""
+        async with self.session.get(url) as response:
+            await response.read()
+            return response.status
+
+    async def get_text(self, url: str) -> str:
+        """GET a URL and return the body as text (e.g. Prometheus /metrics)"""
+        async with self.session.get(url) as response:
+            response.raise_for_status()
+            return await response.text()
+
+    async def post_json(self, url: str, payload: Dict) -> Dict:
+        """POST a JSON payload and return the decoded JSON response (e.g. /tokenize)"""
+        async with self.session.post(url, data=encode_payload(payload)) as response:
+            response.raise_for_status()
+            return decode_json(await response.read())
+
+    async def request(self, url: str, payload: Dict, request_id=0, body: Optional[bytes] = None,
+                      enqueued_at: Optional[float] = None) -> Dict:
+        """
+        POST a completion request and return a per-request record
+
+        Streaming is decided by payload['stream']; pass `body` to reuse bytes that
+        were already serialized with encode_payload(). `enqueued_at` (perf_counter) is
+        when the request was due; when given, the record carries queue_delay_ms (how late
+        it was sent) so latency can be measured from the intended send time. Streaming
+        requests for several samples (payload['n'] > 1) time tokens per choice index: TTFT,
+        TPOT, ITL and decode tok/s are per-sample values (averaged), sample_ttft_ms /
+        sample_tpot_ms list them, and sample_latency_ms is when each sample's last chunk arrived.
+        """
+        scheduled = enqueued_at is not None
+        if enqueued_at is None:
+            enqueued_at = time.perf_counter()
+        if body is None:
+            body = encode_payload(payload)
+        stream = bool(payload.get('stream'))
+        chat = 'messages' in payload
+        cpu_time = 0.0
+        trace = {'request_id': request_id, 'enqueue': enqueued_at} \
+            if self.timeline is not None and self.timeline.sample() else None
+        token_times = []
+
+        sent_at = time.time()
+        queue_delay_ms = (time.perf_counter() - enqueued_at) * 1000
+        try:
+            start_time = time.perf_counter()
+            if trace is not None:
+                trace['send'] = start_time
+            async with self.session.post(url, data=body, trace_request_ctx=trace) as response:
+                if response.status >= 400:
+                    error = (await response.read())[:200].decode('utf-8', errors='replace')
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, (), status=response.status, message=error)
+
+                if not stream:
+                    raw = await response.read()
+                    end_time = time.perf_counter()
+                    cpu_mark = time.thread_time()
+                    result = decode_json(raw)
+                    usage = result.get('usage') or {}
+                    if chat:
+                        reasoning, text = ReasoningSplitter().split(result)
+                    else:
+                        text = ''.join(c.get('text') or (c.get('message') or {}).get('content') or ''
+                                       for c in result.get('choices') or []) if self.keep_text else None
+                    cpu_time += time.thread_time() - cpu_mark
+                    record = {
+                        'request_id': request_id,
+                        'success': True,
+                        'time': end_time - start_time,
+                        'tokens': usage.get('completion_tokens', 0),
+                        'prompt_tokens': usage.get('prompt_tokens', 0)
+                    }
+                    if chat:
+                        record.update(reasoning_metrics(start_time, None, len(reasoning), len(text),
+                                                        record['tokens'], usage))
+                else:
+                    parser = SSEParser()
+                    usage = {}
+                    pieces = []
+                    splitter = ReasoningSplitter() if chat else None
+                    reasoning_pieces = []
+                    reasoning_chunks = answer_chunks = 0
+                    first_answer_time = None
+                    # Parallel sampling interleaves the samples' chunks; time each sample on its own
+                    sample_done = {} if (payload.get('n') or 1) > 1 else None
+                    sample_times: Dict[int, List[float]] = {}
+                    async for data in response.content.iter_any():
+                        arrival = time.perf_counter()
+                        cpu_mark = time.thread_time()
+                        for event in parser.feed(data):
+                            if event == b'[DONE]':
+                                continue
+                            chunk = decode_json(event)
+                            if splitter is not None:
+                                # Thinking tokens count for TTFT; only answer tokens are user-visible
+                                reasoning, piece = splitter.split(chunk)
+                                if reasoning:
+                                    reasoning_chunks += 1
+                                    if self.keep_text:
+                                        reasoning_pieces.append(reasoning)
+                                if piece:
+                                    answer_chunks += 1
+                                    if first_answer_time is None and piece.strip():
+                                        first_answer_time = arrival
+                                if reasoning or piece:
+                                    token_times.append(arrival)
+                            else:
+                                piece = chunk_text(chunk)
+                                if piece:
+                                    token_times.append(arrival)
+                            if piece and self.keep_text:
+                                pieces.append(piece)
+                            if chunk.get('usage'):
+                                usage = chunk['usage']
+                            if sample_done is not None:
+                                for choice in chunk.get('choices') or []:
+                                    index = choice.get('index', 0)
+                                    sample_done[index] = arrival
+                                    delta = choice.get('delta') or {}
+                                    if chunk_text({'choices': [choice]}) or delta.get('reasoning_content') \
+                                            or delta.get('reasoning'):
+                                        sample_times.setdefault(index, []).append(arrival)
+                        cpu_time += time.thread_time() - cpu_mark
+                    end_time = time.perf_counter()
+
+                    tokens = usage.get('completion_tokens', 0) or len(token_times)
+                    text = ''.join(pieces) if self.keep_text else None
+                    reasoning = ''.join(reasoning_pieces)
+                    record = {
+                        'request_id': request_id,
+                        'success': True,
+                        'time': end_time - start_time,
+                        'tokens': tokens,
+                        'prompt_tokens': usage.get('prompt_tokens', 0),
+                        **(sample_stream_metrics(start_time, sample_times, tokens) if sample_done
+                           else stream_metrics(start_time, token_times, tokens))
+                    }
+                    if chat:
+                        record.update(reasoning_metrics(start_time, first_answer_time, reasoning_chunks,
+                                                        answer_chunks, tokens, usage))
+                    if sample_done:
+                        record['sample_latency_ms'] = sorted((t - start_time) * 1000 for t in sample_done.values())
+
+            if self.keep_text:
+                record['text'] = text
+                if chat:
+                    record['reasoning_text'] = reasoning
+            record['sent_at'] = sent_at
+            if scheduled:
+                record['queue_delay_ms'] = queue_delay_ms
+            record['client_cpu_ms'] = cpu_time * 1000
+            self.requests_made += 1
+            self.tokens_received += record['tokens']
+            self.parse_cpu_time += cpu_time
+            if trace is not None:
+                trace.update({'end': end_time, 'chunks': token_times, 'tokens': record['tokens'],
+                              'prompt_tokens': record['prompt_tokens']})
+                self.timeline.add(trace)
+            return record
+
+        except Exception as e:
+            self.requests_made += 1
+            record = {
+                'request_id': request_id,
+                'success': False,
+                'error': str(e) or type(e).__name__,
+                'error_type': type(e).__name__,
+                'sent_at': sent_at
+            }
+            if scheduled:
+                record['queue_delay_ms'] = queue_delay_ms
+            if trace is not None:
+                trace.update({'end': time.perf_counter(), 'chunks': token_times,
+                              'error': record['error'], 'error_type': record['error_type']})
+                self.timeline.add(trace)
+            return record
+
+    def stats(self) -> Dict:
+        """Client-side CPU cost of the harness itself since the session opened"""
+        cpu_time = time.process_time() - self._cpu_start
+        wall_time = time.perf_counter() - self._wall_start
+        requests_made = max(self.requests_made, 1)
+        return {
+            'client_requests': self.requests_made,
+            'client_cpu_s': cpu_time,
+            'client_cpu_utilization': cpu_time / wall_time if wall_time > 0 else 0,
+            'client_cpu_ms_per_request': cpu_time * 1000 / requests_made,
+            'client_cpu_us_per_token': cpu_time * 1e6 / self.tokens_received if self.tokens_received else 0,
+            'client_parse_us_per_token': (self.parse_cpu_time * 1e6 / self.tokens_received
+                                          if self.tokens_received else 0)
+        }
+
+def print_client_stats(stats: Dict):
+    """Print harness overhead and warn when the client itself may be the bottleneck"""
+    print(f"   Client CPU: {stats['client_cpu_ms_per_request']:.2f} ms/request, "
+          f"{stats['client_cpu_us_per_token']:.1f} µs/token "
+          f"({stats['client_cpu_utilization'] * 100:.0f}% of one core)")
+    if stats['client_cpu_utilization'] > 0.8:
+        print("   ⚠️ Client CPU is near saturation - measured latencies may include harness overhead")
+
+async def _request_once(url: str, payload: Dict, timeout: float, keep_text: bool) -> Dict:
+    async with BenchClient(pool_size=1, timeout=timeout, keep_text=keep_text) as client:
+        return await client.request(url, payload)
+
+def run_request(url: str, payload: Dict, timeout: float = 300, keep_text: bool = False) -> Dict:
+    """Blocking one-shot request for the sequential test scripts"""
+    return asyncio.run(_request_once(url, payload, timeout, keep_text))
+
+async def _get_status(url: str, timeout: float) -> int:
+    async with BenchClient(pool_size=1, timeout=timeout) as client:
+        return await client.get(url)
+
+async def _get_text(url: str, timeout: float) -> str:
+    async with BenchClient(pool_size=1, timeout=timeout) as client:
+        return await client.get_text(url)
+
+async def _post_json(url: str, payload: Dict, timeout: float) -> Dict:
+    async with BenchClient(pool_size=1, timeout=timeout) as client:
+        return await client.post_json(url, payload)
+
+def fetch_json(url: str, payload: Dict, timeout: float = 30) -> Dict:
+    """Blocking POST returning the decoded JSON response"""
+    return asyncio.run(_post_json(url, payload, timeout))
+
+def fetch_text(url: str, timeout: float = 5) -> str:
+    """Blocking GET returning the response body as text"""
+    return asyncio.run(_get_text(url, timeout))
+
+def check_health(url: str, timeout: float = 5) -> bool:
+    """Return True when `url` (e.g. http://localhost:8000/health) answers 200"""
+    try:
+        return asyncio.run(_get_status(url, timeout)) == 200
+    except Exception:
+        return False
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Statistics helpers for comparing benchmark runs
+Pure-stdlib bootstrap confidence intervals, so they work anywhere the harness runs
+"""
+
+import math
+import random
+from typing import Dict, Sequence, Tuple
+
+def mean(values: Sequence[float]) -> float:
+    return sum(values) / len(values) if values else 0
+
+def stdev(values: Sequence[float]) -> float:
+    if len(values) < 2:
+        return 0
+    m = mean(values)
+    return math.sqrt(sum((v - m) ** 2 for v in values) / (len(values) - 1))
+
+def bootstrap_ci(values: Sequence[float], confidence: float = 0.95, resamples: int = 5000,
+                 seed: int = 0, statistic=mean) -> Tuple[float, float]:
+    """Percentile bootstrap interval for `statistic` of a sample"""
+    if not values:
+        return 0, 0
+    if len(values) == 1:
+        return values[0], values[0]
+    rng = random.Random(seed)
+    n = len(values)
+    stats = sorted(statistic([values[rng.randrange(n)] for _ in range(n)]) for _ in range(resamples))
+    alpha = (1 - confidence) / 2
+    low = stats[int(alpha * (resamples - 1))]
+    high = stats[int(math.ceil((1 - alpha) * (resamples - 1)))]
+    return low, high
+
+def paired_difference(a: Sequence[float], b: Sequence[float], confidence: float = 0.95,
+                      resamples: int = 5000, seed: int = 0) -> Dict:
+    """
+    Compare B against A over paired rounds
+
+    Returns the mean difference (B - A), its bootstrap CI, the relative change and whether
+    the interval excludes zero.
+    """
+    diffs = [y - x for x, y in zip(a, b)]
+    low, high = bootstrap_ci(diffs, confidence, resamples, seed)
+    base = mean(a)
+    return {
+        'mean_a': base,
+        'mean_b': mean(b),
+        'diff': mean(diffs),
+        'ci_low': low,
+        'ci_high': high,
+        'rel_diff': mean(diffs) / base if base else 0,
+        'significant': len(diffs) > 1 and (low > 0 or high < 0)
+    }
+
+def quantile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100)"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def median(values: Sequence[float]) -> float:
+    return quantile(values, 50)
+
+def bootstrap_diff_ci(a: Sequence[float], b: Sequence[float], statistic=mean, confidence: float = 0.95,
+                      resamples: int = 1000, seed: int = 0) -> Tuple[float, float]:
+    """Percentile bootstrap interval for statistic(B) - statistic(A) over independent samples"""
+    if not a or not b:
+        return 0, 0
+    rng = random.Random(seed)
+    na, nb = len(a), len(b)
+    diffs = sorted(statistic([b[rng.randrange(nb)] for _ in range(nb)]) -
+                   statistic([a[rng.randrange(na)] for _ in range(na)]) for _ in range(resamples))
+    alpha = (1 - confidence) / 2
+    return diffs[int(alpha * (resamples - 1))], diffs[int(math.ceil((1 - alpha) * (resamples - 1)))]
+
+def mann_whitney_u(a: Sequence[float], b: Sequence[float]) -> Dict:
+    """
+    Two-sided Mann-Whitney U test (normal approximation with tie correction)
+
+    Returns U for B, the p-value and P(B > A) (+ half the ties), i.e. the probability that
+    a random candidate value exceeds a random baseline value.
+    """
+    na, nb = len(a), len(b)
+    if not na or not nb:
+        return {'u': 0, 'p_value': 1.0, 'prob_b_greater': 0.5}
+
+    combined = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    rank_sum_b = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        average_rank = (i + j) / 2 + 1
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        rank_sum_b += average_rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 1)
+        i = j + 1
+
+    u = rank_sum_b - nb * (nb + 1) / 2
+    n = na + nb
+    mean_u = na * nb / 2
+    var_u = na * nb / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if var_u <= 0:
+        p_value = 1.0
+    else:
+        z = (abs(u - mean_u) - 0.5) / math.sqrt(var_u)
+        p_value = min(1.0, math.erfc(max(z, 0) / math.sqrt(2)))
+    return {'u': u, 'p_value': p_value, 'prob_b_greater': u / (na * nb)}
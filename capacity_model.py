@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Capacity model: Universal Scalability Law fit of throughput vs concurrency
+Fits X(N) = lambda*N / (1 + sigma*(N-1) + kappa*N*(N-1)) to the concurrency points of a
+run (results store) or results CSV, per server, and reports the optimal concurrency and
+saturation throughput with residual-bootstrap confidence bounds. With a request-rate
+target and a latency SLO it sizes replicas: Little's law (R = N/X - Z) gives the highest
+concurrency per replica whose mean latency stays within the SLO.
+
+    python3 capacity_model.py --csv load_test_results_*.csv --target-rps 50 --latency-slo-ms 2000
+"""
+
+import argparse
+import glob
+import json
+import math
+import random
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from bench_stats import mean, quantile
+from comprehensive_benchmark import save_results
+from regression_gate import resolve_run
+from results_store import DEFAULT_DB, ResultsStore
+
+# Fitted metric -> unit label
+FIT_METRICS = {
+    'requests_per_second': 'req/s',
+    'throughput_tok_s': 'tok/s'
+}
+
+LAMBDA_GRID = 100         # coarse grid points over lambda before golden-section refinement
+DEFAULT_RESAMPLES = 300
+MAX_PLAN_USERS = 100000   # concurrency search cap when the fit never turns retrograde
+MAX_EXTRAPOLATION = 2     # replica sizing trusts the fit up to this multiple of the highest measured concurrency
+
+CAPACITY_MODEL_FIELDS = ['server', 'test_type', 'source', 'metric', 'points', 'max_users_observed',
+                         'lambda', 'sigma', 'kappa', 'r_squared', 'optimal_users', 'optimal_users_lo',
+                         'optimal_users_hi', 'peak_throughput', 'peak_throughput_lo', 'peak_throughput_hi',
+                         'latency_slo_ms', 'slo_users', 'slo_users_cap', 'per_replica_rps', 'per_replica_rps_lo',
+                         'per_replica_rps_hi', 'target_rps', 'replicas', 'replicas_conservative']
+
+def usl(n: float, lam: float, sigma: float, kappa: float) -> float:
+    return lam * n / (1 + sigma * (n - 1) + kappa * n * (n - 1))
+
+def _contention_fit(points: List[Tuple[float, float]], lam: float) -> Tuple[float, float]:
+    """
+    Non-negative least squares for sigma, kappa at a fixed lambda
+
+    lambda*N/X - 1 = sigma*(N-1) + kappa*N*(N-1) is linear in sigma and kappa.
+    """
+    rows = [(n - 1, n * (n - 1), lam * n / x - 1) for n, x in points if x > 0]
+    saa = sum(a * a for a, _, _ in rows)
+    sbb = sum(b * b for _, b, _ in rows)
+    sab = sum(a * b for a, b, _ in rows)
+    say = sum(a * y for a, _, y in rows)
+    sby = sum(b * y for _, b, y in rows)
+    det = saa * sbb - sab * sab
+    if det > 0:
+        sigma = (say * sbb - sby * sab) / det
+        kappa = (sby * saa - say * sab) / det
+        if sigma >= 0 and kappa >= 0:
+            return sigma, kappa
+    # Constrained solutions: one coefficient pinned at zero, keep the better of the two
+    candidates = [(max(0.0, say / saa) if saa else 0.0, 0.0), (0.0, max(0.0, sby / sbb) if sbb else 0.0)]
+    return min(candidates, key=lambda c: _sse(points, lam, *c))
+
+def _sse(points: List[Tuple[float, float]], lam: float, sigma: float, kappa: float) -> float:
+    return sum((x - usl(n, lam, sigma, kappa)) ** 2 for n, x in points)
+
+def fit_usl(points: List[Tuple[float, float]]) -> Optional[Dict]:
+    """
+    Least-squares USL fit to (concurrency, throughput) points
+
+    lambda is searched on a grid then refined by golden section; for each lambda, sigma and
+    kappa come from the linearized form. Needs at least three distinct concurrency levels.
+    """
+    points = [(float(n), float(x)) for n, x in points if n and n > 0 and x and x > 0]
+    if len({n for n, _ in points}) < 3:
+        return None
+
+    slope = max(x / n for n, x in points)
+
+    def objective(lam: float) -> float:
+        return _sse(points, lam, *_contention_fit(points, lam))
+
+    low, high = 0.5 * slope, 2.0 * slope
+    grid = [low + (high - low) * i / LAMBDA_GRID for i in range(LAMBDA_GRID + 1)]
+    best = min(range(len(grid)), key=lambda i: objective(grid[i]))
+    a, b = grid[max(0, best - 1)], grid[min(len(grid) - 1, best + 1)]
+    ratio = (math.sqrt(5) - 1) / 2
+    for _ in range(60):
+        c, d = b - ratio * (b - a), a + ratio * (b - a)
+        if objective(c) < objective(d):
+            b = d
+        else:
+            a = c
+    lam = (a + b) / 2
+    sigma, kappa = _contention_fit(points, lam)
+
+    xs = [x for _, x in points]
+    total = sum((x - mean(xs)) ** 2 for x in xs)
+    residual = _sse(points, lam, sigma, kappa)
+    return {
+        'lambda': lam,
+        'sigma': sigma,
+        'kappa': kappa,
+        'r_squared': 1 - residual / total if total else 1.0,
+        'points': points,
+        **saturation(lam, sigma, kappa)
+    }
+
+def saturation(lam: float, sigma: float, kappa: float) -> Dict:
+    """Optimal concurrency N* = sqrt((1 - sigma)/kappa) and the peak throughput X(N*)"""
+    if sigma >= 1:
+        return {'optimal_users': 1.0, 'peak_throughput': lam}
+    if kappa > 0:
+        n = math.sqrt((1 - sigma) / kappa)
+        return {'optimal_users': n, 'peak_throughput': usl(n, lam, sigma, kappa)}
+    # No coherency penalty: throughput only approaches the lambda/sigma asymptote
+    return {'optimal_users': float('inf'), 'peak_throughput': lam / sigma if sigma > 0 else float('inf')}
+
+def slo_concurrency(fit: Dict, latency_slo_s: float, think_time_s: float = 0,
+                    max_users: Optional[float] = None) -> int:
+    """
+    Highest concurrency (at most N*, and at most `max_users`) whose Little's-law latency
+    N/X(N) - Z meets the SLO
+
+    `fit` must be a requests/second fit. Returns 0 when even one user misses the SLO.
+    """
+    limit = min(MAX_PLAN_USERS, int(fit['optimal_users']) if fit['optimal_users'] != float('inf')
+                else MAX_PLAN_USERS)
+    if max_users is not None:
+        limit = min(limit, int(max_users))
+
+    def latency(n: int) -> float:
+        return n / usl(n, fit['lambda'], fit['sigma'], fit['kappa']) - think_time_s
+
+    if latency(1) > latency_slo_s:
+        return 0
+    low, high = 1, max(1, limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if latency(middle) <= latency_slo_s:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def bootstrap_fits(fit: Dict, resamples: int = DEFAULT_RESAMPLES, seed: int = 0) -> List[Dict]:
+    """Refit on fitted values plus resampled residuals"""
+    rng = random.Random(seed)
+    points = fit['points']
+    fitted = [usl(n, fit['lambda'], fit['sigma'], fit['kappa']) for n, _ in points]
+    residuals = [x - f for (_, x), f in zip(points, fitted)]
+    fits = []
+    for _ in range(resamples):
+        sample = [(n, f + residuals[rng.randrange(len(residuals))]) for (n, _), f in zip(points, fitted)]
+        refit = fit_usl(sample)
+        if refit:
+            fits.append(refit)
+    return fits
+
+def interval(values: List[float], confidence: float) -> Tuple[float, float]:
+    alpha = (1 - confidence) / 2 * 100
+    return quantile(values, alpha), quantile(values, 100 - alpha)
+
+def load_points(store: ResultsStore, run_id: int, server: Optional[str] = None) -> Dict[str, List[Dict]]:
+    """{server: [concurrency point]} for one run; req/s is derived from successful requests / time if absent"""
+    groups: Dict[str, List[Dict]] = {}
+    for row in store.query("SELECT server, test_type, metrics FROM results WHERE run_id = ? AND num_users > 0",
+                           (run_id,)):
+        # The single-user test uses its own prompt and output length, so it is not a point on the curve
+        if (server and row['server'] != server) or row['test_type'] == 'single_user':
+            continue
+        metrics = json.loads(row['metrics'] or '{}')
+        users = metrics.get('num_users')
+        rps = metrics.get('requests_per_second')
+        if not rps and metrics.get('successful_requests') and metrics.get('total_time'):
+            rps = metrics['successful_requests'] / metrics['total_time']
+        groups.setdefault(row['server'] or 'unknown', []).append({
+            'num_users': users,
+            'throughput_tok_s': metrics.get('throughput_tok_s'),
+            'requests_per_second': rps,
+            'avg_response_time': metrics.get('avg_response_time')
+        })
+    return groups
+
+def model_group(points: List[Dict], metric: str, confidence: float = 0.95, resamples: int = DEFAULT_RESAMPLES,
+                latency_slo_s: Optional[float] = None, think_time_s: float = 0,
+                target_rps: Optional[float] = None) -> Optional[Dict]:
+    """Fit one metric for one server and, for req/s fits, size replicas for the target rate"""
+    fit = fit_usl([(p['num_users'], p[metric]) for p in points if p.get(metric)])
+    if not fit:
+        return None
+    fits = bootstrap_fits(fit, resamples)
+    optimal_lo, optimal_hi = interval([f['optimal_users'] for f in fits], confidence)
+    peak_lo, peak_hi = interval([f['peak_throughput'] for f in fits], confidence)
+    model = {
+        'metric': metric,
+        'points': len(fit['points']),
+        'max_users_observed': max(n for n, _ in fit['points']),
+        'lambda': fit['lambda'],
+        'sigma': fit['sigma'],
+        'kappa': fit['kappa'],
+        'r_squared': fit['r_squared'],
+        'optimal_users': fit['optimal_users'],
+        'optimal_users_lo': optimal_lo,
+        'optimal_users_hi': optimal_hi,
+        'peak_throughput': fit['peak_throughput'],
+        'peak_throughput_lo': peak_lo,
+        'peak_throughput_hi': peak_hi,
+        'fit': fit
+    }
+    if metric != 'requests_per_second' or not latency_slo_s:
+        return model
+
+    # Without a retrograde region the SLO alone can allow thousands of users; never size
+    # replicas on a concurrency the data does not come close to
+    cap = MAX_EXTRAPOLATION * model['max_users_observed']
+
+    def capacity(f: Dict) -> float:
+        n = slo_concurrency(f, latency_slo_s, think_time_s, cap)
+        return usl(n, f['lambda'], f['sigma'], f['kappa']) if n else 0
+
+    rps_lo, rps_hi = interval([capacity(f) for f in fits], confidence)
+    model.update({
+        'latency_slo_ms': latency_slo_s * 1000,
+        'slo_users': slo_concurrency(fit, latency_slo_s, think_time_s, cap),
+        'slo_users_cap': cap,
+        'per_replica_rps': capacity(fit),
+        'per_replica_rps_lo': rps_lo,
+        'per_replica_rps_hi': rps_hi
+    })
+    if target_rps:
+        model.update({
+            'target_rps': target_rps,
+            'replicas': math.ceil(target_rps / model['per_replica_rps']) if model['per_replica_rps'] else '',
+            # Sized on the lower confidence bound of per-replica capacity
+            'replicas_conservative': math.ceil(target_rps / rps_lo) if rps_lo else ''
+        })
+    return model
+
+def print_model(server: str, source: str, model: Dict, points: List[Dict], confidence: float):
+    unit = FIT_METRICS[model['metric']]
+    fit = model['fit']
+    print(f"\n{'='*60}")
+    print(f"📈 {server} ({source}) - USL fit of {model['metric']}")
+    print(f"{'='*60}")
+    print(f"   lambda {fit['lambda']:.3f} {unit}/user, sigma {fit['sigma']:.4f} (contention), "
+          f"kappa {fit['kappa']:.6f} (coherency), R² {fit['r_squared']:.3f}")
+
+    print("\n| Users | Observed | Fitted | Error | Mean latency s | Little's law s |")
+    print("|-------|----------|--------|-------|----------------|----------------|")
+    for p in sorted((p for p in points if p.get(model['metric'])), key=lambda p: p['num_users']):
+        fitted = usl(p['num_users'], fit['lambda'], fit['sigma'], fit['kappa'])
+        observed = p[model['metric']]
+        latency = f"{p['avg_response_time']:.2f}" if p.get('avg_response_time') else '-'
+        little = (f"{p['num_users'] / p['requests_per_second']:.2f}"
+                  if p.get('requests_per_second') else '-')
+        print(f"| {p['num_users']:>5g} | {observed:>8.2f} | {fitted:>6.2f} | {(fitted / observed - 1) * 100:>+4.0f}% | "
+              f"{latency:>14} | {little:>14} |")
+
+    level = f"{confidence:.0%}"
+    if model['optimal_users'] == float('inf'):
+        print(f"\n   No retrograde region: throughput approaches {model['peak_throughput']:.2f} {unit} asymptotically")
+    elif model['optimal_users'] > MAX_PLAN_USERS:
+        print(f"\n   No retrograde region below {MAX_PLAN_USERS} users (coherency penalty too small to measure)")
+    else:
+        print(f"\n🎯 Optimal concurrency: {model['optimal_users']:.0f} users "
+              f"({level} CI {model['optimal_users_lo']:.0f}-{model['optimal_users_hi']:.0f})")
+        print(f"   Saturation throughput: {model['peak_throughput']:.2f} {unit} "
+              f"({level} CI {model['peak_throughput_lo']:.2f}-{model['peak_throughput_hi']:.2f})")
+        if model['optimal_users'] > 2 * model['max_users_observed']:
+            print(f"   ⚠️ Extrapolated far beyond the highest measured concurrency ({model['max_users_observed']:g})")
+
+    if 'per_replica_rps' in model:
+        print(f"\n   Latency SLO {model['latency_slo_ms']:g} ms: {model['slo_users']} users per replica, "
+              f"{model['per_replica_rps']:.2f} req/s ({level} CI {model['per_replica_rps_lo']:.2f}-"
+              f"{model['per_replica_rps_hi']:.2f})")
+        if model['slo_users'] > model['max_users_observed']:
+            capped = (f", capped at {MAX_EXTRAPOLATION}x (the SLO alone would allow more)"
+                      if model['slo_users'] >= model['slo_users_cap'] else '')
+            print(f"   ⚠️ {model['slo_users']} users is beyond the highest measured concurrency "
+                  f"({model['max_users_observed']:g}){capped}: the replica count is extrapolated")
+        if model.get('target_rps'):
+            if model['replicas']:
+                print(f"🏗️ Replicas for {model['target_rps']:g} req/s: {model['replicas']} "
+                      f"({model['replicas_conservative'] or '?'} at the lower confidence bound)")
+            else:
+                print(f"❌ A single user already misses the {model['latency_slo_ms']:g} ms SLO")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit the Universal Scalability Law to concurrency sweeps")
+    parser.add_argument('--csv', nargs='+', default=[], help="results CSV files or glob patterns")
+    parser.add_argument('--run', nargs='+', default=[], help="run id, 'latest' or 'latest:<script>'")
+    parser.add_argument('--db', default=DEFAULT_DB)
+    parser.add_argument('--server', help="only model results for this server name")
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--resamples', type=int, default=DEFAULT_RESAMPLES)
+    parser.add_argument('--latency-slo-ms', type=float, help="mean latency limit per request for replica sizing")
+    parser.add_argument('--think-time', type=float, default=0, help="seconds between a user's requests")
+    parser.add_argument('--target-rps', type=float, help="request rate the deployment must serve")
+    args = parser.parse_args()
+
+    sources = []
+    # CSVs go through the store's legacy-column mapping in a throwaway in-memory database
+    with ResultsStore(':memory:') as csv_store:
+        for pattern in args.csv:
+            for path in sorted(glob.glob(pattern)) or [pattern]:
+                run_id = csv_store.import_csv(path)
+                if run_id:
+                    sources.append((path, load_points(csv_store, run_id, args.server)))
+    if args.run:
+        with ResultsStore(args.db) as store:
+            for spec in args.run:
+                run_id = resolve_run(store, spec)
+                if run_id is None:
+                    print(f"❌ Run not found: {spec}")
+                    raise SystemExit(2)
+                sources.append((f"run {run_id}", load_points(store, run_id, args.server)))
+
+    models = []
+    for source, groups in sources:
+        for server, points in groups.items():
+            for metric in FIT_METRICS:
+                model = model_group(points, metric, args.confidence, args.resamples,
+                                    args.latency_slo_ms / 1000 if args.latency_slo_ms else None,
+                                    args.think_time, args.target_rps)
+                if not model:
+                    continue
+                print_model(server, source, model, points, args.confidence)
+                models.append({'server': server, 'test_type': f"usl_{metric}", 'source': source, **model})
+
+    if not models:
+        print("❌ No source had three or more concurrency levels to fit")
+        raise SystemExit(1)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_results(models, f"capacity_model_{timestamp}", CAPACITY_MODEL_FIELDS, config=vars(args), store=False)
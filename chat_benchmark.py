@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Chat completions benchmark with Qwen3 thinking mode on/off
+Sends the same questions through /v1/chat/completions with enable_thinking true and
+false (chat_template_kwargs), and reports reasoning vs answer tokens and time to first
+answer token (TTFAT), so the cost of thinking in throughput and user-visible latency
+can be quantified per concurrency level.
+"""
+
+import asyncio
+import argparse
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from bench_client import check_health
+from bench_stats import mean, quantile
+from comprehensive_benchmark import save_results
+from load_generator import PROMPTS, test_workload
+
+# Qwen3 recommended sampling settings per mode
+SAMPLING = {
+    True: {"temperature": 0.6, "top_p": 0.95, "top_k": 20},
+    False: {"temperature": 0.7, "top_p": 0.8, "top_k": 20}
+}
+
+DEFAULT_USER_COUNTS = [1, 10]
+
+THINKING_FIELDS = ['server', 'test_type', 'thinking', 'num_users', 'successful_requests', 'failed_requests',
+                   'total_time', 'total_tokens', 'throughput_tok_s', 'answer_tok_s', 'avg_reasoning_tokens',
+                   'avg_answer_tokens', 'reasoning_share', 'avg_ttft_ms', 'avg_ttfat_ms', 'ttfat_p50_ms',
+                   'ttfat_p99_ms', 'avg_tpot_ms', 'avg_response_time', 'latency_p50_ms', 'latency_p99_ms']
+
+def chat_payloads(num_requests: int, thinking: bool, max_tokens: int,
+                  model: str = "Qwen/Qwen3-8B") -> List[Dict]:
+    return [{
+        "model": model,
+        "messages": [{"role": "user", "content": PROMPTS[i % len(PROMPTS)]}],
+        "max_tokens": max_tokens,
+        "chat_template_kwargs": {"enable_thinking": thinking},
+        "stream": True,
+        "stream_options": {"include_usage": True},
+        **SAMPLING[thinking]
+    } for i in range(num_requests)]
+
+def test_chat_mode(port: int, server_name: str, thinking: bool, num_users: int, num_requests: int,
+                   max_tokens: int, model: str = "Qwen/Qwen3-8B", gpu_backend: str = 'auto',
+                   gpu_interval: float = 0.1) -> Dict:
+    """Run `num_requests` chat requests through `num_users` workers with thinking on or off"""
+    mode = 'on' if thinking else 'off'
+    result = asyncio.run(test_workload(port, server_name, chat_payloads(num_requests, thinking, max_tokens, model),
+                                       num_users, test_type=f"chat_thinking_{mode}_{num_users}_users",
+                                       endpoint='/v1/chat/completions', gpu_backend=gpu_backend,
+                                       gpu_interval=gpu_interval))
+    successful = [r for r in result['requests'] if r.get('success')]
+    reasoning_tokens = sum(r.get('reasoning_tokens', 0) for r in successful)
+    answer_tokens = sum(r.get('answer_tokens', 0) for r in successful)
+    ttfat = [r['ttfat_ms'] for r in successful if 'ttfat_ms' in r]
+    total_time = result['total_time']
+
+    result.update({
+        'thinking': thinking,
+        'answer_tok_s': answer_tokens / total_time if total_time > 0 else 0,
+        'avg_reasoning_tokens': reasoning_tokens / len(successful) if successful else 0,
+        'avg_answer_tokens': answer_tokens / len(successful) if successful else 0,
+        'reasoning_share': reasoning_tokens / (reasoning_tokens + answer_tokens)
+        if reasoning_tokens + answer_tokens else 0,
+        'avg_ttfat_ms': mean(ttfat),
+        'ttfat_p50_ms': quantile(ttfat, 50),
+        'ttfat_p99_ms': quantile(ttfat, 99)
+    })
+    print(f"   Thinking {mode}: {result['avg_reasoning_tokens']:.0f} reasoning + "
+          f"{result['avg_answer_tokens']:.0f} answer tokens per request")
+    print(f"   TTFT {result.get('avg_ttft_ms', 0):.1f} ms, time to first answer token "
+          f"p50/p99: {result['ttfat_p50_ms']:.1f} / {result['ttfat_p99_ms']:.1f} ms")
+    if len(ttfat) < len(successful):
+        print(f"   ⚠️ {len(successful) - len(ttfat)} requests produced no answer tokens (raise --max-tokens)")
+    return result
+
+def run_thinking_comparison(port: int, server_name: str, user_counts: List[int], requests_per_user: int = 4,
+                            max_tokens: int = 4096, model: str = "Qwen/Qwen3-8B", cooldown: float = 5,
+                            gpu_backend: str = 'auto', gpu_interval: float = 0.1) -> List[Dict]:
+    """Thinking off then on at every concurrency level"""
+    results = []
+    for num_users in user_counts:
+        for thinking in (False, True):
+            results.append(test_chat_mode(port, server_name, thinking, num_users, num_users * requests_per_user,
+                                          max_tokens, model, gpu_backend, gpu_interval))
+            time.sleep(cooldown)
+    print_thinking_comparison(results)
+    return results
+
+def print_thinking_comparison(results: List[Dict]):
+    print(f"\n{'='*80}")
+    print("📊 THINKING MODE COST (on vs off)")
+    print(f"{'='*80}")
+    print("\n| Users | Mode | Reasoning tok | Answer tok | TTFT ms | TTFAT p50 ms | TTFAT p99 ms | Total tok/s | Answer tok/s |")
+    print("|-------|------|---------------|------------|---------|--------------|--------------|-------------|--------------|")
+    for r in results:
+        print(f"| {r['num_users']:>5} | {'on' if r['thinking'] else 'off':<4} | {r['avg_reasoning_tokens']:>13.0f} | "
+              f"{r['avg_answer_tokens']:>10.0f} | {r.get('avg_ttft_ms', 0):>7.1f} | {r['ttfat_p50_ms']:>12.1f} | "
+              f"{r['ttfat_p99_ms']:>12.1f} | {r['throughput_tok_s']:>11.2f} | {r['answer_tok_s']:>12.2f} |")
+
+    print("\n| Users | TTFAT p50 (on/off) | Answer tok/s (on/off) | Latency p50 (on/off) |")
+    print("|-------|--------------------|-----------------------|----------------------|")
+    for num_users in dict.fromkeys(r['num_users'] for r in results):
+        off = next((r for r in results if r['num_users'] == num_users and not r['thinking']), None)
+        on = next((r for r in results if r['num_users'] == num_users and r['thinking']), None)
+        if not off or not on:
+            continue
+
+        def ratio(metric: str) -> str:
+            return f"{on.get(metric, 0) / off[metric]:.2f}x" if off.get(metric) else '-'
+
+        print(f"| {num_users:>5} | {ratio('ttfat_p50_ms'):>18} | {ratio('answer_tok_s'):>21} | "
+              f"{ratio('latency_p50_ms'):>20} |")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat completions benchmark: Qwen3 thinking on vs off")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server', default='vLLM')
+    parser.add_argument('--model', default="Qwen/Qwen3-8B")
+    parser.add_argument('--users', type=int, nargs='+', default=DEFAULT_USER_COUNTS)
+    parser.add_argument('--requests-per-user', type=int, default=4)
+    parser.add_argument('--max-tokens', type=int, default=4096,
+                        help="must leave room for the answer after thinking")
+    parser.add_argument('--gpu-backend', choices=['auto', 'nvml', 'nvidia-smi', 'none'], default='auto')
+    parser.add_argument('--gpu-interval', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if not check_health(f"http://localhost:{args.port}/health"):
+        print(f"❌ {args.server} is not healthy on port {args.port}")
+        raise SystemExit(1)
+
+    results = run_thinking_comparison(args.port, args.server, args.users, args.requests_per_user, args.max_tokens,
+                                      args.model, gpu_backend=args.gpu_backend, gpu_interval=args.gpu_interval)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_results(results, f"chat_thinking_{args.server.lower()}_{timestamp}", THINKING_FIELDS, config=vars(args))
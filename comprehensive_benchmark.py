@@ -4,15 +4,26 @@ Comprehensive Benchmark for Qwen3-8B: vLLM vs SGLang
 Tests single user, multiple users, and monitors VRAM usage
 """
 
-import requests
 import time
 import asyncio
-import aiohttp
 import subprocess
 import json
 import csv
+import math
+import re
+import argparse
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from bench_client import BenchClient, encode_payload, print_client_stats, run_request
+from goodput import DEFAULT_REQUEST_SLO, goodput_fields, parse_request_slo, print_goodput
+from gpu_sampler import GPUSampler
+from latency_histogram import PERCENTILE_FIELDS, build_histograms, percentile_fields, print_percentiles
+from readiness import start_container, stop_container, wait_until_ready
+from results_store import RunWriter, store_results
+from server_metrics import MetricsPoller, print_server_report, server_fields
+from steady_state import print_steady_state, steady_state_fields
+from timeline import TimelineRecorder
 
 def get_gpu_memory_usage() -> Dict:
     """Get current GPU memory usage using nvidia-smi"""
@@ -37,8 +48,34 @@ def get_gpu_memory_usage() -> Dict:
         print(f"Error getting GPU stats: {e}")
     return {}
 
-def test_single_user(port: int, server_name: str, max_tokens: int = 500) -> Dict:
-    """Test single user performance with VRAM monitoring"""
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list (0 for empty lists)"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+def summarize_stream_results(results: List[Dict]) -> Dict:
+    """Aggregate per-request streaming metrics into report fields"""
+    streamed = [r for r in results if 'ttft_ms' in r]
+    if not streamed:
+        return {}
+
+    ttfts = [r['ttft_ms'] for r in streamed]
+    tpots = [r['tpot_ms'] for r in streamed if r['tpot_ms'] > 0]
+    decode_speeds = [r['decode_tok_s'] for r in streamed if r['decode_tok_s'] > 0]
+
+    return {
+        'avg_ttft_ms': sum(ttfts) / len(ttfts),
+        'avg_tpot_ms': sum(tpots) / len(tpots) if tpots else 0,
+        'decode_tok_s': sum(decode_speeds) / len(decode_speeds) if decode_speeds else 0
+    }
+
+def test_single_user(port: int, server_name: str, max_tokens: int = 500, stream: bool = False,
+                     gpu_backend: str = 'auto', gpu_interval: float = 0.1,
+                     slo: Optional[Dict[str, float]] = None) -> Dict:
+    """Test single user performance with VRAM monitoring (slo: per-request SLO for goodput)"""
     url = f"http://localhost:{port}/v1/completions"
 
     prompt = """Write a detailed analysis of artificial intelligence impact on society,
@@ -49,38 +86,55 @@ def test_single_user(port: int, server_name: str, max_tokens: int = 500) -> Dict
         "prompt": prompt,
         "max_tokens": max_tokens,
         "temperature": 0.7,
-        "stream": False
+        "stream": stream
     }
+    if stream:
+        payload["stream_options"] = {"include_usage": True}
 
     print(f"\n{'='*60}")
-    print(f"Testing {server_name} - SINGLE USER")
+    print(f"Testing {server_name} - SINGLE USER{' (streaming)' if stream else ''}")
     print(f"{'='*60}")
 
     # Get initial GPU memory
     initial_gpu = get_gpu_memory_usage()
     print(f"📊 Initial VRAM: {initial_gpu.get('memory_used_gb', 'N/A')} GB / {initial_gpu.get('memory_total_gb', 'N/A')} GB")
 
+    sampler = GPUSampler(gpu_backend, gpu_interval).start()
     try:
-        start_time = time.time()
-        response = requests.post(url, json=payload, timeout=120)
-        response.raise_for_status()
-        end_time = time.time()
+        result = run_request(url, payload, timeout=120)
+        if not result['success']:
+            raise RuntimeError(result['error'])
 
-        # Get GPU memory during inference
+        # Peak GPU usage during inference comes from the sampled series
+        sampler.stop()
+        gpu_stats = sampler.summary()
         inference_gpu = get_gpu_memory_usage()
+        if gpu_stats:
+            inference_gpu['memory_used_gb'] = gpu_stats['vram_peak_gb']
+            inference_gpu['gpu_utilization'] = gpu_stats['gpu_util_peak']
 
-        result = response.json()
-        total_time = end_time - start_time
+        total_time = result['time']
 
         # Extract metrics
-        completion_tokens = result.get('usage', {}).get('completion_tokens', 0)
-        prompt_tokens = result.get('usage', {}).get('prompt_tokens', 0)
+        completion_tokens = result['tokens']
+        prompt_tokens = result['prompt_tokens']
         tokens_per_second = completion_tokens / total_time if total_time > 0 else 0
 
         print(f"✅ Request completed")
         print(f"   Time: {total_time:.2f}s")
         print(f"   Tokens: {completion_tokens}")
         print(f"   Speed: {tokens_per_second:.2f} tok/s")
+        goodput_stats = goodput_fields([result], total_time, slo)
+        print_goodput(goodput_stats, slo)
+
+        stream_stats = {}
+        if stream:
+            stream_stats = summarize_stream_results([result])
+            print(f"   TTFT: {result['ttft_ms']:.1f} ms")
+            print(f"   TPOT: {result['tpot_ms']:.2f} ms")
+            print(f"   Decode speed: {result['decode_tok_s']:.2f} tok/s")
+        histograms = build_histograms([result])
+        print_percentiles({k: h for k, h in histograms.items() if k == 'itl'})
         print(f"   VRAM during inference: {inference_gpu.get('memory_used_gb', 'N/A')} GB")
         print(f"   VRAM increase: {inference_gpu.get('memory_used_gb', 0) - initial_gpu.get('memory_used_gb', 0):.2f} GB")
 
@@ -93,36 +147,37 @@ def test_single_user(port: int, server_name: str, max_tokens: int = 500) -> Dict
             'vram_initial_gb': initial_gpu.get('memory_used_gb', 0),
             'vram_inference_gb': inference_gpu.get('memory_used_gb', 0),
             'vram_increase_gb': inference_gpu.get('memory_used_gb', 0) - initial_gpu.get('memory_used_gb', 0),
-            'gpu_utilization': inference_gpu.get('gpu_utilization', 0)
+            'gpu_utilization': inference_gpu.get('gpu_utilization', 0),
+            'gpu_samples': sampler.samples,
+            'histograms': histograms,
+            'requests': [result],
+            **{k: v for k, v in gpu_stats.items() if k != 'gpu_samples'},
+            **goodput_stats,
+            **percentile_fields(histograms),
+            **stream_stats
         }
 
     except Exception as e:
         print(f"❌ Error: {e}")
         return None
-
-async def concurrent_request(session, url, payload, request_id):
-    """Make a single async request"""
-    try:
-        start_time = time.time()
-        async with session.post(url, json=payload) as response:
-            result = await response.json()
-            end_time = time.time()
-
-            return {
-                'request_id': request_id,
-                'success': True,
-                'time': end_time - start_time,
-                'tokens': result.get('usage', {}).get('completion_tokens', 0)
-            }
-    except Exception as e:
-        return {
-            'request_id': request_id,
-            'success': False,
-            'error': str(e)
-        }
-
-async def test_multiple_users(port: int, server_name: str, num_users: int = 10, max_tokens: int = 200) -> Dict:
-    """Test multiple concurrent users with VRAM monitoring"""
+    finally:
+        sampler.stop()
+
+async def concurrent_request(client: BenchClient, url, payload, request_id, body: Optional[bytes] = None,
+                             enqueued_at: Optional[float] = None):
+    """Make a single async request (SSE streaming when payload['stream'] is set)"""
+    return await client.request(url, payload, request_id, body, enqueued_at)
+
+async def test_multiple_users(port: int, server_name: str, num_users: int = 10, max_tokens: int = 200,
+                              stream: bool = False, gpu_backend: str = 'auto',
+                              gpu_interval: float = 0.1, timeline: Optional[TimelineRecorder] = None,
+                              scrape_interval: Optional[float] = None, warmup_s: float = 0,
+                              cooldown_s: float = 0, slo: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    Test multiple concurrent users with VRAM monitoring
+    (scrape_interval: poll server /metrics; warmup_s/cooldown_s: seconds trimmed from the throughput window;
+    slo: per-request SLO for goodput)
+    """
     url = f"http://localhost:{port}/v1/completions"
 
     prompts = [
@@ -139,42 +194,59 @@ async def test_multiple_users(port: int, server_name: str, num_users: int = 10,
     ] * (num_users // 10 + 1)
 
     print(f"\n{'='*60}")
-    print(f"Testing {server_name} - {num_users} CONCURRENT USERS")
+    print(f"Testing {server_name} - {num_users} CONCURRENT USERS{' (streaming)' if stream else ''}")
     print(f"{'='*60}")
 
     # Get initial GPU memory
     initial_gpu = get_gpu_memory_usage()
     print(f"📊 Initial VRAM: {initial_gpu.get('memory_used_gb', 'N/A')} GB")
 
-    # Create tasks
-    async with aiohttp.ClientSession() as session:
-        tasks = []
+    # One pooled keep-alive client with no connection cap, so 50+ users are not throttled
+    async with BenchClient(pool_size=0, timeline=timeline) as client:
+        await client.prewarm(f"http://localhost:{port}/health", num_users)
+
+        requests = []
         for i in range(num_users):
             payload = {
                 "model": "Qwen/Qwen3-8B",
                 "prompt": prompts[i % len(prompts)],
                 "max_tokens": max_tokens,
                 "temperature": 0.7,
-                "stream": False
+                "stream": stream
             }
-            tasks.append(concurrent_request(session, url, payload, i))
+            if stream:
+                payload["stream_options"] = {"include_usage": True}
+            # Serialize up front so JSON encoding is not part of the measured window
+            requests.append((payload, encode_payload(payload)))
 
         # Start all requests
         print(f"🚀 Sending {num_users} concurrent requests...")
-        start_time = time.time()
+        start_time = time.perf_counter()
+        start_wall = time.time()
 
         # Monitor GPU during requests
         max_vram = initial_gpu.get('memory_used_gb', 0)
 
-        # Execute all requests
-        results = await asyncio.gather(*tasks)
+        # Execute all requests while the sampler records the GPU time series
+        poller = MetricsPoller(port, scrape_interval).start() if scrape_interval else None
+        with GPUSampler(gpu_backend, gpu_interval) as sampler:
+            # Every request is due at the burst start, so latency behind a slow dispatch is not hidden
+            results = await asyncio.gather(*(concurrent_request(client, url, payload, i, body, start_time)
+                                             for i, (payload, body) in enumerate(requests)))
+        if poller:
+            poller.stop()
 
         # Get peak GPU memory
-        peak_gpu = get_gpu_memory_usage()
-        max_vram = max(max_vram, peak_gpu.get('memory_used_gb', 0))
-
-        end_time = time.time()
+        gpu_stats = sampler.summary()
+        if gpu_stats:
+            max_vram = max(max_vram, gpu_stats['vram_peak_gb'])
+        else:
+            peak_gpu = get_gpu_memory_usage()
+            max_vram = max(max_vram, peak_gpu.get('memory_used_gb', 0))
+
+        end_time = time.perf_counter()
         total_time = end_time - start_time
+        client_stats = client.stats()
 
     # Analyze results
     successful = [r for r in results if r.get('success', False)]
@@ -189,9 +261,26 @@ async def test_multiple_users(port: int, server_name: str, num_users: int = 10,
         print(f"   Total time: {total_time:.2f}s")
         print(f"   Total tokens: {total_tokens}")
         print(f"   Throughput: {throughput:.2f} tok/s")
+        steady_stats = steady_state_fields(results, start_wall, start_wall + total_time, warmup_s, cooldown_s)
+        print_steady_state(steady_stats, throughput)
+        goodput_stats = goodput_fields(results, total_time, slo)
+        print_goodput(goodput_stats, slo)
         print(f"   Avg response time: {avg_response_time:.2f}s")
+        stream_stats = summarize_stream_results(successful)
+        if stream_stats:
+            print(f"   Avg TTFT: {stream_stats['avg_ttft_ms']:.1f} ms")
+            print(f"   Avg TPOT: {stream_stats['avg_tpot_ms']:.2f} ms")
+            print(f"   Decode speed per user: {stream_stats['decode_tok_s']:.2f} tok/s")
+        histograms = build_histograms(successful)
+        print_percentiles(histograms)
         print(f"   Peak VRAM: {max_vram:.2f} GB")
         print(f"   VRAM increase: {max_vram - initial_gpu.get('memory_used_gb', 0):.2f} GB")
+        if gpu_stats:
+            print(f"   GPU util mean/peak: {gpu_stats['gpu_util_mean']:.0f}% / {gpu_stats['gpu_util_peak']:.0f}% "
+                  f"({gpu_stats['gpu_samples']} samples)")
+        print_client_stats(client_stats)
+        if poller:
+            print_server_report(poller, results)
 
         if failed:
             print(f"   ⚠️ Failed requests: {len(failed)}")
@@ -208,14 +297,37 @@ async def test_multiple_users(port: int, server_name: str, num_users: int = 10,
             'avg_response_time': avg_response_time,
             'vram_initial_gb': initial_gpu.get('memory_used_gb', 0),
             'vram_peak_gb': max_vram,
-            'vram_increase_gb': max_vram - initial_gpu.get('memory_used_gb', 0)
+            'vram_increase_gb': max_vram - initial_gpu.get('memory_used_gb', 0),
+            'gpu_samples': sampler.samples,
+            'histograms': histograms,
+            'requests': results,
+            **{k: v for k, v in gpu_stats.items() if k not in ('gpu_samples', 'vram_peak_gb')},
+            **server_fields(poller, sampler.samples),
+            **steady_stats,
+            **goodput_stats,
+            **percentile_fields(histograms),
+            **stream_stats,
+            **client_stats
         }
     else:
         print(f"❌ All requests failed")
         return None
 
-def run_comprehensive_benchmark(port: int, server_name: str) -> List[Dict]:
-    """Run complete benchmark suite"""
+DEFAULT_USER_COUNTS = [5, 10, 20, 50]
+
+def run_comprehensive_benchmark(port: int, server_name: str, stream: bool = False,
+                                gpu_backend: str = 'auto', gpu_interval: float = 0.1,
+                                user_counts: Optional[List[int]] = None,
+                                timeline_sample: Optional[float] = None,
+                                scrape_interval: Optional[float] = None, warmup_s: float = 0,
+                                cooldown_s: float = 0, slo: Optional[Dict[str, float]] = None,
+                                writer: Optional[RunWriter] = None) -> List[Dict]:
+    """
+    Run complete benchmark suite
+    (timeline_sample: record and export request timelines; scrape_interval: poll server /metrics;
+    warmup_s/cooldown_s: trimmed from the throughput window of concurrent tests; slo: goodput SLO;
+    writer: results store run that receives each test as soon as it completes)
+    """
     results = []
 
     print(f"\n{'#'*60}")
@@ -224,32 +336,57 @@ def run_comprehensive_benchmark(port: int, server_name: str) -> List[Dict]:
 
     # Single user test
     print("\n1️⃣ Single User Test")
-    single_result = test_single_user(port, server_name, max_tokens=500)
+    single_result = test_single_user(port, server_name, max_tokens=500, stream=stream,
+                                     gpu_backend=gpu_backend, gpu_interval=gpu_interval, slo=slo)
     if single_result:
         results.append(single_result)
+        if writer:
+            writer.add(single_result)
     time.sleep(5)  # Cool down
 
     # Multiple users tests
-    for num_users in [5, 10, 20, 50]:
+    for num_users in user_counts or DEFAULT_USER_COUNTS:
         print(f"\n{num_users}️⃣ Testing {num_users} Concurrent Users")
-        multi_result = asyncio.run(test_multiple_users(port, server_name, num_users, max_tokens=200))
+        timeline = TimelineRecorder(sample_rate=timeline_sample) if timeline_sample else None
+        multi_result = asyncio.run(test_multiple_users(port, server_name, num_users, max_tokens=200, stream=stream,
+                                                      gpu_backend=gpu_backend, gpu_interval=gpu_interval,
+                                                      timeline=timeline, scrape_interval=scrape_interval,
+                                                      warmup_s=warmup_s, cooldown_s=cooldown_s, slo=slo))
         if multi_result:
             results.append(multi_result)
+            if writer:
+                writer.add(multi_result)
+            if timeline:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                timeline.export(f"/home/qwen-8b-repo/timeline_{server_name.lower()}_{num_users}_users_"
+                                f"{timestamp}.json", multi_result['gpu_samples'],
+                                multi_result.get('server_samples'))
         time.sleep(5)  # Cool down between tests
 
     return results
 
-def save_results(all_results: List[Dict], filename: str):
-    """Save results to CSV file"""
+RESULT_FIELDS = ['server', 'test_type', 'num_users', 'speed_tok_s', 'throughput_tok_s',
+                 'window_throughput_tok_s', 'steady_throughput_tok_s', 'steady_start_s', 'steady_duration_s',
+                 'goodput_tok_s', 'goodput_rps', 'slo_attainment', 'slo_met_requests',
+                 'vram_initial_gb', 'vram_peak_gb', 'vram_increase_gb',
+                 'total_time', 'successful_requests', 'failed_requests',
+                 'avg_response_time', 'avg_ttft_ms', 'avg_tpot_ms', 'decode_tok_s', 'vram_mean_gb', 'gpu_util_mean', 'gpu_util_peak',
+                 'power_peak_w', 'power_mean_w', 'sm_clock_mean_mhz',
+                 'client_cpu_ms_per_request', 'client_cpu_us_per_token', 'client_cpu_utilization',
+                 'container_start_s', 'health_up_s', 'first_token_ready_s', 'cold_start_total_s'
+                 ] + PERCENTILE_FIELDS
+
+def save_results(all_results: List[Dict], filename: str, fieldnames: Optional[List[str]] = None,
+                 config: Optional[Dict] = None, store: bool = True):
+    """Save results to CSV file and (unless store=False) to the results database"""
     if not all_results:
         return
 
+    fieldnames = fieldnames or RESULT_FIELDS
+
     # CSV output
     csv_path = f"/home/qwen-8b-repo/{filename}.csv"
     with open(csv_path, 'w', newline='') as f:
-        fieldnames = ['server', 'test_type', 'num_users', 'speed_tok_s', 'throughput_tok_s',
-                     'vram_initial_gb', 'vram_peak_gb', 'vram_increase_gb',
-                     'total_time', 'successful_requests', 'failed_requests']
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
 
@@ -259,11 +396,13 @@ def save_results(all_results: List[Dict], filename: str):
             if result['test_type'] == 'single_user':
                 row['throughput_tok_s'] = ''
                 row['num_users'] = 1
-            else:
+            elif 'speed_tok_s' in row:
                 row['speed_tok_s'] = ''
             writer.writerow(row)
 
     print(f"\n💾 Results saved to: {csv_path}")
+    if store:
+        store_results(all_results, re.sub(r'_\d{8}_\d{6}$', '', filename), config)
 
 def print_comparison(sglang_results: List[Dict], vllm_results: List[Dict]):
     """Print comparison between SGLang and vLLM"""
@@ -272,11 +411,16 @@ def print_comparison(sglang_results: List[Dict], vllm_results: List[Dict]):
     print(f"{'='*80}")
 
     # Create comparison table
-    print("\n| Test | SGLang Speed | vLLM Speed | SGLang VRAM | vLLM VRAM | Winner |")
-    print("|------|-------------|------------|-------------|-----------|---------|")
+    # Winner is decided by goodput (tok/s from SLO-compliant requests), not raw speed
+    print("\n| Test | SGLang Speed | vLLM Speed | SGLang Steady | vLLM Steady | SGLang Goodput | vLLM Goodput | "
+          "SGLang SLO % | vLLM SLO % | SGLang VRAM | vLLM VRAM | Winner |")
+    print("|------|-------------|------------|---------------|-------------|----------------|--------------|"
+          "-------------|------------|-------------|-----------|---------|")
 
-    test_types = ['single_user', 'concurrent_5_users', 'concurrent_10_users',
-                  'concurrent_20_users', 'concurrent_50_users']
+    test_types = []
+    for r in sglang_results + vllm_results:
+        if r['test_type'] not in test_types:
+            test_types.append(r['test_type'])
 
     for test_type in test_types:
         sg = next((r for r in sglang_results if r['test_type'] == test_type), None)
@@ -293,32 +437,112 @@ def print_comparison(sglang_results: List[Dict], vllm_results: List[Dict]):
             sg_vram = sg.get('vram_peak_gb', sg.get('vram_inference_gb', 0))
             vl_vram = vl.get('vram_peak_gb', vl.get('vram_inference_gb', 0))
 
-            winner = "vLLM" if vl_speed > sg_speed else "SGLang"
+            sg_goodput = sg.get('goodput_tok_s', 0)
+            vl_goodput = vl.get('goodput_tok_s', 0)
+            if sg_goodput == vl_goodput:
+                winner = "tie" if sg_goodput else "neither"
+            else:
+                winner = "vLLM" if vl_goodput > sg_goodput else "SGLang"
+
+            # Steady-state throughput excludes ramp-up and the long-request tail (blank if none detected)
+            sg_steady = f"{sg['steady_throughput_tok_s']:.2f}" if 'steady_throughput_tok_s' in sg else '-'
+            vl_steady = f"{vl['steady_throughput_tok_s']:.2f}" if 'steady_throughput_tok_s' in vl else '-'
 
             test_label = test_type.replace('_', ' ').title()
-            print(f"| {test_label:<20} | {sg_speed:>11.2f} | {vl_speed:>10.2f} | {sg_vram:>11.2f} | {vl_vram:>9.2f} | {winner:<7} |")
+            print(f"| {test_label:<20} | {sg_speed:>11.2f} | {vl_speed:>10.2f} | {sg_steady:>13} | {vl_steady:>11} | "
+                  f"{sg_goodput:>14.2f} | {vl_goodput:>12.2f} | {sg.get('slo_attainment', 0):>11.0%} | "
+                  f"{vl.get('slo_attainment', 0):>10.0%} | {sg_vram:>11.2f} | {vl_vram:>9.2f} | {winner:<7} |")
+
+    # End-to-end latency tail (ms), measured and corrected for coordinated omission ("CO") side by side;
+    # tests with no intended send time (single user) have no corrected value
+    stats = [('p50', 'p50'), ('p99', 'p99'), ('p99.9', 'p99_9'), ('max', 'max')]
+    columns = [(f"{server} {label}{' CO' if corrected else ''}", f"{metric}_{key}_ms")
+               for label, key in stats for server in ('SGLang', 'vLLM')
+               for corrected, metric in ((False, 'latency'), (True, 'corrected_latency'))]
+    print("\n| Test | " + " | ".join(title for title, _ in columns) + " |")
+    print("|------|" + "|".join('-' * (len(title) + 2) for title, _ in columns) + "|")
+
+    for test_type in test_types:
+        sg = next((r for r in sglang_results if r['test_type'] == test_type), None)
+        vl = next((r for r in vllm_results if r['test_type'] == test_type), None)
+
+        if sg and vl:
+            test_label = test_type.replace('_', ' ').title()
+            cells = []
+            for title, field in columns:
+                r = sg if title.startswith('SGLang') else vl
+                cells.append(f"{r[field]:>{len(title)}.0f}" if field in r else f"{'-':>{len(title)}}")
+            print(f"| {test_label:<20} | " + " | ".join(cells) + " |")
+    print("   CO = corrected for coordinated omission (latency from the intended send time)")
+
+    # Streaming latency table (only present for --stream runs)
+    if not any('avg_ttft_ms' in r for r in sglang_results + vllm_results):
+        return
+
+    print("\n| Test | SGLang TTFT ms | vLLM TTFT ms | SGLang TTFT p99 | vLLM TTFT p99 | SGLang TPOT ms | vLLM TPOT ms | SGLang Decode | vLLM Decode |")
+    print("|------|---------------|--------------|-----------------|---------------|----------------|--------------|---------------|-------------|")
+
+    for test_type in test_types:
+        sg = next((r for r in sglang_results if r['test_type'] == test_type), None)
+        vl = next((r for r in vllm_results if r['test_type'] == test_type), None)
+
+        if sg and vl:
+            test_label = test_type.replace('_', ' ').title()
+            print(f"| {test_label:<20} | {sg.get('avg_ttft_ms', 0):>13.1f} | {vl.get('avg_ttft_ms', 0):>12.1f} | "
+                  f"{sg.get('ttft_p99_ms', 0):>15.1f} | {vl.get('ttft_p99_ms', 0):>13.1f} | "
+                  f"{sg.get('avg_tpot_ms', 0):>14.2f} | {vl.get('avg_tpot_ms', 0):>12.2f} | "
+                  f"{sg.get('decode_tok_s', 0):>13.2f} | {vl.get('decode_tok_s', 0):>11.2f} |")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comprehensive benchmark: SGLang vs vLLM")
+    parser.add_argument('--stream', action='store_true',
+                        help="use SSE responses to measure TTFT / inter-token latency")
+    parser.add_argument('--gpu-backend', choices=['auto', 'nvml', 'nvidia-smi', 'none'], default='auto',
+                        help="background GPU sampler backend")
+    parser.add_argument('--gpu-interval', type=float, default=0.1,
+                        help="GPU sampling interval in seconds")
+    parser.add_argument('--users', type=int, nargs='+', default=DEFAULT_USER_COUNTS,
+                        help="concurrent user counts to test (see concurrency_sweep.py for SLO search)")
+    parser.add_argument('--timeline-sample', type=float, metavar='FRACTION',
+                        help="export Chrome Trace timelines of this fraction of requests (e.g. 1.0)")
+    parser.add_argument('--scrape-interval', type=float, metavar='SECONDS',
+                        help="poll the server's /metrics during concurrent tests and correlate with latency")
+    parser.add_argument('--trim-warmup', type=float, default=0, metavar='SECONDS',
+                        help="exclude this much of the start of each concurrent test from windowed throughput")
+    parser.add_argument('--trim-cooldown', type=float, default=0, metavar='SECONDS',
+                        help="exclude this much of the end of each concurrent test from windowed throughput")
+    parser.add_argument('--request-slo', nargs='+', metavar='METRIC=MS',
+                        help="per-request SLO for goodput, e.g. ttft_ms=500 tpot_ms=40 latency_ms=20000 "
+                             f"(defaults: {' '.join(f'{k}={v:g}' for k, v in DEFAULT_REQUEST_SLO.items())})")
+    args = parser.parse_args()
+
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    stream = args.stream
+    run_options = {'gpu_backend': args.gpu_backend, 'gpu_interval': args.gpu_interval,
+                   'user_counts': args.users, 'timeline_sample': args.timeline_sample,
+                   'scrape_interval': args.scrape_interval, 'warmup_s': args.trim_warmup,
+                   'cooldown_s': args.trim_cooldown, 'slo': parse_request_slo(args.request_slo)}
 
     # Test current server (SGLang is running on port 8000)
     print("🔍 Testing SGLang first...")
-    sglang_results = run_comprehensive_benchmark(8000, "SGLang")
-    save_results(sglang_results, f"sglang_benchmark_{timestamp}")
+    if not wait_until_ready(8000)['ready']:
+        raise SystemExit(1)
+    writer = RunWriter("sglang_benchmark", config={'stream': stream, **run_options})
+    try:
+        sglang_results = run_comprehensive_benchmark(8000, "SGLang", stream=stream, writer=writer, **run_options)
+    finally:
+        writer.close()
+    save_results(sglang_results, f"sglang_benchmark_{timestamp}", store=False)
 
     print("\n" + "="*60)
     print("⏸️ Stopping SGLang and starting vLLM...")
     print("="*60)
 
     # Stop SGLang
-    subprocess.run(["docker", "stop", "qwen3-8b-sglang"], capture_output=True)
-    subprocess.run(["docker", "rm", "qwen3-8b-sglang"], capture_output=True)
-    time.sleep(5)
-
-    # Start vLLM
-    subprocess.run([
-        "docker", "run", "-d",
-        "--name", "qwen3-8b-vllm",
+    stop_container("qwen3-8b-sglang")
+
+    # Start vLLM and wait until it actually serves a token (no fixed sleep)
+    cold_start = start_container([
         "--runtime", "nvidia",
         "--gpus", "all",
         "-p", "8000:8000",
@@ -330,19 +554,24 @@ if __name__ == "__main__":
         "--gpu-memory-utilization", "0.95",
         "--dtype", "auto",
         "--trust-remote-code"
-    ])
-
-    print("⏳ Waiting 90 seconds for vLLM to initialize...")
-    time.sleep(90)
+    ], "qwen3-8b-vllm", 8000)
+    if not cold_start['ready']:
+        raise SystemExit(1)
 
     # Test vLLM
     print("\n🔍 Testing vLLM...")
-    vllm_results = run_comprehensive_benchmark(8000, "vLLM")
-    save_results(vllm_results, f"vllm_benchmark_{timestamp}")
+    writer = RunWriter("vllm_benchmark", config={'stream': stream, **run_options})
+    try:
+        vllm_results = run_comprehensive_benchmark(8000, "vLLM", stream=stream, writer=writer, **run_options)
+        vllm_results.append({'server': 'vLLM', 'test_type': 'cold_start', **cold_start})
+        writer.add(vllm_results[-1])
+    finally:
+        writer.close()
+    save_results(vllm_results, f"vllm_benchmark_{timestamp}", store=False)
 
     # Combined results
     all_results = sglang_results + vllm_results
-    save_results(all_results, f"combined_benchmark_{timestamp}")
+    save_results(all_results, f"combined_benchmark_{timestamp}", store=False)
 
     # Print comparison
     print_comparison(sglang_results, vllm_results)
\ No newline at end of file
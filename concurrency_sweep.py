@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Adaptive load sweep for Qwen3-8B servers
+Doubles concurrency (or request rate) until a latency/TTFT SLO breaks, then bisects
+between the last passing and first failing load to find the saturation knee
+"""
+
+import asyncio
+import argparse
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from comprehensive_benchmark import save_results
+from load_generator import test_closed_loop, test_open_loop
+
+SWEEP_FIELDS = ['server', 'test_type', 'load', 'meets_slo', 'slo_violations', 'num_users', 'target_rate_rps',
+                'offered_rate_rps', 'achieved_rate_rps', 'successful_requests', 'failed_requests',
+                'throughput_tok_s', 'goodput_tok_s', 'slo_attainment', 'latency_p50_ms', 'latency_p95_ms', 'latency_p99_ms',
+                'corrected_latency_p95_ms', 'corrected_latency_p99_ms', 'ttft_p95_ms', 'ttft_p99_ms', 'itl_p95_ms']
+
+def parse_slo(items: List[str]) -> Dict[str, float]:
+    """Parse ['latency_p95_ms=8000', 'ttft_p99_ms=1000'] into {field: limit}"""
+    slo = {}
+    for item in items:
+        key, _, value = item.partition('=')
+        if not value:
+            raise ValueError(f"SLO must look like field=limit, got: {item}")
+        slo[key.strip()] = float(value)
+    return slo
+
+def check_slo(result: Optional[Dict], slo: Dict[str, float], max_error_rate: float = 0.01,
+              min_achieved_ratio: float = 0.9) -> List[str]:
+    """Return the list of violated SLO terms (empty list means the load passed)"""
+    if not result:
+        return ['no result']
+
+    violations = []
+    total = result.get('successful_requests', 0) + result.get('failed_requests', 0)
+    if not result.get('successful_requests'):
+        return ['all requests failed']
+    if total and result.get('failed_requests', 0) / total > max_error_rate:
+        violations.append(f"error rate {result['failed_requests'] / total:.1%} > {max_error_rate:.1%}")
+
+    for field, limit in slo.items():
+        value = result.get(field)
+        if value is None:
+            violations.append(f"{field} not measured")
+        elif value > limit:
+            violations.append(f"{field} {value:.1f} > {limit:g}")
+
+    # An open-loop server that cannot keep up with the offered rate is saturated. Compare with
+    # the rate actually offered (Poisson arrivals scatter around the target), and with the
+    # drain-inclusive completion rate, so long requests alone do not look like a backlog
+    if result.get('offered_rate_rps'):
+        ratio = result['achieved_rate_rps'] / result['offered_rate_rps']
+        if ratio < min_achieved_ratio:
+            violations.append(f"achieved {ratio:.0%} of offered rate")
+    return violations
+
+def search_knee(probe: Callable[[float], Dict], slo: Dict[str, float], start: float, limit: float,
+                integer: bool = True, resolution: float = 0.1, max_error_rate: float = 0.01) -> Dict:
+    """
+    Double the load from `start` until the SLO fails (or `limit`), then bisect
+
+    Bisection stops once the gap between passing and failing load is within
+    `resolution` (relative) of the passing load, or 1 for integer loads.
+    """
+    probes = []
+
+    def run(load):
+        result = probe(load) or {}
+        violations = check_slo(result, slo, max_error_rate)
+        result.update({'load': load, 'meets_slo': not violations, 'slo_violations': '; '.join(violations)})
+        probes.append(result)
+        status = "✅ meets SLO" if not violations else f"❌ {'; '.join(violations)}"
+        print(f"\n🔎 Load {load:g}: {status}")
+        return not violations
+
+    good, bad = None, None
+    load = start
+    while True:
+        if run(load):
+            good = load
+            if load >= limit:
+                break
+            load = min(limit, load * 2)
+        else:
+            bad = load
+            break
+        time.sleep(5)  # Cool down between probes
+
+    if good is not None and bad is not None:
+        while True:
+            gap = bad - good
+            if (integer and gap <= 1) or (not integer and gap <= good * resolution):
+                break
+            mid = (good + bad) / 2
+            if integer:
+                mid = int(mid)
+            time.sleep(5)
+            if run(mid):
+                good = mid
+            else:
+                bad = mid
+
+    best = next((p for p in probes if p['load'] == good and p['meets_slo']), None)
+    return {
+        'best_load': good,
+        'first_failing_load': bad,
+        'best_result': best,
+        'probes': sorted(probes, key=lambda p: p['load'])
+    }
+
+def run_sweep(port: int, server_name: str, slo: Dict[str, float], mode: str = 'concurrency',
+              start: float = 1, limit: float = 512, duration: float = 30, max_tokens: int = 200,
+              stream: bool = False, resolution: float = 0.1, max_error_rate: float = 0.01) -> Dict:
+    """Find the highest concurrency (or req/s) that still meets the SLO"""
+    print(f"\n{'#'*60}")
+    print(f"# SLO SWEEP ({mode}): {server_name}")
+    print(f"# SLO: {', '.join(f'{k} <= {v:g}' for k, v in slo.items()) or 'errors only'}")
+    print(f"{'#'*60}")
+
+    if mode == 'concurrency':
+        def probe(load):
+            return asyncio.run(test_closed_loop(port, server_name, int(load), duration, max_tokens, stream))
+        integer = True
+    else:
+        def probe(load):
+            return asyncio.run(test_open_loop(port, server_name, load, duration, max_tokens=max_tokens,
+                                              stream=stream))
+        integer = False
+
+    sweep = search_knee(probe, slo, start, limit, integer, resolution, max_error_rate)
+
+    print(f"\n{'='*60}")
+    print(f"📊 {server_name} SLO SWEEP SUMMARY")
+    print(f"{'='*60}")
+    print("\n| Load | Meets SLO | Throughput (tok/s) | p95 Latency | p95 Corrected | p99 Latency | p99 Corrected "
+          "| p99 TTFT |")
+    print("|------|-----------|--------------------|-------------|---------------|-------------|---------------"
+          "|----------|")
+    for p in sweep['probes']:
+        print(f"| {p['load']:>4g} | {'✅' if p['meets_slo'] else '❌':<9} | {p.get('throughput_tok_s', 0):>18.2f} | "
+              f"{p.get('latency_p95_ms', 0):>8.0f} ms | {p.get('corrected_latency_p95_ms', 0):>10.0f} ms | "
+              f"{p.get('latency_p99_ms', 0):>8.0f} ms | {p.get('corrected_latency_p99_ms', 0):>10.0f} ms | "
+              f"{p.get('ttft_p99_ms', 0):>5.0f} ms |")
+
+    unit = 'users' if mode == 'concurrency' else 'req/s'
+    if sweep['best_result']:
+        print(f"\n🏆 Highest load meeting SLO: {sweep['best_load']:g} {unit} "
+              f"at {sweep['best_result']['throughput_tok_s']:.2f} tok/s")
+    else:
+        print(f"\n❌ SLO not met even at {start:g} {unit}")
+    if sweep['first_failing_load'] is None:
+        print(f"   ⚠️ SLO still met at the sweep limit ({limit:g} {unit}) - raise --max to find the knee")
+    return sweep
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the saturation knee under a latency SLO")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server', default='vLLM')
+    parser.add_argument('--mode', choices=['concurrency', 'rate'], default='concurrency')
+    parser.add_argument('--slo', nargs='+', default=['latency_p95_ms=10000'],
+                        help="result field limits, e.g. latency_p95_ms=10000 ttft_p99_ms=1000")
+    parser.add_argument('--start', type=float, default=1)
+    parser.add_argument('--max', type=float, default=512)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--max-tokens', type=int, default=200)
+    parser.add_argument('--stream', action='store_true', help="required for ttft_* / itl_* SLO terms")
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    args = parser.parse_args()
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    sweep = run_sweep(args.port, args.server, parse_slo(args.slo), args.mode, args.start, args.max,
+                      args.duration, args.max_tokens, args.stream, max_error_rate=args.max_error_rate)
+    save_results(sweep['probes'], f"slo_sweep_{args.server.lower()}_{timestamp}", SWEEP_FIELDS, config=vars(args))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Goodput: throughput counted only from requests that meet a per-request SLO
+Raw tok/s keeps rising with concurrency even after individual users stop getting usable
+latency. A request counts toward goodput only when its TTFT, TPOT and end-to-end latency
+are all within the SLO; failed requests never count.
+"""
+
+from typing import Dict, List, Optional
+
+# Per-request SLO terms: record field -> default limit in ms
+DEFAULT_REQUEST_SLO = {
+    'ttft_ms': 1000.0,
+    'tpot_ms': 50.0,
+    'latency_ms': 30000.0
+}
+
+GOODPUT_FIELDS = ['goodput_tok_s', 'goodput_rps', 'slo_attainment', 'slo_met_requests']
+
+def parse_request_slo(items: Optional[List[str]]) -> Dict[str, float]:
+    """Parse ['ttft_ms=500', 'latency_ms=20000'] on top of DEFAULT_REQUEST_SLO"""
+    slo = dict(DEFAULT_REQUEST_SLO)
+    for item in items or []:
+        key, _, value = item.partition('=')
+        key = key.strip()
+        if key not in DEFAULT_REQUEST_SLO or not value:
+            raise ValueError(f"Request SLO must look like field=limit_ms with field in "
+                             f"({', '.join(DEFAULT_REQUEST_SLO)}), got: {item}")
+        slo[key] = float(value)
+    return slo
+
+def meets_slo(record: Dict, slo: Dict[str, float]) -> bool:
+    """True when a successful record is within every SLO term it has a measurement for"""
+    if not record.get('success'):
+        return False
+    for key, limit in slo.items():
+        # Non-streaming records carry no TTFT/TPOT; only end-to-end latency applies to them
+        value = record.get('time', 0) * 1000 if key == 'latency_ms' else record.get(key)
+        if value and value > limit:
+            return False
+    return True
+
+def goodput_fields(records: List[Dict], total_time: float, slo: Optional[Dict[str, float]] = None,
+                   sent: Optional[int] = None) -> Dict:
+    """
+    Goodput tok/s and req/s over `total_time`, and the share of sent requests meeting the SLO
+    (`sent` counts requests without a record, e.g. cancelled after an open-loop drain)
+    """
+    slo = slo or DEFAULT_REQUEST_SLO
+    sent = sent or len(records)
+    met = [r for r in records if meets_slo(r, slo)]
+    tokens = sum(r.get('tokens', 0) for r in met)
+    return {
+        'goodput_tok_s': tokens / total_time if total_time > 0 else 0,
+        'goodput_rps': len(met) / total_time if total_time > 0 else 0,
+        'slo_attainment': len(met) / sent if sent else 0,
+        'slo_met_requests': len(met)
+    }
+
+def print_goodput(fields: Dict, slo: Optional[Dict[str, float]] = None):
+    slo = slo or DEFAULT_REQUEST_SLO
+    terms = ', '.join(f"{k} <= {v:g}" for k, v in slo.items())
+    print(f"   Goodput: {fields['goodput_tok_s']:.2f} tok/s, SLO attainment {fields['slo_attainment']:.1%} "
+          f"({terms})")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Background GPU sampler for benchmark runs
+Polls memory, utilization, power and SM clock for the whole run so peak/mean
+values come from a time series instead of one nvidia-smi call after the run
+"""
+
+import csv
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional
+
+SAMPLE_FIELDS = ['timestamp', 'memory_used_mb', 'memory_total_mb', 'gpu_utilization',
+                 'power_w', 'sm_clock_mhz']
+
+class NvmlBackend:
+    """Read GPU counters through NVML (pynvml / nvidia-ml-py)"""
+
+    paced = False
+
+    def __init__(self, gpu_index: int = 0):
+        import pynvml
+        self.nvml = pynvml
+        pynvml.nvmlInit()
+        self.handle = pynvml.nvmlDeviceGetHandleByIndex(gpu_index)
+
+    def read(self) -> Optional[Dict]:
+        nvml = self.nvml
+        memory = nvml.nvmlDeviceGetMemoryInfo(self.handle)
+        utilization = nvml.nvmlDeviceGetUtilizationRates(self.handle)
+        try:
+            power_w = nvml.nvmlDeviceGetPowerUsage(self.handle) / 1000
+        except nvml.NVMLError:
+            power_w = 0
+        return {
+            'timestamp': time.time(),
+            'memory_used_mb': memory.used / 1024 / 1024,
+            'memory_total_mb': memory.total / 1024 / 1024,
+            'gpu_utilization': utilization.gpu,
+            'power_w': power_w,
+            'sm_clock_mhz': nvml.nvmlDeviceGetClockInfo(self.handle, nvml.NVML_CLOCK_SM)
+        }
+
+    def close(self):
+        self.nvml.nvmlShutdown()
+
+class NvidiaSmiLoopBackend:
+    """Stream samples from a single long-running `nvidia-smi --query-gpu ... -lms` process"""
+
+    paced = True  # nvidia-smi sets the pace, read() blocks until the next line
+
+    def __init__(self, gpu_index: int = 0, interval: float = 0.1):
+        self.gpu_index = str(gpu_index)
+        self.process = subprocess.Popen([
+            'nvidia-smi',
+            '--query-gpu=index,memory.used,memory.total,utilization.gpu,power.draw,clocks.sm',
+            '--format=csv,noheader,nounits',
+            '-lms', str(max(1, int(interval * 1000)))
+        ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+
+    def read(self) -> Optional[Dict]:
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                return None
+            values = [v.strip() for v in line.split(',')]
+            if len(values) < 6 or values[0] != self.gpu_index:
+                continue
+            return {
+                'timestamp': time.time(),
+                'memory_used_mb': _to_float(values[1]),
+                'memory_total_mb': _to_float(values[2]),
+                'gpu_utilization': _to_float(values[3]),
+                'power_w': _to_float(values[4]),
+                'sm_clock_mhz': _to_float(values[5])
+            }
+
+    def close(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+class ReplayBackend:
+    """Replay recorded samples (list of dicts or a CSV file), for testing without a GPU"""
+
+    paced = False
+
+    def __init__(self, samples: List[Dict], loop: bool = False):
+        self.samples = samples
+        self.loop = loop
+        self.position = 0
+
+    @classmethod
+    def from_csv(cls, path: str, loop: bool = False) -> 'ReplayBackend':
+        with open(path, newline='') as f:
+            samples = [{k: _to_float(v) for k, v in row.items() if k in SAMPLE_FIELDS}
+                       for row in csv.DictReader(f)]
+        return cls(samples, loop)
+
+    def read(self) -> Optional[Dict]:
+        if self.position >= len(self.samples):
+            if not self.loop or not self.samples:
+                return None
+            self.position = 0
+        sample = dict(self.samples[self.position])
+        self.position += 1
+        sample['timestamp'] = time.time()
+        return sample
+
+    def close(self):
+        pass
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0  # nvidia-smi reports "[N/A]" for unsupported counters
+
+def make_backend(name: str = 'auto', gpu_index: int = 0, interval: float = 0.1):
+    """Create a sampler backend: 'nvml', 'nvidia-smi', 'none' or 'auto' (first one available)"""
+    if name in ('auto', 'nvml'):
+        try:
+            return NvmlBackend(gpu_index)
+        except Exception:
+            if name == 'nvml':
+                raise
+    if name in ('auto', 'nvidia-smi'):
+        if shutil.which('nvidia-smi'):
+            return NvidiaSmiLoopBackend(gpu_index, interval)
+        if name == 'nvidia-smi':
+            raise RuntimeError("nvidia-smi not found on PATH")
+    if name in ('auto', 'none'):
+        return None
+    raise ValueError(f"Unknown GPU sampler backend: {name}")
+
+class GPUSampler:
+    """
+    Poll a backend on a background thread for the duration of a run
+
+        with GPUSampler(interval=0.1) as sampler:
+            ...run requests...
+        stats = sampler.summary()
+    """
+
+    def __init__(self, backend='auto', interval: float = 0.1, gpu_index: int = 0):
+        self.interval = interval
+        if isinstance(backend, str):
+            backend = make_backend(backend, gpu_index, interval)
+        self.backend = backend
+        self.samples: List[Dict] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'GPUSampler':
+        if self.backend is not None:
+            self._thread = threading.Thread(target=self._run, name='gpu-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> List[Dict]:
+        self._stop.set()
+        if self.backend is None:
+            return self.samples
+        if self.backend.paced:
+            # Closing first unblocks a paced backend waiting on its next line
+            self.backend.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if not self.backend.paced:
+            self.backend.close()
+        return self.samples
+
+    def __enter__(self) -> 'GPUSampler':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                sample = self.backend.read()
+            except Exception as e:
+                print(f"Error sampling GPU stats: {e}")
+                return
+            if sample is None:
+                return
+            if not self._stop.is_set():
+                self.samples.append(sample)
+            if not self.backend.paced:
+                self._stop.wait(max(0, self.interval - (time.monotonic() - started)))
+
+    def summary(self) -> Dict:
+        """Peak/mean values over the recorded series (empty dict when nothing was sampled)"""
+        if not self.samples:
+            return {}
+
+        def series(key):
+            return [s.get(key, 0) for s in self.samples]
+
+        memory = series('memory_used_mb')
+        utilization = series('gpu_utilization')
+        power = series('power_w')
+        clocks = series('sm_clock_mhz')
+
+        return {
+            'gpu_samples': len(self.samples),
+            'vram_peak_gb': round(max(memory) / 1024, 2),
+            'vram_mean_gb': round(sum(memory) / len(memory) / 1024, 2),
+            'vram_min_gb': round(min(memory) / 1024, 2),
+            'gpu_util_peak': max(utilization),
+            'gpu_util_mean': sum(utilization) / len(utilization),
+            'power_peak_w': max(power),
+            'power_mean_w': sum(power) / len(power),
+            'sm_clock_mean_mhz': sum(clocks) / len(clocks)
+        }
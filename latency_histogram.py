@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Mergeable latency histograms (HDR-style log-linear buckets)
+Bounded memory regardless of request count, ~0.8% relative error, and histograms from
+separate runs or worker processes can be merged before taking percentiles
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+# Metrics recorded for every benchmark result: e2e latency, e2e latency corrected for coordinated
+# omission (measured from the intended send time), time to first token, per-token latency
+HISTOGRAM_METRICS = ('latency', 'corrected_latency', 'ttft', 'itl')
+
+def percentile_label(pct: float) -> str:
+    """50 -> 'p50', 99.9 -> 'p99_9'"""
+    return 'p' + f"{pct:g}".replace('.', '_')
+
+PERCENTILE_FIELDS = [f"{metric}_{label}_ms"
+                     for metric in HISTOGRAM_METRICS
+                     for label in [percentile_label(p) for p in PERCENTILES] + ['max']]
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of latencies in milliseconds
+
+    Values are stored as integer microseconds. Below 2**sub_bucket_bits µs every value
+    has its own bucket; above that each power of two is split into 2**(sub_bucket_bits-1)
+    equal buckets, so the relative error stays below 1 / 2**(sub_bucket_bits-1).
+    """
+
+    def __init__(self, sub_bucket_bits: int = 8):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us: Optional[int] = None
+
+    def _index(self, value_us: int) -> int:
+        if value_us < self.sub_bucket_count:
+            return value_us
+        shift = value_us.bit_length() - self.sub_bucket_bits
+        mantissa = value_us >> shift
+        return self.sub_bucket_count + (shift - 1) * self.half_count + (mantissa - self.half_count)
+
+    def _bounds(self, index: int):
+        """Lowest and highest µs value that map to `index`"""
+        if index < self.sub_bucket_count:
+            return index, index
+        shift = (index - self.sub_bucket_count) // self.half_count + 1
+        mantissa = (index - self.sub_bucket_count) % self.half_count + self.half_count
+        low = mantissa << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value_ms: float, count: int = 1):
+        value_us = max(0, int(round(value_ms * 1000)))
+        index = self._index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total_us += value_us * count
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = value_us if self.max_us is None else max(self.max_us, value_us)
+
+    def record_many(self, values_ms: Iterable[float]):
+        for value in values_ms:
+            self.record(value)
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Cannot merge histograms with different precision")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+            self.max_us = other.max_us if self.max_us is None else max(self.max_us, other.max_us)
+        return self
+
+    def percentile(self, pct: float) -> float:
+        """Value (ms) at or below which `pct` percent of recorded values fall"""
+        if not self.count:
+            return 0
+        target = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                low, high = self._bounds(index)
+                value_us = min(max((low + high) / 2, self.min_us), self.max_us)
+                return value_us / 1000
+        return self.max_us / 1000
+
+    def corrected(self, expected_interval_ms: float) -> 'LatencyHistogram':
+        """
+        Copy corrected for coordinated omission (like HdrHistogram's copyCorrectedForCoordinatedOmission)
+
+        A closed-loop user stuck on a response of L ms did not send the requests it was due
+        to send every `expected_interval_ms`; each of those is added with the latency it
+        would have seen from its intended send time: L - interval, L - 2*interval, ...
+        The measured values are copied exactly (counts, total, min/max), so the corrected
+        max never drops below the measured max.
+        """
+        histogram = LatencyHistogram(self.sub_bucket_bits).merge(self)
+        for index, count in sorted(self.counts.items()):
+            low, high = self._bounds(index)
+            value_ms = min(max((low + high) / 2, self.min_us), self.max_us) / 1000
+            if expected_interval_ms <= 0:
+                continue
+            missing = value_ms - expected_interval_ms
+            while missing >= expected_interval_ms:
+                histogram.record(missing, count)
+                missing -= expected_interval_ms
+        return histogram
+
+    def mean(self) -> float:
+        return self.total_us / self.count / 1000 if self.count else 0
+
+    def max(self) -> float:
+        return self.max_us / 1000 if self.max_us is not None else 0
+
+    def to_dict(self) -> Dict:
+        """Plain-dict form for JSON/pickle transport between processes"""
+        return {
+            'sub_bucket_bits': self.sub_bucket_bits,
+            'counts': {str(k): v for k, v in self.counts.items()},
+            'count': self.count,
+            'total_us': self.total_us,
+            'min_us': self.min_us,
+            'max_us': self.max_us
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        histogram = cls(data['sub_bucket_bits'])
+        histogram.counts = {int(k): v for k, v in data['counts'].items()}
+        histogram.count = data['count']
+        histogram.total_us = data['total_us']
+        histogram.min_us = data['min_us']
+        histogram.max_us = data['max_us']
+        return histogram
+
+class ReplayStats:
+    """Running aggregates over completed requests (per-request records are not kept); mergeable across processes"""
+
+    def __init__(self):
+        self.histograms = {metric: LatencyHistogram() for metric in HISTOGRAM_METRICS}
+        self.queue_delay = LatencyHistogram()
+        self.successful = 0
+        self.failed = 0
+        self.errors: Dict[str, int] = {}
+        self.total_tokens = 0
+        self.prompt_tokens = 0
+        self.total_time = 0.0
+        self.ttft_sum = 0.0
+        self.streamed = 0
+        self.tpots = [0.0, 0]
+        self.decode_speeds = [0.0, 0]
+
+    def add(self, r: Dict):
+        self.queue_delay.record(max(0.0, r.get('queue_delay_ms', 0)))
+        if not r.get('success', False):
+            self.failed += 1
+            error_type = r.get('error_type', 'unknown')
+            self.errors[error_type] = self.errors.get(error_type, 0) + 1
+            return
+        self.successful += 1
+        self.total_tokens += r.get('tokens', 0)
+        self.prompt_tokens += r.get('prompt_tokens', 0)
+        self.total_time += r['time']
+        self.histograms['latency'].record(r['time'] * 1000)
+        if 'queue_delay_ms' in r:
+            self.histograms['corrected_latency'].record(r['time'] * 1000 + max(0.0, r['queue_delay_ms']))
+        if 'ttft_ms' in r:
+            self.streamed += 1
+            self.ttft_sum += r['ttft_ms']
+            self.histograms['ttft'].record(r['ttft_ms'])
+            self.histograms['itl'].record_many(r.get('itl_ms', []))
+            if r['tpot_ms'] > 0:
+                self.tpots[0] += r['tpot_ms']
+                self.tpots[1] += 1
+            if r['decode_tok_s'] > 0:
+                self.decode_speeds[0] += r['decode_tok_s']
+                self.decode_speeds[1] += 1
+
+    def merge(self, other: 'ReplayStats') -> 'ReplayStats':
+        """Fold another aggregate (e.g. from a worker process) into this one"""
+        for metric, histogram in other.histograms.items():
+            self.histograms.setdefault(metric, LatencyHistogram()).merge(histogram)
+        self.queue_delay.merge(other.queue_delay)
+        for error_type, count in other.errors.items():
+            self.errors[error_type] = self.errors.get(error_type, 0) + count
+        for name in ('successful', 'failed', 'total_tokens', 'prompt_tokens', 'total_time',
+                     'ttft_sum', 'streamed'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.tpots = [x + y for x, y in zip(self.tpots, other.tpots)]
+        self.decode_speeds = [x + y for x, y in zip(self.decode_speeds, other.decode_speeds)]
+        return self
+
+    def to_dict(self) -> Dict:
+        """Plain-dict form for transport between processes"""
+        data = dict(vars(self))
+        data['histograms'] = {metric: h.to_dict() for metric, h in self.histograms.items()}
+        data['queue_delay'] = self.queue_delay.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ReplayStats':
+        stats = cls()
+        vars(stats).update(data)
+        stats.histograms = {metric: LatencyHistogram.from_dict(h) for metric, h in data['histograms'].items()}
+        stats.queue_delay = LatencyHistogram.from_dict(data['queue_delay'])
+        return stats
+
+    def stream_stats(self) -> Dict:
+        """Same fields as summarize_stream_results()"""
+        if not self.streamed:
+            return {}
+        return {
+            'avg_ttft_ms': self.ttft_sum / self.streamed,
+            'avg_tpot_ms': self.tpots[0] / self.tpots[1] if self.tpots[1] else 0,
+            'decode_tok_s': self.decode_speeds[0] / self.decode_speeds[1] if self.decode_speeds[1] else 0
+        }
+
+def build_histograms(results: List[Dict]) -> Dict[str, LatencyHistogram]:
+    """Histogram e2e latency, TTFT and per-token latency from per-request records"""
+    histograms = {metric: LatencyHistogram() for metric in HISTOGRAM_METRICS}
+    for r in results:
+        if not r.get('success', False):
+            continue
+        histograms['latency'].record(r['time'] * 1000)
+        if 'queue_delay_ms' in r:
+            # Scheduled dispatch (open loop, trace replay, burst start): latency from the intended send time
+            histograms['corrected_latency'].record(r['time'] * 1000 + max(0.0, r['queue_delay_ms']))
+        if 'ttft_ms' in r:
+            histograms['ttft'].record(r['ttft_ms'])
+            histograms['itl'].record_many(r.get('itl_ms', []))
+    return histograms
+
+def correct_coordinated_omission(histograms: Dict[str, LatencyHistogram],
+                                 expected_interval_ms: Optional[float] = None) -> float:
+    """
+    Fill 'corrected_latency' for closed-loop runs, where requests have no intended send time
+
+    The expected interval between one user's requests defaults to the median latency (the
+    user's cycle time when the server is not stalling). Returns the interval used.
+    """
+    latency = histograms['latency']
+    interval = expected_interval_ms or latency.percentile(50)
+    histograms['corrected_latency'] = latency.corrected(interval)
+    return interval
+
+def merge_histograms(parts: List[Dict[str, LatencyHistogram]]) -> Dict[str, LatencyHistogram]:
+    """Merge per-run / per-worker histogram sets metric by metric"""
+    merged = {metric: LatencyHistogram() for metric in HISTOGRAM_METRICS}
+    for part in parts:
+        for metric, histogram in part.items():
+            merged.setdefault(metric, LatencyHistogram()).merge(histogram)
+    return merged
+
+def percentile_fields(histograms: Dict[str, LatencyHistogram]) -> Dict:
+    """Flatten histograms into CSV fields such as latency_p99_ms / ttft_p99_9_ms / itl_max_ms"""
+    fields = {}
+    for metric, histogram in histograms.items():
+        if not histogram.count:
+            continue
+        for pct in PERCENTILES:
+            fields[f"{metric}_{percentile_label(pct)}_ms"] = histogram.percentile(pct)
+        fields[f"{metric}_max_ms"] = histogram.max()
+    return fields
+
+def print_percentiles(histograms: Dict[str, LatencyHistogram]):
+    """Print one line of p50/p90/p95/p99/p99.9/max per recorded metric"""
+    labels = {'latency': 'Latency', 'corrected_latency': 'Latency (CO-corrected)', 'ttft': 'TTFT',
+              'itl': 'Per-token'}
+    for metric, histogram in histograms.items():
+        if not histogram.count:
+            continue
+        values = ' / '.join(f"{histogram.percentile(p):.1f}" for p in PERCENTILES)
+        print(f"   {labels.get(metric, metric)} p50/p90/p95/p99/p99.9: {values} ms "
+              f"(max {histogram.max():.1f} ms)")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Input/output length sweep for Qwen3-8B servers
+Runs a grid of exact prompt token lengths x output lengths (up to --max-model-len) and
+reports prefill tok/s, decode tok/s and latency per cell, as one CSV row per cell plus
+printed input x output matrices ready to plot as heatmaps.
+"""
+
+import asyncio
+import argparse
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bench_client import check_health, run_request
+from bench_stats import mean
+from comprehensive_benchmark import save_results
+from load_generator import test_workload
+from prompt_synth import PROMPT_CACHE, LocalTokenizer, ServerTokenizer, exact_prompts
+
+DEFAULT_INPUT_LENS = [128, 512, 2048, 8192, 16384, 31744]
+DEFAULT_OUTPUT_LENS = [64, 256, 1024]
+DEFAULT_MAX_MODEL_LEN = 32768
+
+# Metric -> heatmap title
+HEATMAP_METRICS = {
+    'prefill_tok_s': 'Prefill tok/s (prompt tokens / TTFT)',
+    'decode_tok_s': 'Decode tok/s per request',
+    'latency_p50_ms': 'p50 end-to-end latency (ms)'
+}
+
+LENGTH_FIELDS = ['server', 'test_type', 'input_tokens', 'output_tokens', 'num_users', 'successful_requests',
+                 'failed_requests', 'avg_prompt_tokens', 'avg_output_tokens', 'prefill_tok_s', 'decode_tok_s',
+                 'avg_ttft_ms', 'ttft_p50_ms', 'avg_tpot_ms', 'latency_p50_ms', 'latency_p99_ms',
+                 'throughput_tok_s', 'requests_per_second']
+
+def test_length_cell(port: int, server_name: str, prompts: List[Dict], input_tokens: int, output_tokens: int,
+                     concurrency: int = 1, model: str = "Qwen/Qwen3-8B") -> Dict:
+    """Stream every prompt with exactly `output_tokens` generated (ignore_eos) and summarize the cell"""
+    payloads = [{
+        "model": model,
+        "prompt": p['text'],
+        "max_tokens": output_tokens,
+        "temperature": 0.7,
+        "ignore_eos": True,
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    } for p in prompts]
+    result = asyncio.run(test_workload(port, server_name, payloads, concurrency,
+                                       test_type=f"len_{input_tokens}_in_{output_tokens}_out"))
+    successful = [r for r in result['requests'] if r.get('success')]
+
+    # TTFT of a lone request is dominated by prefill, so prompt tokens / TTFT approximates prefill speed
+    prefill_rates = [r['prompt_tokens'] / (r['ttft_ms'] / 1000) for r in successful
+                     if r.get('ttft_ms') and r.get('prompt_tokens')]
+    result.update({
+        'input_tokens': input_tokens,
+        'output_tokens': output_tokens,
+        'avg_prompt_tokens': mean([r.get('prompt_tokens', 0) for r in successful]),
+        'avg_output_tokens': mean([r.get('tokens', 0) for r in successful]),
+        'prefill_tok_s': mean(prefill_rates)
+    })
+    print(f"   Prefill: {result['prefill_tok_s']:.0f} tok/s, decode: {result.get('decode_tok_s', 0):.1f} tok/s")
+    return result
+
+def run_length_grid(port: int, server_name: str, input_lens: List[int], output_lens: List[int],
+                    repeats: int = 3, concurrency: int = 1, max_model_len: int = DEFAULT_MAX_MODEL_LEN,
+                    tokenizer_path: Optional[str] = None, cache_path: Optional[str] = PROMPT_CACHE,
+                    model: str = "Qwen/Qwen3-8B", cooldown: float = 2) -> List[Dict]:
+    """
+    Run every (input, output) cell that fits in `max_model_len`; `repeats` distinct prompts per cell
+
+    Every cell gets its own prompt variants, so with prefix caching on no cell reuses the
+    prompts (and skips the prefill) of an earlier output length.
+    """
+    tokenizer = LocalTokenizer(tokenizer_path) if tokenizer_path else ServerTokenizer(port, model)
+    print(f"🔤 Synthesizing prompts for {len(input_lens)} input lengths with {tokenizer.name}...")
+    prompts = exact_prompts(tokenizer, input_lens, repeats * len(output_lens), cache_path)
+
+    # Absorb CUDA graph capture / first-request warmup outside the grid
+    run_request(f"http://localhost:{port}/v1/completions",
+                {"model": model, "prompt": "Hello", "max_tokens": 8, "temperature": 0.7})
+
+    results = []
+    for input_tokens in input_lens:
+        for column, output_tokens in enumerate(output_lens):
+            if input_tokens + output_tokens > max_model_len:
+                print(f"\n⏭️ Skipping {input_tokens} in / {output_tokens} out (exceeds max model len {max_model_len})")
+                continue
+            cell_prompts = prompts[input_tokens][column * repeats:(column + 1) * repeats]
+            results.append(test_length_cell(port, server_name, cell_prompts, input_tokens,
+                                            output_tokens, concurrency, model))
+            time.sleep(cooldown)
+
+    print_heatmaps(results, input_lens, output_lens)
+    return results
+
+def print_heatmaps(results: List[Dict], input_lens: List[int], output_lens: List[int]):
+    """One input x output matrix per metric"""
+    cells = {(r['input_tokens'], r['output_tokens']): r for r in results}
+    for metric, title in HEATMAP_METRICS.items():
+        print(f"\n{'='*60}")
+        print(f"📊 {title}")
+        print(f"{'='*60}")
+        print("\n| Input \\ Output | " + ' | '.join(f"{o:>8}" for o in output_lens) + " |")
+        print("|----------------|" + '|'.join('-' * 10 for _ in output_lens) + "|")
+        for i in input_lens:
+            values = [f"{cells[(i, o)].get(metric, 0):>8.1f}" if (i, o) in cells else f"{'-':>8}"
+                      for o in output_lens]
+            print(f"| {i:>14} | " + ' | '.join(values) + " |")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Input/output length sweep")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server', default='vLLM')
+    parser.add_argument('--model', default="Qwen/Qwen3-8B")
+    parser.add_argument('--inputs', type=int, nargs='+', default=DEFAULT_INPUT_LENS, help="prompt token lengths")
+    parser.add_argument('--outputs', type=int, nargs='+', default=DEFAULT_OUTPUT_LENS, help="output token lengths")
+    parser.add_argument('--repeats', type=int, default=3, help="distinct prompts per cell")
+    parser.add_argument('--users', type=int, default=1, help="concurrency within a cell")
+    parser.add_argument('--max-model-len', type=int, default=DEFAULT_MAX_MODEL_LEN)
+    parser.add_argument('--tokenizer', help="local tokenizer.json (default: the server's /tokenize endpoint)")
+    parser.add_argument('--prompt-cache', default=PROMPT_CACHE, help="synthesized prompt cache file")
+    args = parser.parse_args()
+
+    if not check_health(f"http://localhost:{args.port}/health"):
+        print(f"❌ {args.server} is not healthy on port {args.port}")
+        raise SystemExit(1)
+
+    results = run_length_grid(args.port, args.server, args.inputs, args.outputs, args.repeats, args.users,
+                              args.max_model_len, args.tokenizer, args.prompt_cache, args.model)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_results(results, f"length_sweep_{args.server.lower()}_{timestamp}", LENGTH_FIELDS, config=vars(args))
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Load generators for Qwen3-8B servers
+Open loop: requests arrive at a target rate (Poisson, constant or bursty) for a fixed
+duration, independent of how fast the server answers.
+Closed loop: N virtual users each send their next request as soon as the last one returns.
+"""
+
+import asyncio
+import argparse
+import random
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from bench_client import BenchClient, encode_payload, print_client_stats
+from comprehensive_benchmark import (
+    concurrent_request, get_gpu_memory_usage, percentile, save_results, summarize_stream_results
+)
+from goodput import goodput_fields, parse_request_slo, print_goodput
+from gpu_sampler import GPUSampler
+from latency_histogram import (PERCENTILE_FIELDS, build_histograms, correct_coordinated_omission, percentile_fields,
+                               print_percentiles)
+from server_metrics import (HISTOGRAMS, MetricsPoller, histogram_mean_ms, print_server_report, scrape_metrics,
+                            server_fields)
+from steady_state import print_steady_state, steady_state_fields
+from timeline import TimelineRecorder
+
+PROMPTS = [
+    "Explain quantum computing in simple terms.",
+    "What are the benefits of renewable energy?",
+    "How does machine learning work?",
+    "Describe the water cycle process.",
+    "What causes climate change?",
+    "Explain blockchain technology.",
+    "How do vaccines work?",
+    "What is dark matter?",
+    "Describe photosynthesis.",
+    "How does the internet work?"
+]
+
+ARRIVAL_PATTERNS = ('poisson', 'constant', 'bursty')
+
+OPEN_LOOP_FIELDS = ['server', 'test_type', 'arrival_pattern', 'target_rate_rps', 'offered_rate_rps',
+                    'achieved_rate_rps', 'successful_requests', 'failed_requests', 'in_flight_at_end',
+                    'total_time', 'total_tokens', 'throughput_tok_s', 'window_throughput_tok_s',
+                    'steady_throughput_tok_s', 'steady_duration_s', 'goodput_tok_s', 'goodput_rps',
+                    'slo_attainment', 'avg_response_time', 'p50_response_time', 'p95_response_time', 'p99_response_time',
+                    'avg_dispatch_lag_ms', 'p99_dispatch_lag_ms', 'server_queue_time_ms', 'ttft_baseline_ms',
+                    'ttft_excess_p50_ms', 'ttft_excess_p99_ms', 'vram_initial_gb', 'vram_peak_gb', 'gpu_util_mean',
+                    'avg_ttft_ms', 'avg_tpot_ms', 'decode_tok_s',
+                    'client_cpu_ms_per_request', 'client_cpu_utilization'] + PERCENTILE_FIELDS
+
+def arrival_offsets(rate: float, duration: float, pattern: str = 'poisson',
+                    burstiness: float = 4.0, seed: int = 0) -> Iterator[float]:
+    """
+    Yield send-time offsets (seconds from start) for requests arriving at `rate` req/s
+
+    poisson:  exponential inter-arrival times
+    constant: fixed 1/rate spacing
+    bursty:   gamma inter-arrival times with squared coefficient of variation `burstiness`
+              (same mean rate as poisson, but requests clump together)
+    """
+    if pattern not in ARRIVAL_PATTERNS:
+        raise ValueError(f"Unknown arrival pattern: {pattern} (expected one of {ARRIVAL_PATTERNS})")
+    if rate <= 0:
+        return
+
+    rng = random.Random(seed)
+    t = 0.0
+    while True:
+        if pattern == 'constant':
+            t += 1.0 / rate
+        elif pattern == 'poisson':
+            t += rng.expovariate(rate)
+        else:
+            shape = 1.0 / burstiness
+            t += rng.gammavariate(shape, 1.0 / (rate * shape))
+        if t >= duration:
+            return
+        yield t
+
+async def timed_request(client, url, payload, request_id, intended_time: float) -> Dict:
+    """Run one request; the client records how late it was dispatched relative to its schedule"""
+    body = encode_payload(payload)
+    result = await concurrent_request(client, url, payload, request_id, body, enqueued_at=intended_time)
+    result['finish_time'] = time.perf_counter()
+    return result
+
+def completion_rate(successful: List[Dict], start_time: float, duration: float) -> float:
+    """
+    Rate (req/s) at which the requests sent in the window completed, drain included
+
+    The window is stretched to the last completion minus the fastest latency, so requests
+    still running when sending stops are not lost: it matches the offered rate while the
+    server keeps up and falls to the service rate once a backlog builds up.
+    """
+    if not successful or duration <= 0:
+        return 0
+    last_finish = max(r['finish_time'] for r in successful)
+    fastest = min(r['time'] for r in successful)
+    return len(successful) / max(duration, last_finish - start_time - fastest)
+
+async def unloaded_ttft(client: BenchClient, url: str, max_tokens: int, probes: int = 3) -> Optional[float]:
+    """Fastest TTFT (ms) of a few serial streamed requests on an idle server: the no-queue baseline"""
+    ttfts = []
+    for i in range(probes):
+        payload = {
+            "model": "Qwen/Qwen3-8B",
+            "prompt": PROMPTS[i % len(PROMPTS)],
+            "max_tokens": max_tokens,
+            "temperature": 0.7,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        record = await concurrent_request(client, url, payload, f"baseline-{i}", encode_payload(payload))
+        if record.get('success') and record.get('ttft_ms'):
+            ttfts.append(record['ttft_ms'])
+    return min(ttfts) if ttfts else None
+
+async def test_open_loop(port: int, server_name: str, rate: float, duration: float = 60,
+                         pattern: str = 'poisson', max_tokens: int = 200, stream: bool = False,
+                         burstiness: float = 4.0, seed: int = 0, drain_timeout: float = 120,
+                         gpu_backend: str = 'auto', gpu_interval: float = 0.1,
+                         timeline: Optional[TimelineRecorder] = None,
+                         scrape_interval: Optional[float] = None, warmup_s: float = 0,
+                         cooldown_s: float = 0, slo: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    Drive the server with open-loop arrivals at `rate` req/s for `duration` seconds
+
+    Dispatch lag is how late the client sent each request against its schedule; it says
+    nothing about the server. Server queueing comes from the server's queue-time histogram
+    in /metrics and, for streamed runs, from TTFT above an unloaded TTFT baseline.
+    """
+    url = f"http://localhost:{port}/v1/completions"
+
+    print(f"\n{'='*60}")
+    print(f"Testing {server_name} - OPEN LOOP {rate:g} req/s ({pattern}, {duration:g}s)")
+    print(f"{'='*60}")
+
+    initial_gpu = get_gpu_memory_usage()
+    print(f"📊 Initial VRAM: {initial_gpu.get('memory_used_gb', 'N/A')} GB")
+
+    # No client-side connection cap: an open-loop generator must never hold back arrivals
+    sampler = GPUSampler(gpu_backend, gpu_interval).start()
+    poller = MetricsPoller(port, scrape_interval).start() if scrape_interval else None
+    async with BenchClient(pool_size=0, timeline=timeline) as client:
+        ttft_baseline = await unloaded_ttft(client, url, min(max_tokens, 8)) if stream else None
+        before = await asyncio.to_thread(scrape_metrics, port)
+        tasks = []
+        print(f"🚀 Offering {rate:g} req/s for {duration:g}s...")
+        start_time = time.perf_counter()
+        start_wall = time.time()
+
+        for i, offset in enumerate(arrival_offsets(rate, duration, pattern, burstiness, seed)):
+            intended_time = start_time + offset
+            delay = intended_time - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            payload = {
+                "model": "Qwen/Qwen3-8B",
+                "prompt": PROMPTS[i % len(PROMPTS)],
+                "max_tokens": max_tokens,
+                "temperature": 0.7,
+                "stream": stream
+            }
+            if stream:
+                payload["stream_options"] = {"include_usage": True}
+            tasks.append(asyncio.create_task(timed_request(client, url, payload, i, intended_time)))
+
+        send_end_time = time.perf_counter()
+        in_flight_at_end = sum(1 for t in tasks if not t.done())
+
+        # Let outstanding requests drain, but don't wait forever on a saturated server
+        done, pending = await asyncio.wait(tasks, timeout=drain_timeout) if tasks else (set(), set())
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        end_time = time.perf_counter()
+        client_stats = client.stats()
+        after = await asyncio.to_thread(scrape_metrics, port)
+
+    sampler.stop()
+    gpu_stats = sampler.summary()
+    if poller:
+        poller.stop()
+
+    results = [t.result() for t in done]
+    successful = [r for r in results if r.get('success', False)]
+    failed = [r for r in results if not r.get('success', False)]
+
+    offered_rate = len(tasks) / duration if duration > 0 else 0
+    achieved_rate = completion_rate(successful, start_time, duration)
+
+    latencies = [r['time'] for r in successful]
+    histograms = build_histograms(successful)
+    # queue_delay_ms on a record is client dispatch lag: the send time minus the scheduled time
+    dispatch_lags = [r['queue_delay_ms'] for r in results]
+    server_queue_ms = histogram_mean_ms(before, after, HISTOGRAMS['queue_time_ms'])
+    ttft_excess = ([max(0.0, r['ttft_ms'] - ttft_baseline) for r in successful if 'ttft_ms' in r]
+                   if ttft_baseline is not None else [])
+    total_tokens = sum(r.get('tokens', 0) for r in successful)
+    total_time = end_time - start_time
+    throughput = total_tokens / total_time if total_time > 0 else 0
+    steady_stats = steady_state_fields(results, start_wall, start_wall + total_time, warmup_s, cooldown_s)
+    goodput_stats = goodput_fields(results, total_time, slo, sent=len(tasks))
+
+    print(f"✅ Completed {len(successful)}/{len(tasks)} requests ({len(pending)} still pending after drain)")
+    print(f"   Offered rate: {offered_rate:.2f} req/s (target {rate:g})")
+    print(f"   Achieved rate: {achieved_rate:.2f} req/s (completions of the requests sent, drain included)")
+    print_steady_state(steady_stats, throughput)
+    print_goodput(goodput_stats, slo)
+    print(f"   In flight when sending stopped: {in_flight_at_end}")
+    print_percentiles(histograms)
+    print(f"   Dispatch lag p50/p99: {percentile(dispatch_lags, 50):.1f} ms / {percentile(dispatch_lags, 99):.1f} ms "
+          f"(client sending late, not server queueing)")
+    if server_queue_ms is not None:
+        print(f"   Server queue time (mean, /metrics): {server_queue_ms:.1f} ms")
+    if ttft_excess:
+        print(f"   TTFT above unloaded {ttft_baseline:.1f} ms p50/p99: {percentile(ttft_excess, 50):.1f} ms / "
+              f"{percentile(ttft_excess, 99):.1f} ms (server queueing and batching)")
+    stream_stats = summarize_stream_results(successful)
+    if stream_stats:
+        print(f"   Avg TTFT: {stream_stats['avg_ttft_ms']:.1f} ms")
+
+    print_client_stats(client_stats)
+    if poller:
+        print_server_report(poller, results)
+
+    if failed or pending:
+        print(f"   ⚠️ Failed requests: {len(failed)}, timed out in drain: {len(pending)}")
+
+    return {
+        'server': server_name,
+        'test_type': f'open_loop_{rate:g}_rps',
+        'arrival_pattern': pattern,
+        'offered_rate_rps': offered_rate,
+        'target_rate_rps': rate,
+        'achieved_rate_rps': achieved_rate,
+        'successful_requests': len(successful),
+        'failed_requests': len(failed) + len(pending),
+        'in_flight_at_end': in_flight_at_end,
+        'send_duration': send_end_time - start_time,
+        'total_time': total_time,
+        'total_tokens': total_tokens,
+        'throughput_tok_s': throughput,
+        'avg_response_time': sum(latencies) / len(latencies) if latencies else 0,
+        'p50_response_time': histograms['latency'].percentile(50) / 1000,
+        'p95_response_time': histograms['latency'].percentile(95) / 1000,
+        'p99_response_time': histograms['latency'].percentile(99) / 1000,
+        'avg_dispatch_lag_ms': sum(dispatch_lags) / len(dispatch_lags) if dispatch_lags else 0,
+        'p99_dispatch_lag_ms': percentile(dispatch_lags, 99),
+        'server_queue_time_ms': server_queue_ms if server_queue_ms is not None else '',
+        'ttft_baseline_ms': ttft_baseline if ttft_baseline is not None else '',
+        'ttft_excess_p50_ms': percentile(ttft_excess, 50) if ttft_excess else '',
+        'ttft_excess_p99_ms': percentile(ttft_excess, 99) if ttft_excess else '',
+        'vram_initial_gb': initial_gpu.get('memory_used_gb', 0),
+        'vram_peak_gb': gpu_stats.get('vram_peak_gb', get_gpu_memory_usage().get('memory_used_gb', 0)),
+        'gpu_util_mean': gpu_stats.get('gpu_util_mean', 0),
+        'gpu_samples': sampler.samples,
+        'histograms': histograms,
+        'requests': results,
+        **server_fields(poller, sampler.samples),
+        **steady_stats,
+        **goodput_stats,
+        **percentile_fields(histograms),
+        **stream_stats,
+        **client_stats
+    }
+
+async def test_closed_loop(port: int, server_name: str, num_users: int, duration: float = 30,
+                           max_tokens: int = 200, stream: bool = False,
+                           gpu_backend: str = 'auto', gpu_interval: float = 0.1,
+                           timeline: Optional[TimelineRecorder] = None,
+                           scrape_interval: Optional[float] = None, warmup_s: float = 0,
+                           cooldown_s: float = 0, slo: Optional[Dict[str, float]] = None,
+                           co_interval_ms: Optional[float] = None) -> Dict:
+    """
+    Keep `num_users` virtual users busy for `duration` seconds (steady concurrency, not a single burst)
+
+    Users wait for each response before sending again, so a stall also stops new requests
+    (coordinated omission). Corrected latency percentiles assume each user meant to send
+    every `co_interval_ms` (default: the median latency).
+    """
+    url = f"http://localhost:{port}/v1/completions"
+
+    print(f"\n{'='*60}")
+    print(f"Testing {server_name} - CLOSED LOOP {num_users} USERS ({duration:g}s)")
+    print(f"{'='*60}")
+
+    initial_gpu = get_gpu_memory_usage()
+    print(f"📊 Initial VRAM: {initial_gpu.get('memory_used_gb', 'N/A')} GB")
+
+    sampler = GPUSampler(gpu_backend, gpu_interval).start()
+    poller = MetricsPoller(port, scrape_interval).start() if scrape_interval else None
+    async with BenchClient(pool_size=0, timeline=timeline) as client:
+        await client.prewarm(f"http://localhost:{port}/health", num_users)
+
+        async def virtual_user(user_id: int) -> List[Dict]:
+            records = []
+            turn = 0
+            while time.perf_counter() < deadline:
+                payload = {
+                    "model": "Qwen/Qwen3-8B",
+                    "prompt": PROMPTS[(user_id + turn) % len(PROMPTS)],
+                    "max_tokens": max_tokens,
+                    "temperature": 0.7,
+                    "stream": stream
+                }
+                if stream:
+                    payload["stream_options"] = {"include_usage": True}
+                record = await concurrent_request(client, url, payload, f"{user_id}-{turn}",
+                                                  encode_payload(payload))
+                record['finish_time'] = time.perf_counter()
+                records.append(record)
+                turn += 1
+            return records
+
+        print(f"🚀 Running {num_users} users for {duration:g}s...")
+        start_time = time.perf_counter()
+        start_wall = time.time()
+        deadline = start_time + duration
+        per_user = await asyncio.gather(*(virtual_user(u) for u in range(num_users)))
+        end_time = time.perf_counter()
+        client_stats = client.stats()
+
+    sampler.stop()
+    gpu_stats = sampler.summary()
+    if poller:
+        poller.stop()
+
+    results = [r for records in per_user for r in records]
+    successful = [r for r in results if r.get('success', False)]
+    failed = [r for r in results if not r.get('success', False)]
+    total_time = end_time - start_time
+    total_tokens = sum(r.get('tokens', 0) for r in successful)
+    throughput = total_tokens / total_time if total_time > 0 else 0
+    histograms = build_histograms(successful)
+    co_interval = correct_coordinated_omission(histograms, co_interval_ms)
+    stream_stats = summarize_stream_results(successful)
+    steady_stats = steady_state_fields(results, start_wall, start_wall + total_time, warmup_s, cooldown_s)
+    goodput_stats = goodput_fields(results, total_time, slo)
+
+    print(f"✅ Completed {len(successful)}/{len(results)} requests")
+    print(f"   Throughput: {throughput:.2f} tok/s, {len(successful) / total_time:.2f} req/s")
+    print_steady_state(steady_stats, throughput)
+    print_goodput(goodput_stats, slo)
+    print_percentiles(histograms)
+    print(f"   CO correction assumes one request per user every {co_interval:.1f} ms")
+    print_client_stats(client_stats)
+    if poller:
+        print_server_report(poller, results)
+    if failed:
+        print(f"   ⚠️ Failed requests: {len(failed)}")
+
+    return {
+        'server': server_name,
+        'test_type': f'closed_loop_{num_users}_users',
+        'num_users': num_users,
+        'co_interval_ms': co_interval,
+        'successful_requests': len(successful),
+        'failed_requests': len(failed),
+        'total_time': total_time,
+        'total_tokens': total_tokens,
+        'throughput_tok_s': throughput,
+        'requests_per_second': len(successful) / total_time if total_time > 0 else 0,
+        'avg_response_time': (sum(r['time'] for r in successful) / len(successful)) if successful else 0,
+        'vram_initial_gb': initial_gpu.get('memory_used_gb', 0),
+        'vram_peak_gb': gpu_stats.get('vram_peak_gb', get_gpu_memory_usage().get('memory_used_gb', 0)),
+        'gpu_util_mean': gpu_stats.get('gpu_util_mean', 0),
+        'gpu_samples': sampler.samples,
+        'histograms': histograms,
+        'requests': results,
+        **server_fields(poller, sampler.samples),
+        **steady_stats,
+        **goodput_stats,
+        **percentile_fields(histograms),
+        **stream_stats,
+        **client_stats
+    }
+
+async def test_workload(port: int, server_name: str, payloads: List[Dict], concurrency: int,
+                        test_type: str = 'workload', endpoint: str = '/v1/completions',
+                        gpu_backend: str = 'auto', gpu_interval: float = 0.1) -> Dict:
+    """Run a fixed list of request payloads through `concurrency` workers (closed loop)"""
+    url = f"http://localhost:{port}{endpoint}"
+
+    print(f"\n{'='*60}")
+    print(f"Testing {server_name} - {test_type}: {len(payloads)} requests, concurrency {concurrency}")
+    print(f"{'='*60}")
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for i, payload in enumerate(payloads):
+        queue.put_nowait((i, payload, encode_payload(payload)))
+
+    sampler = GPUSampler(gpu_backend, gpu_interval).start()
+    async with BenchClient(pool_size=0) as client:
+        await client.prewarm(f"http://localhost:{port}/health", concurrency)
+
+        async def worker() -> List[Dict]:
+            records = []
+            while not queue.empty():
+                i, payload, body = queue.get_nowait()
+                record = await concurrent_request(client, url, payload, i, body)
+                record['finish_time'] = time.perf_counter()
+                records.append(record)
+            return records
+
+        start_time = time.perf_counter()
+        per_worker = await asyncio.gather(*(worker() for _ in range(concurrency)))
+        end_time = time.perf_counter()
+        client_stats = client.stats()
+
+    sampler.stop()
+    gpu_stats = sampler.summary()
+
+    results = sorted((r for records in per_worker for r in records), key=lambda r: r['request_id'])
+    successful = [r for r in results if r.get('success', False)]
+    failed = [r for r in results if not r.get('success', False)]
+    total_time = end_time - start_time
+    total_tokens = sum(r.get('tokens', 0) for r in successful)
+    prompt_tokens = sum(r.get('prompt_tokens', 0) for r in successful)
+    histograms = build_histograms(successful)
+    co_interval = correct_coordinated_omission(histograms)
+    stream_stats = summarize_stream_results(successful)
+
+    print(f"✅ Completed {len(successful)}/{len(results)} requests in {total_time:.2f}s")
+    print(f"   Throughput: {total_tokens / total_time if total_time > 0 else 0:.2f} tok/s")
+    print_percentiles(histograms)
+    print(f"   CO correction assumes one request per worker every {co_interval:.1f} ms")
+    if failed:
+        print(f"   ⚠️ Failed requests: {len(failed)}")
+
+    return {
+        'server': server_name,
+        'test_type': test_type,
+        'num_users': concurrency,
+        'co_interval_ms': co_interval,
+        'successful_requests': len(successful),
+        'failed_requests': len(failed),
+        'total_time': total_time,
+        'total_tokens': total_tokens,
+        'prompt_tokens': prompt_tokens,
+        'throughput_tok_s': total_tokens / total_time if total_time > 0 else 0,
+        'prefill_tok_s': prompt_tokens / total_time if total_time > 0 else 0,
+        'requests_per_second': len(successful) / total_time if total_time > 0 else 0,
+        'avg_response_time': (sum(r['time'] for r in successful) / len(successful)) if successful else 0,
+        'vram_peak_gb': gpu_stats.get('vram_peak_gb', 0),
+        'gpu_samples': sampler.samples,
+        'histograms': histograms,
+        'requests': results,
+        **percentile_fields(histograms),
+        **stream_stats,
+        **client_stats
+    }
+
+def run_rate_series(port: int, server_name: str, rates: List[float], duration: float = 60,
+                    pattern: str = 'poisson', max_tokens: int = 200, stream: bool = False,
+                    timeline_sample: Optional[float] = None,
+                    scrape_interval: Optional[float] = None, warmup_s: float = 0,
+                    cooldown_s: float = 0, slo: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """Run open-loop tests at increasing request rates"""
+    results = []
+    for rate in rates:
+        timeline = TimelineRecorder(sample_rate=timeline_sample) if timeline_sample else None
+        result = asyncio.run(test_open_loop(port, server_name, rate, duration, pattern, max_tokens, stream,
+                                            timeline=timeline, scrape_interval=scrape_interval,
+                                            warmup_s=warmup_s, cooldown_s=cooldown_s, slo=slo))
+        results.append(result)
+        if timeline:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timeline.export(f"/home/qwen-8b-repo/timeline_{server_name.lower()}_{rate:g}_rps_{timestamp}.json",
+                            result['gpu_samples'], result.get('server_samples'))
+        time.sleep(5)  # Cool down between rates
+
+    print(f"\n{'='*60}")
+    print(f"📊 {server_name} OPEN LOOP SUMMARY")
+    print(f"{'='*60}")
+    print("\n| Offered req/s | Achieved req/s | p50 Latency | p50 Corrected | p99 Latency | p99 Corrected "
+          "| Server Queue | p99 TTFT Excess | p99 Dispatch Lag | Goodput tok/s | SLO % |")
+    print("|---------------|----------------|-------------|---------------|-------------|---------------"
+          "|--------------|-----------------|------------------|---------------|-------|")
+    for r in results:
+        server_queue = f"{r['server_queue_time_ms']:.1f} ms" if r['server_queue_time_ms'] != '' else '-'
+        ttft_excess = f"{r['ttft_excess_p99_ms']:.1f} ms" if r['ttft_excess_p99_ms'] != '' else '-'
+        print(f"| {r['offered_rate_rps']:>13.2f} | {r['achieved_rate_rps']:>14.2f} | "
+              f"{r['p50_response_time']:>10.2f}s | {r.get('corrected_latency_p50_ms', 0) / 1000:>12.2f}s | "
+              f"{r['p99_response_time']:>10.2f}s | {r.get('corrected_latency_p99_ms', 0) / 1000:>12.2f}s | "
+              f"{server_queue:>12} | {ttft_excess:>15} | "
+              f"{r['p99_dispatch_lag_ms']:>13.1f} ms | {r['goodput_tok_s']:>13.2f} | {r['slo_attainment']:>5.0%} |")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop load generator")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server', default='vLLM')
+    parser.add_argument('--rates', type=float, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--pattern', choices=ARRIVAL_PATTERNS, default='poisson')
+    parser.add_argument('--max-tokens', type=int, default=200)
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--timeline-sample', type=float, metavar='FRACTION',
+                        help="export Chrome Trace timelines of this fraction of requests")
+    parser.add_argument('--scrape-interval', type=float, metavar='SECONDS',
+                        help="poll the server's /metrics during each rate and correlate with latency")
+    parser.add_argument('--trim-warmup', type=float, default=0, metavar='SECONDS',
+                        help="exclude this much of the start of each rate from windowed throughput")
+    parser.add_argument('--trim-cooldown', type=float, default=0, metavar='SECONDS',
+                        help="exclude this much of the end of each rate (incl. drain) from windowed throughput")
+    parser.add_argument('--request-slo', nargs='+', metavar='METRIC=MS',
+                        help="per-request SLO for goodput, e.g. ttft_ms=500 tpot_ms=40 latency_ms=20000")
+    args = parser.parse_args()
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    results = run_rate_series(args.port, args.server, args.rates, args.duration,
+                              args.pattern, args.max_tokens, args.stream, args.timeline_sample,
+                              args.scrape_interval, args.trim_warmup, args.trim_cooldown,
+                              parse_request_slo(args.request_slo))
+    save_results(results, f"open_loop_{args.server.lower()}_{timestamp}", OPEN_LOOP_FIELDS, config=vars(args))
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Long-context prefill and KV-capacity benchmark for Qwen3-8B servers
+Measures TTFT and prefill tok/s for single exact-length prompts as context grows to
+--max-model-len, then searches for how many concurrent long-context sequences (16k by
+default, typical RAG traffic) fit in the KV cache before the server queues or preempts,
+using /metrics running/waiting/KV gauges, the preemption counter and GPU samples.
+"""
+
+import asyncio
+import argparse
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bench_client import check_health, run_request
+from comprehensive_benchmark import save_results
+from concurrency_sweep import search_knee
+from length_sweep import DEFAULT_MAX_MODEL_LEN, test_length_cell
+from load_generator import test_workload
+from prompt_synth import (PROMPT_CACHE, LocalTokenizer, PromptCache, ServerTokenizer, exact_prompts,
+                          synthesize_prompt)
+from server_metrics import MetricsPoller, preemptions, scrape_metrics, server_fields
+
+DEFAULT_CONTEXT_LENS = [1024, 2048, 4096, 8192, 16384, 24576, 32000]
+DEFAULT_CAPACITY_CONTEXT = 16384
+
+# Prompt namespace of the capacity probes, kept apart from the prefill sweep's prompts
+CAPACITY_NAMESPACE = 'capacity'
+
+PREFILL_FIELDS = ['server', 'test_type', 'input_tokens', 'output_tokens', 'successful_requests', 'failed_requests',
+                  'avg_prompt_tokens', 'prefill_tok_s', 'avg_ttft_ms', 'ttft_p50_ms', 'ttft_p99_ms',
+                  'ttft_ms_per_1k_tokens', 'vram_peak_gb']
+
+CAPACITY_FIELDS = ['server', 'test_type', 'load', 'meets_slo', 'slo_violations', 'context_tokens',
+                   'output_tokens', 'successful_requests', 'failed_requests', 'server_running_peak',
+                   'server_waiting_peak', 'server_kv_cache_usage_peak', 'capacity_observed', 'queued_sequences',
+                   'preemptions', 'vram_peak_gb', 'ttft_p50_ms', 'ttft_p99_ms', 'throughput_tok_s', 'total_time']
+
+def run_prefill_sweep(port: int, server_name: str, tokenizer, context_lens: List[int], repeats: int = 3,
+                      output_tokens: int = 16, max_model_len: int = DEFAULT_MAX_MODEL_LEN,
+                      cache_path: Optional[str] = PROMPT_CACHE, model: str = "Qwen/Qwen3-8B",
+                      cooldown: float = 2) -> List[Dict]:
+    """One request at a time per context length, with a short output so TTFT is mostly prefill"""
+    context_lens = [c for c in context_lens if c + output_tokens <= max_model_len]
+    print(f"🔤 Synthesizing prompts for {len(context_lens)} context lengths with {tokenizer.name}...")
+    prompts = exact_prompts(tokenizer, context_lens, repeats, cache_path)
+
+    results = []
+    for context in context_lens:
+        result = test_length_cell(port, server_name, prompts[context], context, output_tokens, 1, model)
+        result['test_type'] = f"prefill_{context}"
+        ttft = result.get('ttft_p50_ms', 0)
+        result['ttft_ms_per_1k_tokens'] = ttft / (context / 1000) if ttft else 0
+        results.append(result)
+        time.sleep(cooldown)
+
+    print_prefill_table(results)
+    return results
+
+def print_prefill_table(results: List[Dict]):
+    print(f"\n{'='*60}")
+    print("📊 PREFILL vs CONTEXT LENGTH")
+    print(f"{'='*60}")
+    print("\n| Context | TTFT p50 ms | TTFT p99 ms | ms / 1k tok | Prefill tok/s | vs shortest |")
+    print("|---------|-------------|-------------|-------------|---------------|-------------|")
+    base = next((r['prefill_tok_s'] for r in results if r.get('prefill_tok_s')), 0)
+    for r in results:
+        relative = f"{r['prefill_tok_s'] / base:.2f}x" if base else '-'
+        print(f"| {r['input_tokens']:>7} | {r.get('ttft_p50_ms', 0):>11.1f} | {r.get('ttft_p99_ms', 0):>11.1f} | "
+              f"{r['ttft_ms_per_1k_tokens']:>11.1f} | {r['prefill_tok_s']:>13.0f} | {relative:>11} |")
+
+def test_kv_capacity(port: int, server_name: str, prompts: List[Dict], context_tokens: int, output_tokens: int,
+                     scrape_interval: float = 0.25, model: str = "Qwen/Qwen3-8B", gpu_backend: str = 'auto',
+                     gpu_interval: float = 0.1) -> Dict:
+    """
+    Send all prompts at once and record whether every sequence ran concurrently without preemption
+
+    A probe only fails on evidence: a /metrics scrape taken while it ran showing waiting
+    requests, or a preemption. When no scrape landed inside the probe (it finished within
+    one scrape interval), queueing is unknown and capacity_observed is False.
+    """
+    payloads = [{
+        "model": model,
+        "prompt": p['text'],
+        "max_tokens": output_tokens,
+        "temperature": 0.7,
+        "ignore_eos": True,
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    } for p in prompts]
+    sequences = len(payloads)
+
+    before = scrape_metrics(port)
+    with MetricsPoller(port, scrape_interval) as poller:
+        result = asyncio.run(test_workload(port, server_name, payloads, sequences,
+                                           test_type=f"kv_capacity_{context_tokens}x{sequences}",
+                                           gpu_backend=gpu_backend, gpu_interval=gpu_interval))
+    after = scrape_metrics(port)
+
+    result.update(server_fields(poller, result['gpu_samples']))
+    # Only scrapes taken while sequences were in flight say anything about this probe
+    sent = [r['sent_at'] for r in result['requests'] if 'sent_at' in r]
+    done = [r['sent_at'] + r.get('time', 0) for r in result['requests'] if 'sent_at' in r]
+    during = [s for s in poller.samples if sent and min(sent) <= s['timestamp'] <= max(done)]
+    result.update({
+        'context_tokens': context_tokens,
+        'output_tokens': output_tokens,
+        'capacity_observed': bool(during),
+        'queued_sequences': max((s.get('waiting', 0) for s in during), default=0),
+        'preemptions': preemptions(before, after)
+    })
+    preempted = f"{result['preemptions']:.0f}" if result['preemptions'] is not None else 'n/a'
+    if not during:
+        print(f"   ⚠️ No /metrics scrape landed while the probe ran (under {scrape_interval:g}s); "
+              f"queueing unknown, preemptions {preempted}")
+        return result
+    print(f"   Running peak {max(s.get('running', 0) for s in during):.0f}/{sequences}, "
+          f"waiting peak {result['queued_sequences']:.0f}, "
+          f"KV cache peak {result.get('server_kv_cache_usage_peak', 0) * 100:.0f}%, preemptions {preempted}")
+    return result
+
+def run_capacity_search(port: int, server_name: str, tokenizer, context_tokens: int = DEFAULT_CAPACITY_CONTEXT,
+                        output_tokens: int = 256, start: int = 1, limit: int = 64,
+                        scrape_interval: float = 0.25, cache_path: Optional[str] = PROMPT_CACHE,
+                        model: str = "Qwen/Qwen3-8B", gpu_backend: str = 'auto',
+                        gpu_interval: float = 0.1) -> Dict:
+    """
+    Largest number of concurrent `context_tokens` sequences that all run at once without preemption
+
+    Doubles the sequence count until one probe queues or preempts, then bisects. Every probe
+    uses fresh prompts from their own namespace, so prefix caching never shares KV blocks
+    between probes or with prompts the prefill sweep (or length_sweep.py) already sent.
+    """
+    baseline = scrape_metrics(port)
+    if not any(name in baseline for name in ('vllm:num_requests_running', 'sglang:num_running_reqs')):
+        print(f"❌ {server_name} /metrics has no running-requests gauge; cannot detect KV capacity")
+        return {'best_load': None, 'first_failing_load': None, 'best_result': None, 'probes': []}
+
+    print(f"\n{'#'*60}")
+    print(f"# KV CAPACITY SEARCH: {server_name}, {context_tokens}-token contexts + {output_tokens} output")
+    print(f"{'#'*60}")
+
+    cache = PromptCache(cache_path) if cache_path else None
+    next_variant = 0
+
+    def probe(load):
+        nonlocal next_variant
+        sequences = int(load)
+        variants = range(next_variant, next_variant + sequences)
+        next_variant += sequences
+        print(f"\n🔤 Synthesizing {sequences} x {context_tokens}-token prompts...")
+        prompts = [cache.get(tokenizer, context_tokens, v, CAPACITY_NAMESPACE) if cache
+                   else synthesize_prompt(tokenizer, context_tokens, v, CAPACITY_NAMESPACE) for v in variants]
+        if cache:
+            cache.save()
+        return test_kv_capacity(port, server_name, prompts, context_tokens, output_tokens, scrape_interval,
+                                model, gpu_backend, gpu_interval)
+
+    limits = {'queued_sequences': 0}
+    if preemptions(baseline, baseline) is not None:
+        limits['preemptions'] = 0
+    else:
+        print("⚠️ Server exports no preemption counter; relying on the running-requests peak only")
+
+    sweep = search_knee(probe, limits, start, limit, integer=True, max_error_rate=0)
+    print_capacity_summary(sweep, context_tokens, limit)
+    return sweep
+
+def print_capacity_summary(sweep: Dict, context_tokens: int, limit: int):
+    print(f"\n{'='*60}")
+    print(f"📊 KV CAPACITY AT {context_tokens} TOKENS OF CONTEXT")
+    print(f"{'='*60}")
+    print("\n| Seqs | Fits | Running peak | Waiting peak | KV peak | Preempted | VRAM GB | TTFT p50 ms | TTFT p99 ms |")
+    print("|------|------|--------------|--------------|---------|-----------|---------|-------------|-------------|")
+    for p in sweep['probes']:
+        preempted = f"{p['preemptions']:.0f}" if p.get('preemptions') is not None else '-'
+        fits = '❌' if not p['meets_slo'] else '✅' if p.get('capacity_observed', True) else '❔'
+        print(f"| {p['load']:>4g} | {fits:<4} | {p.get('server_running_peak', 0):>12.0f} | "
+              f"{p.get('server_waiting_peak', 0):>12.0f} | {p.get('server_kv_cache_usage_peak', 0) * 100:>6.0f}% | "
+              f"{preempted:>9} | {p.get('vram_peak_gb', 0):>7.1f} | {p.get('ttft_p50_ms', 0):>11.1f} | "
+              f"{p.get('ttft_p99_ms', 0):>11.1f} |")
+
+    best = sweep['best_result']
+    if not best:
+        print(f"\n❌ Not even {sweep['first_failing_load']:g} sequence(s) of {context_tokens} tokens ran without queueing")
+        return
+    print(f"\n🏆 {sweep['best_load']:g} concurrent {context_tokens}-token sequences fit without queueing or preemption")
+    if not best.get('capacity_observed', True):
+        print("   ⚠️ No /metrics scrape landed during that probe, so only preemptions were checked "
+              "(lower --scrape-interval or raise --capacity-output)")
+    kv_peak = best.get('server_kv_cache_usage_peak', 0)
+    if kv_peak > 0:
+        # Linear estimate from the KV share one passing probe used per sequence
+        print(f"   KV cache per sequence ≈ {kv_peak / best['load'] * 100:.1f}% "
+              f"→ about {best['load'] / kv_peak:.0f} sequences by KV size alone")
+    if sweep['first_failing_load'] is None:
+        print(f"   ⚠️ Still fitting at the search limit ({limit} sequences) - raise --max-seqs")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-context prefill and KV-capacity benchmark")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server', default='vLLM')
+    parser.add_argument('--model', default="Qwen/Qwen3-8B")
+    parser.add_argument('--mode', choices=['prefill', 'capacity', 'both'], default='both')
+    parser.add_argument('--contexts', type=int, nargs='+', default=DEFAULT_CONTEXT_LENS,
+                        help="prompt token lengths for the prefill sweep")
+    parser.add_argument('--repeats', type=int, default=3, help="distinct prompts per context length")
+    parser.add_argument('--max-model-len', type=int, default=DEFAULT_MAX_MODEL_LEN)
+    parser.add_argument('--capacity-context', type=int, default=DEFAULT_CAPACITY_CONTEXT,
+                        help="context length of each sequence in the capacity search")
+    parser.add_argument('--capacity-output', type=int, default=256,
+                        help="tokens generated per sequence; keeps sequences resident long enough to observe")
+    parser.add_argument('--start-seqs', type=int, default=1)
+    parser.add_argument('--max-seqs', type=int, default=64)
+    parser.add_argument('--scrape-interval', type=float, default=0.25)
+    parser.add_argument('--tokenizer', help="local tokenizer.json (default: the server's /tokenize endpoint)")
+    parser.add_argument('--prompt-cache', default=PROMPT_CACHE, help="synthesized prompt cache file")
+    parser.add_argument('--gpu-backend', choices=['auto', 'nvml', 'nvidia-smi', 'none'], default='auto')
+    parser.add_argument('--gpu-interval', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if not check_health(f"http://localhost:{args.port}/health"):
+        print(f"❌ {args.server} is not healthy on port {args.port}")
+        raise SystemExit(1)
+
+    tokenizer = LocalTokenizer(args.tokenizer) if args.tokenizer else ServerTokenizer(args.port, args.model)
+    # Absorb CUDA graph capture / first-request warmup before measuring
+    run_request(f"http://localhost:{args.port}/v1/completions",
+                {"model": args.model, "prompt": "Hello", "max_tokens": 8, "temperature": 0.7})
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if args.mode in ('prefill', 'both'):
+        results = run_prefill_sweep(args.port, args.server, tokenizer, args.contexts, args.repeats,
+                                    max_model_len=args.max_model_len, cache_path=args.prompt_cache, model=args.model)
+        save_results(results, f"long_context_prefill_{args.server.lower()}_{timestamp}", PREFILL_FIELDS,
+                     config=vars(args))
+    if args.mode in ('capacity', 'both'):
+        sweep = run_capacity_search(args.port, args.server, tokenizer, args.capacity_context, args.capacity_output,
+                                    args.start_seqs, args.max_seqs, args.scrape_interval, args.prompt_cache,
+                                    args.model, args.gpu_backend, args.gpu_interval)
+        save_results(sweep['probes'], f"kv_capacity_{args.server.lower()}_{timestamp}", CAPACITY_FIELDS,
+                     config=vars(args))
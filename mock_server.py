@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI-compatible inference server for testing the benchmark harness
+Simulates prefill speed, per-sequence decode speed, continuous-batching slowdown,
+admission queueing (max sequences / KV capacity) and failure injection, so client
+overhead, percentile math and the load generators can be checked against known timings
+"""
+
+import asyncio
+import argparse
+import json
+import random
+import threading
+import time
+from aiohttp import web
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+DEFAULT_CONFIG = {
+    'model': 'Qwen/Qwen3-8B',
+    'prefill_tok_s': 10000.0,     # prompt tokens processed per second
+    'decode_tok_s': 80.0,         # tokens/s for a single running sequence
+    'batch_slowdown': 0.01,       # each extra running sequence slows a decode step by this fraction
+    'max_num_seqs': 256,          # sequences decoded at once; the rest wait in the queue
+    'kv_capacity_tokens': 400000, # KV cache size in tokens (prompt + max_tokens reserved per sequence)
+    'max_model_len': 32768,       # reported by /tokenize
+    'failure_rate': 0.0,          # fraction of requests answered with HTTP 500
+    'enable_prefix_caching': False,
+    'thinking_tokens': 0,         # chat only: reasoning tokens emitted first unless enable_thinking=False
+    'think_tags': False,          # emit reasoning inline as <think>...</think> instead of reasoning_content
+    'block_size': 16,             # tokens per KV block (prefix cache granularity)
+    'seed': 0
+}
+
+CHARS_PER_TOKEN = 4
+
+def count_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token), deterministic for a given prompt"""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+class MockEngine:
+    """Shared scheduler state: running/waiting sequences and KV usage"""
+
+    def __init__(self, config: Dict):
+        self.config = {**DEFAULT_CONFIG, **config}
+        self.rng = random.Random(self.config['seed'])
+        self.running = 0
+        self.waiting = 0
+        self.kv_used = 0
+        self.prompt_tokens_total = 0
+        self.generation_tokens_total = 0
+        self.success_total = 0
+        self.failure_total = 0
+        self.prefix_queries_total = 0
+        self.prefix_hits_total = 0
+        self.queue_time_sum = 0.0
+        self.queue_time_count = 0
+        self.prefix_blocks: OrderedDict = OrderedDict()
+        self.condition: Optional[asyncio.Condition] = None
+
+    def match_prefix(self, prompt: str) -> int:
+        """Number of leading prompt tokens already in the (LRU) prefix cache; caches the rest"""
+        if not self.config['enable_prefix_caching']:
+            return 0
+        block_chars = self.config['block_size'] * CHARS_PER_TOKEN
+        max_blocks = max(1, self.config['kv_capacity_tokens'] // self.config['block_size'])
+        block_hash = None
+        cached_blocks = 0
+        matching = True
+        for start in range(0, len(prompt) - block_chars + 1, block_chars):
+            block_hash = hash((block_hash, prompt[start:start + block_chars]))
+            if matching and block_hash in self.prefix_blocks:
+                cached_blocks += 1
+                self.prefix_blocks.move_to_end(block_hash)
+            else:
+                matching = False
+                self.prefix_blocks[block_hash] = True
+                if len(self.prefix_blocks) > max_blocks:
+                    self.prefix_blocks.popitem(last=False)
+        cached_tokens = cached_blocks * self.config['block_size']
+        self.prefix_queries_total += count_tokens(prompt)
+        self.prefix_hits_total += cached_tokens
+        return cached_tokens
+
+    def step_time(self) -> float:
+        """Seconds per decode step for every running sequence at the current batch size"""
+        slowdown = 1 + self.config['batch_slowdown'] * max(0, self.running - 1)
+        return slowdown / self.config['decode_tok_s']
+
+    async def admit(self, reserved_tokens: int, sequences: int = 1):
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+        async with self.condition:
+            self.waiting += 1
+            queued_at = time.perf_counter()
+            await self.condition.wait_for(
+                lambda: self.running + sequences <= max(self.config['max_num_seqs'], sequences) and
+                self.kv_used + reserved_tokens <= self.config['kv_capacity_tokens'])
+            self.queue_time_sum += time.perf_counter() - queued_at
+            self.queue_time_count += 1
+            self.waiting -= 1
+            self.running += sequences
+            self.kv_used += reserved_tokens
+
+    async def release(self, reserved_tokens: int, sequences: int = 1):
+        async with self.condition:
+            self.running -= sequences
+            self.kv_used -= reserved_tokens
+            self.condition.notify_all()
+
+    @asynccontextmanager
+    async def sequence(self, prompt_tokens: int, max_tokens: int, cached_tokens: int = 0, n: int = 1):
+        """
+        Hold running slots (after queueing and prefill) for the body of the block
+
+        n > 1 (parallel sampling) prefills the prompt once and decodes n sequences that
+        share its KV blocks, so only the generated tokens are reserved per sample.
+        """
+        reserved = prompt_tokens + n * max_tokens
+        await self.admit(reserved, n)
+        try:
+            await asyncio.sleep(max(0, prompt_tokens - cached_tokens) / self.config['prefill_tok_s'])
+            self.prompt_tokens_total += prompt_tokens
+            yield
+        finally:
+            await self.release(reserved, n)
+
+    async def decode_step(self, sequences: int = 1):
+        """Wait one decode step at the current batch size"""
+        await asyncio.sleep(self.step_time())
+        self.generation_tokens_total += sequences
+
+    def metrics_text(self) -> str:
+        """Prometheus exposition in vLLM's metric names"""
+        labels = f'{{model_name="{self.config["model"]}"}}'
+        usage = self.kv_used / self.config['kv_capacity_tokens']
+        lines = [
+            '# HELP vllm:num_requests_running Number of requests currently running on GPU.',
+            '# TYPE vllm:num_requests_running gauge',
+            f'vllm:num_requests_running{labels} {self.running}',
+            '# HELP vllm:num_requests_waiting Number of requests waiting to be processed.',
+            '# TYPE vllm:num_requests_waiting gauge',
+            f'vllm:num_requests_waiting{labels} {self.waiting}',
+            '# HELP vllm:gpu_cache_usage_perc GPU KV-cache usage. 1 means 100 percent usage.',
+            '# TYPE vllm:gpu_cache_usage_perc gauge',
+            f'vllm:gpu_cache_usage_perc{labels} {usage}',
+            '# HELP vllm:prompt_tokens_total Number of prefill tokens processed.',
+            '# TYPE vllm:prompt_tokens_total counter',
+            f'vllm:prompt_tokens_total{labels} {self.prompt_tokens_total}',
+            '# HELP vllm:generation_tokens_total Number of generation tokens processed.',
+            '# TYPE vllm:generation_tokens_total counter',
+            f'vllm:generation_tokens_total{labels} {self.generation_tokens_total}',
+            '# HELP vllm:request_success_total Count of successfully processed requests.',
+            '# TYPE vllm:request_success_total counter',
+            f'vllm:request_success_total{labels} {self.success_total}',
+            '# HELP vllm:request_failure_total Count of failed requests (mock only).',
+            '# TYPE vllm:request_failure_total counter',
+            f'vllm:request_failure_total{labels} {self.failure_total}',
+            '# HELP vllm:prefix_cache_queries_total Prefix cache queries, in terms of number of queried tokens.',
+            '# TYPE vllm:prefix_cache_queries_total counter',
+            f'vllm:prefix_cache_queries_total{labels} {self.prefix_queries_total}',
+            '# HELP vllm:prefix_cache_hits_total Prefix cache hits, in terms of number of cached tokens.',
+            '# TYPE vllm:prefix_cache_hits_total counter',
+            f'vllm:prefix_cache_hits_total{labels} {self.prefix_hits_total}',
+            '# HELP vllm:num_preemptions_total Cumulative number of preemptions (always 0: KV is reserved up front).',
+            '# TYPE vllm:num_preemptions_total counter',
+            f'vllm:num_preemptions_total{labels} 0',
+            '# HELP vllm:request_queue_time_seconds Histogram of time spent in WAITING phase for request.',
+            '# TYPE vllm:request_queue_time_seconds histogram',
+            f'vllm:request_queue_time_seconds_bucket{{le="+Inf",{labels[1:-1]}}} {self.queue_time_count}',
+            f'vllm:request_queue_time_seconds_sum{labels} {self.queue_time_sum}',
+            f'vllm:request_queue_time_seconds_count{labels} {self.queue_time_count}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+def prompt_of(body: Dict, chat: bool) -> str:
+    if not chat:
+        prompt = body.get('prompt', '')
+        return prompt if isinstance(prompt, str) else ' '.join(map(str, prompt))
+    return '\n'.join(str(m.get('content', '')) for m in body.get('messages', []))
+
+def sse(data: Dict) -> bytes:
+    return b'data: ' + json.dumps(data, separators=(',', ':')).encode('utf-8') + b'\n\n'
+
+def make_app(config: Optional[Dict] = None) -> web.Application:
+    engine = MockEngine(config or {})
+    app = web.Application()
+    app['engine'] = engine
+
+    async def health(request):
+        return web.Response(text='')
+
+    async def metrics(request):
+        return web.Response(text=engine.metrics_text(), content_type='text/plain')
+
+    async def completion(request, chat: bool):
+        body = await request.json()
+        if engine.rng.random() < engine.config['failure_rate']:
+            engine.failure_total += 1
+            return web.json_response({'error': {'message': 'injected failure', 'code': 500}}, status=500)
+
+        prompt = prompt_of(body, chat)
+        prompt_tokens = count_tokens(prompt)
+        max_tokens = int(body.get('max_tokens') or 16)
+        n = max(1, int(body.get('n') or 1))
+        # A request that could never fit in the KV cache is rejected, not queued forever
+        if prompt_tokens + n * max_tokens > engine.config['kv_capacity_tokens']:
+            message = (f"Request needs {prompt_tokens + n * max_tokens} KV cache tokens "
+                       f"({prompt_tokens} prompt + {n} x {max_tokens} max_tokens), more than the "
+                       f"{engine.config['kv_capacity_tokens']} available")
+            return web.json_response({'error': {'message': message, 'type': 'BadRequestError', 'code': 400}},
+                                     status=400)
+        cached_tokens = engine.match_prefix(prompt)
+        created = int(time.time())
+        request_id = f"cmpl-mock-{engine.rng.getrandbits(32):08x}"
+        obj = 'chat.completion' if chat else 'text_completion'
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': n * max_tokens,
+                 'total_tokens': prompt_tokens + n * max_tokens}
+        # Qwen3 thinks by default; chat_template_kwargs={'enable_thinking': False} turns it off
+        thinking = 0
+        if chat and (body.get('chat_template_kwargs') or {}).get('enable_thinking', True):
+            thinking = min(engine.config['thinking_tokens'], max_tokens)
+        think_tags = engine.config['think_tags']
+
+        def choice(text: str, finish_reason=None, reasoning: bool = False, index: int = 0) -> Dict:
+            if chat:
+                delta = {'reasoning_content': text} if reasoning and not think_tags else {'content': text}
+                return {'index': index, 'delta': delta, 'finish_reason': finish_reason}
+            return {'index': index, 'text': text, 'finish_reason': finish_reason}
+
+        def piece(produced: int) -> str:
+            if produced > thinking:
+                return ' tok'
+            if not think_tags:
+                return ' hmm'
+            return ('<think>' if produced == 1 else '') + ' hmm' + ('</think>' if produced == thinking else '')
+
+        if not body.get('stream'):
+            async with engine.sequence(prompt_tokens, max_tokens, cached_tokens, n):
+                for _ in range(max_tokens):
+                    await engine.decode_step(n)
+            engine.success_total += 1
+            text = ''.join(piece(p) for p in range(1, max_tokens + 1))
+            if thinking and not think_tags:
+                message = {'message': {'role': 'assistant', 'reasoning_content': ' hmm' * thinking,
+                                       'content': ' tok' * (max_tokens - thinking)}}
+            else:
+                message = {'message': {'role': 'assistant', 'content': text}} if chat else {'text': text}
+            return web.json_response({
+                'id': request_id, 'object': obj, 'created': created, 'model': engine.config['model'],
+                'choices': [{'index': i, **message, 'finish_reason': 'length'} for i in range(n)],
+                'usage': usage
+            })
+
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream',
+                                               'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+        chunk_obj = 'chat.completion.chunk' if chat else 'text_completion'
+        async with engine.sequence(prompt_tokens, max_tokens, cached_tokens, n):
+            for produced in range(1, max_tokens + 1):
+                await engine.decode_step(n)
+                finish = 'length' if produced == max_tokens else None
+                # Like vLLM, each sample's token goes out in its own chunk
+                for index in range(n):
+                    chunk_choice = choice(piece(produced), finish, reasoning=produced <= thinking, index=index)
+                    await response.write(sse({'id': request_id, 'object': chunk_obj, 'created': created,
+                                              'model': engine.config['model'], 'choices': [chunk_choice]}))
+        if (body.get('stream_options') or {}).get('include_usage'):
+            await response.write(sse({'id': request_id, 'object': chunk_obj, 'created': created,
+                                      'model': engine.config['model'], 'choices': [], 'usage': usage}))
+        await response.write(b'data: [DONE]\n\n')
+        await response.write_eof()
+        engine.success_total += 1
+        return response
+
+    async def tokenize(request):
+        body = await request.json()
+        prompt = prompt_of(body, chat='messages' in body)
+        count = count_tokens(prompt)
+        return web.json_response({'count': count, 'max_model_len': engine.config['max_model_len'],
+                                  'tokens': list(range(count))})
+
+    async def completions(request):
+        return await completion(request, chat=False)
+
+    async def chat_completions(request):
+        return await completion(request, chat=True)
+
+    app.router.add_get('/health', health)
+    app.router.add_get('/metrics', metrics)
+    app.router.add_post('/tokenize', tokenize)
+    app.router.add_post('/v1/completions', completions)
+    app.router.add_post('/v1/chat/completions', chat_completions)
+    return app
+
+class MockServerThread:
+    """
+    Run the mock server on a background event loop, for use from synchronous scripts
+
+        with MockServerThread(port=8000, decode_tok_s=50) as server:
+            ...run a benchmark against http://localhost:8000...
+    """
+
+    def __init__(self, port: int = 8000, host: str = '127.0.0.1', **config):
+        self.port = port
+        self.host = host
+        self.config = config
+        self.loop = asyncio.new_event_loop()
+        self.runner: Optional[web.AppRunner] = None
+        self.app: Optional[web.Application] = None
+        self._thread = threading.Thread(target=self.loop.run_forever, name='mock-server', daemon=True)
+
+    async def _start(self):
+        self.app = make_app(self.config)
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    def start(self) -> 'MockServerThread':
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result(timeout=10)
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+    def __enter__(self) -> 'MockServerThread':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible inference server")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--prefill-tok-s', type=float, default=DEFAULT_CONFIG['prefill_tok_s'])
+    parser.add_argument('--decode-tok-s', type=float, default=DEFAULT_CONFIG['decode_tok_s'])
+    parser.add_argument('--batch-slowdown', type=float, default=DEFAULT_CONFIG['batch_slowdown'])
+    parser.add_argument('--max-num-seqs', type=int, default=DEFAULT_CONFIG['max_num_seqs'])
+    parser.add_argument('--kv-capacity-tokens', type=int, default=DEFAULT_CONFIG['kv_capacity_tokens'])
+    parser.add_argument('--failure-rate', type=float, default=DEFAULT_CONFIG['failure_rate'])
+    parser.add_argument('--enable-prefix-caching', action='store_true')
+    parser.add_argument('--thinking-tokens', type=int, default=DEFAULT_CONFIG['thinking_tokens'],
+                        help="reasoning tokens per chat response unless enable_thinking is false")
+    parser.add_argument('--think-tags', action='store_true', help="send reasoning inline in <think> tags")
+    parser.add_argument('--seed', type=int, default=DEFAULT_CONFIG['seed'])
+    args = parser.parse_args()
+
+    config = {k: v for k, v in vars(args).items() if k not in ('host', 'port')}
+    print(f"🧪 Mock server on {args.host}:{args.port} "
+          f"(decode {args.decode_tok_s:g} tok/s, prefill {args.prefill_tok_s:g} tok/s, "
+          f"max {args.max_num_seqs} seqs)")
+    web.run_app(make_app(config), host=args.host, port=args.port, print=None)
@@ -4,12 +4,14 @@ Multilingual Poem Generation Test for Qwen3-8B
 Tests both vLLM and SGLang with Chinese, Korean, and English poetry
 """
 
-import requests
 import time
 import json
 import sys
 from datetime import datetime
 
+from bench_client import check_health, run_request
+from results_store import store_results
+
 def test_poem_generation(port, server_name, max_tokens=2048):
     """
     Test poem generation with multilingual prompt
@@ -54,25 +56,25 @@ def test_poem_generation(port, server_name, max_tokens=2048):
     print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
     try:
-        # Measure request time
-        start_time = time.time()
-
-        # Make request
-        response = requests.post(url, json=payload, timeout=300)
-        response.raise_for_status()
+        # Make request (timed inside the shared client)
+        result = run_request(url, payload, timeout=300, keep_text=True)
+        if not result['success']:
+            if 'Timeout' in result.get('error_type', ''):
+                print(f"❌ Request timeout after 300 seconds")
+            else:
+                print(f"❌ Request failed: {result['error']}")
+            return None
 
         # Calculate metrics
-        end_time = time.time()
-        total_time = end_time - start_time
+        total_time = result['time']
 
         # Parse response
-        result = response.json()
-        generated_text = result['choices'][0]['text']
+        generated_text = result['text']
 
         # Get token counts
-        prompt_tokens = result.get('usage', {}).get('prompt_tokens', 0)
-        completion_tokens = result.get('usage', {}).get('completion_tokens', 0)
-        total_tokens = result.get('usage', {}).get('total_tokens', 0)
+        prompt_tokens = result['prompt_tokens']
+        completion_tokens = result['tokens']
+        total_tokens = prompt_tokens + completion_tokens
 
         # Calculate speed
         tokens_per_second = completion_tokens / total_time if total_time > 0 else 0
@@ -118,12 +120,6 @@ def test_poem_generation(port, server_name, max_tokens=2048):
             'has_english': has_english
         }
 
-    except requests.exceptions.Timeout:
-        print(f"❌ Request timeout after 300 seconds")
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Request failed: {e}")
-        return None
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
         return None
@@ -138,21 +134,17 @@ def main():
     servers_to_test = []
 
     # Check vLLM (port 8000)
-    try:
-        response = requests.get("http://localhost:8000/health", timeout=5)
-        if response.status_code == 200:
-            servers_to_test.append(("vLLM", 8000))
-            print("   ✅ vLLM server found on port 8000")
-    except:
+    if check_health("http://localhost:8000/health", timeout=5):
+        servers_to_test.append(("vLLM", 8000))
+        print("   ✅ vLLM server found on port 8000")
+    else:
         print("   ❌ vLLM server not available on port 8000")
 
     # Check SGLang (port 8001)
-    try:
-        response = requests.get("http://localhost:8001/health", timeout=5)
-        if response.status_code == 200:
-            servers_to_test.append(("SGLang", 8001))
-            print("   ✅ SGLang server found on port 8001")
-    except:
+    if check_health("http://localhost:8001/health", timeout=5):
+        servers_to_test.append(("SGLang", 8001))
+        print("   ✅ SGLang server found on port 8001")
+    else:
         print("   ❌ SGLang server not available on port 8001")
 
     if not servers_to_test:
@@ -211,6 +203,8 @@ def main():
                 f.write(f"{result['has_chinese']},{result['has_korean']},{result['has_english']}\n")
 
         print(f"\n💾 Results saved to: {csv_filename}")
+        store_results([{**r, 'test_type': 'multilingual_poem', 'speed_tok_s': r['tokens_per_second']}
+                       for r in results], "multilingual_poem_test")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
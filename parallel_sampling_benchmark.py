@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Parallel sampling (n > 1) vs fan-out benchmark
+Each virtual user asks for several candidate completions of the same prompt, either as
+one request with n samples (prefilled once, samples share the prompt's KV blocks) or
+as n separate n=1 requests sent together. Reports total tok/s, per-sample and
+candidate-set latency, prompt tokens the server prefilled, and VRAM from the GPU sampler.
+"""
+
+import asyncio
+import argparse
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from bench_client import BenchClient, check_health, encode_payload
+from bench_stats import mean, quantile
+from comprehensive_benchmark import get_gpu_memory_usage, save_results
+from gpu_sampler import GPUSampler
+from latency_histogram import build_histograms, correct_coordinated_omission, percentile_fields, print_percentiles
+from load_generator import PROMPTS
+from server_metrics import COUNTERS, counter_delta, prefix_cache_hit_rate, scrape_metrics
+
+MODES = ('n_way', 'fan_out')
+
+DEFAULT_SAMPLE_COUNTS = [2, 4, 8]
+DEFAULT_USER_COUNTS = [1, 10]
+
+SAMPLING_FIELDS = ['server', 'test_type', 'mode', 'n', 'num_users', 'rounds', 'successful_requests',
+                   'failed_requests', 'samples', 'total_time', 'total_tokens', 'throughput_tok_s',
+                   'samples_per_second', 'avg_ttft_ms', 'avg_tpot_ms', 'sample_latency_p50_ms', 'sample_latency_p99_ms',
+                   'set_latency_p50_ms', 'set_latency_p99_ms', 'prompt_tokens', 'server_prompt_tokens',
+                   'prefix_cache_hit_rate', 'vram_initial_gb', 'vram_peak_gb', 'vram_mean_gb',
+                   'vram_increase_gb', 'gpu_util_mean', 'latency_p50_ms', 'latency_p99_ms',
+                   'corrected_latency_p99_ms', 'co_interval_ms']
+
+def sample_latencies(record: Dict, samples: int) -> List[float]:
+    """Per-sample completion times (ms) of one request; samples of a non-streamed response arrive together"""
+    if not record.get('success'):
+        return []
+    return record.get('sample_latency_ms') or [record['time'] * 1000] * samples
+
+async def run_sampling(port: int, server_name: str, mode: str, n: int, num_users: int, rounds: int = 4,
+                       max_tokens: int = 200, stream: bool = True, temperature: float = 0.8,
+                       model: str = "Qwen/Qwen3-8B", gpu_backend: str = 'auto',
+                       gpu_interval: float = 0.1) -> Dict:
+    """Each of `num_users` users fetches `rounds` candidate sets of `n` samples, one set at a time"""
+    url = f"http://localhost:{port}/v1/completions"
+
+    print(f"\n{'='*60}")
+    print(f"Testing {server_name} - {mode.upper()} n={n}, {num_users} users x {rounds} rounds")
+    print(f"{'='*60}")
+
+    initial_gpu = get_gpu_memory_usage()
+    sampler = GPUSampler(gpu_backend, gpu_interval).start()
+    async with BenchClient(pool_size=0) as client:
+        await client.prewarm(f"http://localhost:{port}/health", num_users * (n if mode == 'fan_out' else 1))
+
+        async def virtual_user(user_id: int) -> List[Dict]:
+            records = []
+            for round_index in range(rounds):
+                payload = {
+                    "model": model,
+                    "prompt": PROMPTS[(user_id + round_index) % len(PROMPTS)],
+                    "max_tokens": max_tokens,
+                    "temperature": temperature,
+                    "top_p": 0.95,
+                    "stream": stream
+                }
+                if stream:
+                    payload["stream_options"] = {"include_usage": True}
+                set_start = time.perf_counter()
+                if mode == 'n_way':
+                    payload["n"] = n
+                    batch = [await client.request(url, payload, f"{user_id}-{round_index}",
+                                                  encode_payload(payload))]
+                else:
+                    body = encode_payload(payload)
+                    batch = await asyncio.gather(*(client.request(url, payload, f"{user_id}-{round_index}-{s}",
+                                                                  body) for s in range(n)))
+                set_ms = (time.perf_counter() - set_start) * 1000
+                # A candidate set is only usable once every sample in it has finished
+                if all(r.get('success') for r in batch):
+                    batch[0]['set_latency_ms'] = set_ms
+                records += batch
+            return records
+
+        start_time = time.perf_counter()
+        per_user = await asyncio.gather(*(virtual_user(u) for u in range(num_users)))
+        end_time = time.perf_counter()
+
+    sampler.stop()
+    gpu_stats = sampler.summary()
+
+    results = [r for records in per_user for r in records]
+    successful = [r for r in results if r.get('success', False)]
+    failed = [r for r in results if not r.get('success', False)]
+    total_time = end_time - start_time
+    total_tokens = sum(r.get('tokens', 0) for r in successful)
+    samples_per_request = n if mode == 'n_way' else 1
+    per_sample = [ms for r in successful for ms in sample_latencies(r, samples_per_request)]
+    set_latency = [r['set_latency_ms'] for r in successful if 'set_latency_ms' in r]
+    ttft = [r['ttft_ms'] for r in successful if 'ttft_ms' in r]
+    # Per-sample TPOT: an n-way stream is timed per choice, not across its interleaved samples
+    tpot = [ms for r in successful for ms in r.get('sample_tpot_ms') or ([r['tpot_ms']] if 'tpot_ms' in r else [])]
+    histograms = build_histograms(successful)
+    co_interval = correct_coordinated_omission(histograms)
+    vram_peak = gpu_stats.get('vram_peak_gb', get_gpu_memory_usage().get('memory_used_gb', 0))
+
+    print(f"✅ Completed {len(successful)}/{len(results)} requests ({len(per_sample)} samples) "
+          f"in {total_time:.2f}s")
+    print(f"   Throughput: {total_tokens / total_time if total_time > 0 else 0:.2f} tok/s, "
+          f"{len(per_sample) / total_time if total_time > 0 else 0:.2f} samples/s")
+    print(f"   Sample latency p50/p99: {quantile(per_sample, 50):.1f} / {quantile(per_sample, 99):.1f} ms, "
+          f"candidate set p50/p99: {quantile(set_latency, 50):.1f} / {quantile(set_latency, 99):.1f} ms")
+    if ttft:
+        print(f"   Per-sample TTFT / TPOT: {mean(ttft):.1f} / {mean(tpot):.2f} ms")
+    print_percentiles(histograms)
+    print(f"   CO correction assumes one request per user every {co_interval:.1f} ms")
+    print(f"   Peak VRAM: {vram_peak:.2f} GB")
+    if failed:
+        print(f"   ⚠️ Failed requests: {len(failed)} (does the server support n={n}?)")
+
+    return {
+        'server': server_name,
+        'test_type': f"sampling_{mode}_n{n}_{num_users}_users",
+        'mode': mode,
+        'n': n,
+        'num_users': num_users,
+        'rounds': rounds,
+        'successful_requests': len(successful),
+        'failed_requests': len(failed),
+        'samples': len(per_sample),
+        'total_time': total_time,
+        'total_tokens': total_tokens,
+        'throughput_tok_s': total_tokens / total_time if total_time > 0 else 0,
+        'samples_per_second': len(per_sample) / total_time if total_time > 0 else 0,
+        'avg_ttft_ms': mean(ttft) if ttft else '',
+        'avg_tpot_ms': mean(tpot) if tpot else '',
+        'sample_latency_p50_ms': quantile(per_sample, 50),
+        'sample_latency_p99_ms': quantile(per_sample, 99),
+        'set_latency_p50_ms': quantile(set_latency, 50),
+        'set_latency_p99_ms': quantile(set_latency, 99),
+        'prompt_tokens': sum(r.get('prompt_tokens', 0) for r in successful),
+        'co_interval_ms': co_interval,
+        'vram_initial_gb': initial_gpu.get('memory_used_gb', 0),
+        'vram_peak_gb': vram_peak,
+        'vram_mean_gb': gpu_stats.get('vram_mean_gb', ''),
+        'vram_increase_gb': vram_peak - initial_gpu.get('memory_used_gb', 0),
+        'gpu_util_mean': gpu_stats.get('gpu_util_mean', ''),
+        'gpu_samples': sampler.samples,
+        'histograms': histograms,
+        'requests': results,
+        **percentile_fields(histograms)
+    }
+
+def test_sampling(port: int, server_name: str, mode: str, n: int, num_users: int, **options) -> Dict:
+    """run_sampling plus the prompt tokens the server prefilled and its prefix cache hit rate"""
+    before = scrape_metrics(port)
+    result = asyncio.run(run_sampling(port, server_name, mode, n, num_users, **options))
+    after = scrape_metrics(port)
+
+    server_prompt_tokens = counter_delta(before, after, COUNTERS['prompt_tok_s'])
+    hit_rate = prefix_cache_hit_rate(before, after)
+    result['server_prompt_tokens'] = server_prompt_tokens if server_prompt_tokens is not None else ''
+    result['prefix_cache_hit_rate'] = hit_rate if hit_rate is not None else ''
+    if server_prompt_tokens is not None:
+        print(f"   Prompt tokens prefilled (server): {server_prompt_tokens:.0f} "
+              f"({result['prompt_tokens']} reported to the client)")
+    if hit_rate is not None:
+        print(f"   Prefix cache hit rate (server): {hit_rate * 100:.1f}%")
+    return result
+
+def run_sampling_comparison(port: int, server_name: str, sample_counts: List[int], user_counts: List[int],
+                            cooldown: float = 5, **options) -> List[Dict]:
+    """n-way then fan-out for every (users, n) pair"""
+    results = []
+    for num_users in user_counts:
+        for n in sample_counts:
+            for mode in MODES:
+                results.append(test_sampling(port, server_name, mode, n, num_users, **options))
+                time.sleep(cooldown)
+    print_sampling_comparison(results)
+    return results
+
+def print_sampling_comparison(results: List[Dict]):
+    print(f"\n{'='*80}")
+    print("📊 PARALLEL SAMPLING (n-way) vs FAN-OUT")
+    print(f"{'='*80}")
+    print("\n| Users | n | Mode    | Total tok/s | Samples/s | TPOT ms | Sample p50 ms | Sample p99 ms | "
+          "Set p99 ms | Server prompt tok | Peak VRAM GB |")
+    print("|-------|---|---------|-------------|-----------|---------|---------------|---------------|"
+          "------------|-------------------|--------------|")
+    for r in results:
+        prefilled = r['server_prompt_tokens']
+        tpot = f"{r['avg_tpot_ms']:.2f}" if r['avg_tpot_ms'] != '' else '-'
+        print(f"| {r['num_users']:>5} | {r['n']} | {r['mode']:<7} | {r['throughput_tok_s']:>11.2f} | "
+              f"{r['samples_per_second']:>9.2f} | {tpot:>7} | {r['sample_latency_p50_ms']:>13.1f} | "
+              f"{r['sample_latency_p99_ms']:>13.1f} | {r['set_latency_p99_ms']:>10.1f} | "
+              f"{f'{prefilled:.0f}' if prefilled != '' else '-':>17} | {r['vram_peak_gb']:>12.2f} |")
+
+    print("\n| Users | n | Tok/s (n-way/fan-out) | Set p99 (n-way/fan-out) | Winner |")
+    print("|-------|---|-----------------------|-------------------------|--------|")
+    for key in dict.fromkeys((r['num_users'], r['n']) for r in results):
+        n_way = next((r for r in results if (r['num_users'], r['n']) == key and r['mode'] == 'n_way'), None)
+        fan_out = next((r for r in results if (r['num_users'], r['n']) == key and r['mode'] == 'fan_out'), None)
+        if not n_way or not fan_out or not fan_out['throughput_tok_s'] or not fan_out['set_latency_p99_ms']:
+            continue
+        throughput_ratio = n_way['throughput_tok_s'] / fan_out['throughput_tok_s']
+        latency_ratio = n_way['set_latency_p99_ms'] / fan_out['set_latency_p99_ms']
+        winner = 'n-way' if throughput_ratio >= 1 else 'fan-out'
+        print(f"| {key[0]:>5} | {key[1]} | {throughput_ratio:>20.2f}x | {latency_ratio:>22.2f}x | {winner:<7} |")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel sampling (n > 1) vs fan-out benchmark")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server', default='vLLM')
+    parser.add_argument('--model', default="Qwen/Qwen3-8B")
+    parser.add_argument('--n', type=int, nargs='+', default=DEFAULT_SAMPLE_COUNTS, help="samples per prompt")
+    parser.add_argument('--users', type=int, nargs='+', default=DEFAULT_USER_COUNTS)
+    parser.add_argument('--rounds', type=int, default=4, help="candidate sets fetched per user")
+    parser.add_argument('--max-tokens', type=int, default=200)
+    parser.add_argument('--temperature', type=float, default=0.8)
+    parser.add_argument('--no-stream', action='store_true', help="non-streaming requests (no per-sample timing)")
+    parser.add_argument('--gpu-backend', choices=['auto', 'nvml', 'nvidia-smi', 'none'], default='auto')
+    parser.add_argument('--gpu-interval', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if not check_health(f"http://localhost:{args.port}/health"):
+        print(f"❌ {args.server} is not healthy on port {args.port}")
+        raise SystemExit(1)
+
+    results = run_sampling_comparison(args.port, args.server, args.n, args.users, rounds=args.rounds,
+                                      max_tokens=args.max_tokens, stream=not args.no_stream,
+                                      temperature=args.temperature, model=args.model,
+                                      gpu_backend=args.gpu_backend, gpu_interval=args.gpu_interval)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_results(results, f"parallel_sampling_{args.server.lower()}_{timestamp}", SAMPLING_FIELDS,
+                 config=vars(args))
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Shared-prefix workload benchmark
+Measures what automatic prefix caching (vLLM --enable-prefix-caching, SGLang radix cache)
+buys on workloads where requests share a system prompt, few-shot block or RAG document.
+Every request has the same total length; only the fraction sharing a prefix changes.
+"""
+
+import asyncio
+import argparse
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bench_client import check_health, run_request
+from comprehensive_benchmark import save_results
+from load_generator import test_workload
+from prompt_synth import filler
+from server_metrics import prefix_cache_hit_rate, scrape_metrics
+
+PREFIX_KINDS = ['system', 'fewshot', 'rag']
+
+DEFAULT_RATIOS = [0.0, 0.5, 0.9, 1.0]
+
+PREFIX_FIELDS = ['server', 'test_type', 'kind', 'shared_ratio', 'prefix_tokens', 'suffix_tokens',
+                 'num_prefixes', 'num_requests', 'num_users', 'successful_requests', 'failed_requests',
+                 'total_time', 'avg_ttft_ms', 'ttft_p50_ms', 'ttft_p99_ms', 'avg_tpot_ms',
+                 'throughput_tok_s', 'prefill_tok_s', 'requests_per_second', 'prefix_cache_hit_rate',
+                 'ttft_speedup', 'throughput_gain']
+
+HEADERS = {
+    'system': "System prompt #{id}: You are a careful assistant. Follow every rule below.\n",
+    'fewshot': "Example set #{id}: Answer in the style of the examples below.\n",
+    'rag': "Document #{id}: Use only the following document to answer.\n"
+}
+
+def build_prefix_workload(num_requests: int, shared_ratio: float, prefix_tokens: int = 1024,
+                          suffix_tokens: int = 64, kind: str = 'system', num_prefixes: int = 1,
+                          seed: int = 0, tag: str = '') -> Dict:
+    """
+    Build prompts where round(num_requests * shared_ratio) requests reuse one of
+    `num_prefixes` shared prefixes and the rest get a unique prefix of the same length
+
+    The prefix header carries an id (plus `tag`, so separate runs never hit each other's
+    cache entries); suffixes are always unique. Returns {'prompts', 'shared_prefixes'}.
+    """
+    rng = random.Random(seed)
+    shared_prefixes = [HEADERS[kind].format(id=f"{tag}s{i}") + filler(rng, prefix_tokens, kind)
+                       for i in range(num_prefixes)]
+    num_shared = round(num_requests * shared_ratio)
+
+    prompts = []
+    for i in range(num_requests):
+        if i < num_shared:
+            prefix = shared_prefixes[i % num_prefixes]
+        else:
+            prefix = HEADERS[kind].format(id=f"{tag}u{i}") + filler(rng, prefix_tokens, kind)
+        suffix = f"Question {i}: " + filler(rng, suffix_tokens, 'rag')
+        prompts.append(prefix + suffix)
+    rng.shuffle(prompts)
+    return {'prompts': prompts, 'shared_prefixes': shared_prefixes}
+
+def warm_prefixes(port: int, prefixes: List[str], model: str = "Qwen/Qwen3-8B"):
+    """Send each shared prefix once so the measured run starts with a populated cache"""
+    for prefix in prefixes:
+        run_request(f"http://localhost:{port}/v1/completions",
+                    {"model": model, "prompt": prefix, "max_tokens": 1, "temperature": 0}, timeout=120)
+
+def test_prefix_ratio(port: int, server_name: str, shared_ratio: float, num_requests: int = 100,
+                      concurrency: int = 10, prefix_tokens: int = 1024, suffix_tokens: int = 64,
+                      max_tokens: int = 64, kind: str = 'system', num_prefixes: int = 1,
+                      warm: bool = True, seed: int = 0, tag: str = '') -> Dict:
+    """Run one shared-ratio point and attach the server-reported cache hit rate"""
+    workload = build_prefix_workload(num_requests, shared_ratio, prefix_tokens, suffix_tokens,
+                                     kind, num_prefixes, seed, tag)
+    if warm and shared_ratio > 0:
+        warm_prefixes(port, workload['shared_prefixes'])
+
+    payloads = [{
+        "model": "Qwen/Qwen3-8B",
+        "prompt": prompt,
+        "max_tokens": max_tokens,
+        "temperature": 0,
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    } for prompt in workload['prompts']]
+
+    before = scrape_metrics(port)
+    result = asyncio.run(test_workload(port, server_name, payloads, concurrency,
+                                       test_type=f"prefix_{kind}_{round(shared_ratio * 100)}pct"))
+    after = scrape_metrics(port)
+
+    hit_rate = prefix_cache_hit_rate(before, after)
+    result.update({
+        'kind': kind,
+        'shared_ratio': shared_ratio,
+        'prefix_tokens': prefix_tokens,
+        'suffix_tokens': suffix_tokens,
+        'num_prefixes': num_prefixes,
+        'num_requests': num_requests,
+        'prefix_cache_hit_rate': hit_rate if hit_rate is not None else ''
+    })
+    if hit_rate is not None:
+        print(f"   Prefix cache hit rate (server): {hit_rate * 100:.1f}%")
+    return result
+
+def run_prefix_sweep(port: int, server_name: str, ratios: Optional[List[float]] = None,
+                     **options) -> List[Dict]:
+    """Sweep shared-prefix ratios; gains are relative to the ratio-0 (no sharing) run"""
+    ratios = sorted(set(ratios or DEFAULT_RATIOS) | {0.0})
+    tag = datetime.now().strftime("%H%M%S")
+
+    print(f"\n{'#'*60}")
+    print(f"# PREFIX CACHE BENCHMARK: {server_name}")
+    print(f"# ratios={ratios}")
+    print(f"{'#'*60}")
+
+    results = []
+    for i, ratio in enumerate(ratios):
+        results.append(test_prefix_ratio(port, server_name, ratio, tag=f"{tag}r{i}", **options))
+        time.sleep(2)
+
+    baseline = results[0]
+    for result in results:
+        result['ttft_speedup'] = (baseline['avg_ttft_ms'] / result['avg_ttft_ms']
+                                  if result.get('avg_ttft_ms') else 0)
+        result['throughput_gain'] = (result['throughput_tok_s'] / baseline['throughput_tok_s'] - 1
+                                     if baseline.get('throughput_tok_s') else 0)
+    print_prefix_summary(server_name, results)
+    return results
+
+def print_prefix_summary(server_name: str, results: List[Dict]):
+    print(f"\n{'='*80}")
+    print(f"📊 PREFIX CACHING: {server_name}")
+    print(f"{'='*80}")
+    print("\n| Shared | Avg TTFT (ms) | TTFT p99 (ms) | TTFT speedup | Throughput (tok/s) | Gain | Hit rate |")
+    print("|--------|---------------|---------------|--------------|--------------------|------|----------|")
+    for r in results:
+        hit_rate = r['prefix_cache_hit_rate']
+        hit_text = f"{hit_rate * 100:.1f}%" if hit_rate != '' else "n/a"
+        print(f"| {r['shared_ratio'] * 100:>5.0f}% | {r.get('avg_ttft_ms', 0):>13.1f} | "
+              f"{r.get('ttft_p99_ms', 0):>13.1f} | {r['ttft_speedup']:>11.2f}x | "
+              f"{r['throughput_tok_s']:>18.1f} | {r['throughput_gain']:>+5.0%} | {hit_text:>8} |")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared-prefix (prefix caching) benchmark")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server', default='vLLM')
+    parser.add_argument('--ratios', type=float, nargs='+', default=DEFAULT_RATIOS,
+                        help="fractions of requests sharing a prefix")
+    parser.add_argument('--kind', choices=PREFIX_KINDS, default='system')
+    parser.add_argument('--prefix-tokens', type=int, default=1024)
+    parser.add_argument('--suffix-tokens', type=int, default=64)
+    parser.add_argument('--num-prefixes', type=int, default=1)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--max-tokens', type=int, default=64)
+    parser.add_argument('--no-warm', action='store_true', help="do not pre-populate shared prefixes")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if not check_health(f"http://localhost:{args.port}/health"):
+        print(f"❌ {args.server} is not healthy on port {args.port}")
+        raise SystemExit(1)
+
+    results = run_prefix_sweep(args.port, args.server, args.ratios, num_requests=args.requests,
+                               concurrency=args.users, prefix_tokens=args.prefix_tokens,
+                               suffix_tokens=args.suffix_tokens, max_tokens=args.max_tokens,
+                               kind=args.kind, num_prefixes=args.num_prefixes,
+                               warm=not args.no_warm, seed=args.seed)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_results(results, f"prefix_cache_{args.server.lower()}_{timestamp}", PREFIX_FIELDS, config=vars(args))
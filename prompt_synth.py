@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Exact-length prompt synthesis
+Builds filler prompts with an exact token count, measured with the server's /tokenize
+endpoint or a local tokenizer.json, and caches them on disk so the tokenizer round
+trips are paid once per (tokenizer, length, variant). filler() gives cheap text of
+roughly a token count for workloads that do not need exact lengths.
+"""
+
+import json
+import os
+import random
+from typing import Dict, List, Optional
+
+from bench_client import fetch_json
+
+PROMPT_CACHE = os.environ.get('BENCH_PROMPT_CACHE', '/home/qwen-8b-repo/prompt_cache.json')
+
+# Part of the cache key; bump when the synthesized text changes so cached prompts are rebuilt
+PROMPT_FORMAT = 2
+
+# Appended one at a time to close the last few tokens when whole words overshoot
+TOP_UP = ' .'
+MAX_TOP_UP = 8
+
+FILLER_WORDS = ['data', 'model', 'cache', 'token', 'server', 'request', 'policy', 'result', 'value',
+                'system', 'memory', 'answer', 'format', 'source', 'detail', 'context', 'report',
+                'number', 'region', 'update', 'review', 'budget', 'client', 'signal']
+
+def filler(rng: random.Random, tokens: int, kind: str) -> str:
+    """Deterministic text of roughly `tokens` tokens (one short word ~ one token)"""
+    words = [rng.choice(FILLER_WORDS) for _ in range(tokens)]
+    lines = []
+    for i in range(0, len(words), 12):
+        chunk = ' '.join(words[i:i + 12])
+        if kind == 'system':
+            lines.append(f"- Rule: {chunk}.")
+        elif kind == 'fewshot':
+            lines.append(f"Q: {chunk}?" if (i // 12) % 2 == 0 else f"A: {chunk}.")
+        else:
+            lines.append(f"{chunk}.")
+    return '\n'.join(lines) + '\n'
+
+class ServerTokenizer:
+    """Count tokens with the server's /tokenize endpoint (vLLM and SGLang serve it)"""
+
+    def __init__(self, port: int, model: str = "Qwen/Qwen3-8B"):
+        self.url = f"http://localhost:{port}/tokenize"
+        self.model = model
+        self.name = model
+
+    def count(self, text: str) -> int:
+        response = fetch_json(self.url, {"model": self.model, "prompt": text, "add_special_tokens": False})
+        return response['count'] if 'count' in response else len(response['tokens'])
+
+class LocalTokenizer:
+    """Count tokens with a local tokenizer.json (needs the `tokenizers` package)"""
+
+    def __init__(self, path: str):
+        try:
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise RuntimeError("Local tokenizer needs the tokenizers package: pip install tokenizers")
+        self.tokenizer = Tokenizer.from_file(path)
+        self.name = os.path.abspath(path)
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+def synthesize_prompt(tokenizer, tokens: int, variant: int = 0, namespace: str = '') -> Dict:
+    """
+    Filler prompt of exactly `tokens` tokens ({'text', 'tokens'})
+
+    Binary-searches the number of filler words, then tops up with single-token pieces.
+    Each (namespace, length, variant) starts with its own header, so no two prompts share a
+    cached prefix (a longer prompt would otherwise start with the shorter one's words).
+    Give a benchmark its own namespace when its prompts must never be cached by another's.
+    If no exact fit exists the closest fit found is returned (with its real count).
+    """
+    rng = random.Random(variant)
+    header = f"{namespace} Document {variant} ({tokens} tokens):\n".lstrip()
+    words = [rng.choice(FILLER_WORDS) for _ in range(tokens)]
+
+    def text_of(n: int) -> str:
+        return header + ' '.join(words[:n])
+
+    while tokenizer.count(text_of(len(words))) < tokens:
+        words += [rng.choice(FILLER_WORDS) for _ in range(max(16, tokens // 4))]
+
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if tokenizer.count(text_of(middle)) <= tokens:
+            low = middle
+        else:
+            high = middle - 1
+
+    text = text_of(low)
+    count = tokenizer.count(text)
+    for _ in range(MAX_TOP_UP):
+        if count >= tokens:
+            break
+        candidate = text + TOP_UP
+        candidate_count = tokenizer.count(candidate)
+        if candidate_count > tokens:
+            break
+        text, count = candidate, candidate_count
+    return {'text': text, 'tokens': count}
+
+class PromptCache:
+    """JSON file of synthesized prompts keyed by tokenizer, length and variant"""
+
+    def __init__(self, path: str = PROMPT_CACHE):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self.dirty = False
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def get(self, tokenizer, tokens: int, variant: int = 0, namespace: str = '') -> Dict:
+        key = f"{tokenizer.name}|{tokens}|{variant}|{PROMPT_FORMAT}" + (f"|{namespace}" if namespace else '')
+        if key not in self.entries:
+            self.entries[key] = synthesize_prompt(tokenizer, tokens, variant, namespace)
+            self.dirty = True
+        return self.entries[key]
+
+    def save(self):
+        if not self.dirty:
+            return
+        with open(self.path, 'w') as f:
+            json.dump(self.entries, f)
+        self.dirty = False
+
+def exact_prompts(tokenizer, lengths: List[int], variants: int = 1,
+                  cache_path: Optional[str] = PROMPT_CACHE) -> Dict[int, List[Dict]]:
+    """{length: [prompt per variant]} using (and updating) the on-disk cache"""
+    cache = PromptCache(cache_path) if cache_path else None
+    prompts = {}
+    for length in lengths:
+        prompts[length] = [cache.get(tokenizer, length, v) if cache else synthesize_prompt(tokenizer, length, v)
+                           for v in range(variants)]
+        if cache:
+            cache.save()
+        misses = [p['tokens'] for p in prompts[length] if p['tokens'] != length]
+        if misses:
+            print(f"⚠️ Could not hit exactly {length} tokens, got {misses}")
+    return prompts
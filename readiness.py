@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Readiness polling and cold-start timing for inference containers
+Replaces fixed sleeps: polls /health, then a 1-token warmup completion, both with
+backoff, and records how long each cold-start phase took
+"""
+
+import argparse
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+from bench_client import check_health, run_request
+
+def _backoff(delay: float, factor: float = 1.5, max_delay: float = 5.0) -> float:
+    return min(max_delay, delay * factor)
+
+def wait_for_container(name: str, timeout: float = 120) -> Optional[float]:
+    """Poll `docker inspect` until the container is running; returns the time it became running"""
+    delay = 0.2
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        result = subprocess.run(['docker', 'inspect', '-f', '{{.State.Running}}', name],
+                                capture_output=True, text=True)
+        if result.returncode == 0 and result.stdout.strip() == 'true':
+            return time.perf_counter()
+        time.sleep(delay)
+        delay = _backoff(delay)
+    return None
+
+def wait_until_ready(port: int, timeout: float = 600, warmup: bool = True,
+                     model: str = "Qwen/Qwen3-8B", started_at: Optional[float] = None) -> Dict:
+    """
+    Wait for /health, then for a 1-token completion to succeed
+
+    Phase times are measured from `started_at` (a time.perf_counter() value, default: now).
+    """
+    base_url = f"http://localhost:{port}"
+    start = started_at if started_at is not None else time.perf_counter()
+    deadline = start + timeout
+    timings = {'ready': False}
+
+    print(f"⏳ Waiting for {base_url}/health (timeout {timeout:.0f}s)...")
+    delay = 0.5
+    while not check_health(f"{base_url}/health", timeout=5):
+        if time.perf_counter() >= deadline:
+            print(f"❌ Server on port {port} not healthy after {timeout:.0f}s")
+            return timings
+        time.sleep(delay)
+        delay = _backoff(delay)
+    health_time = time.perf_counter()
+    timings['health_up_at_s'] = health_time - start
+    print(f"   ✅ Health OK after {timings['health_up_at_s']:.1f}s")
+
+    if warmup:
+        payload = {"model": model, "prompt": "Hello", "max_tokens": 1, "temperature": 0}
+        delay = 0.5
+        while True:
+            result = run_request(f"{base_url}/v1/completions", payload, timeout=60)
+            if result['success']:
+                break
+            if time.perf_counter() >= deadline:
+                print(f"❌ Warmup completion still failing after {timeout:.0f}s: {result['error']}")
+                return timings
+            time.sleep(delay)
+            delay = _backoff(delay)
+        ready_time = time.perf_counter()
+        timings['first_token_ready_at_s'] = ready_time - start
+        timings['warmup_s'] = ready_time - health_time
+        print(f"   ✅ First token served after {timings['first_token_ready_at_s']:.1f}s "
+              f"(warmup {timings['warmup_s']:.1f}s)")
+
+    timings['ready'] = True
+    return timings
+
+def start_container(docker_run_args: List[str], name: str, port: int, timeout: float = 600) -> Dict:
+    """
+    `docker run -d` a server container and time its cold start
+
+    Returns container_start_s (docker run -> running), health_up_s (running -> /health 200),
+    first_token_ready_s (/health -> first completion) and cold_start_total_s.
+    """
+    print(f"🚀 Starting container {name}...")
+    t0 = time.perf_counter()
+    result = subprocess.run(['docker', 'run', '-d', '--name', name] + docker_run_args,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"❌ docker run failed: {result.stderr.strip()}")
+        return {'ready': False}
+
+    running_at = wait_for_container(name)
+    if running_at is None:
+        print(f"❌ Container {name} did not reach running state")
+        return {'ready': False}
+    container_start_s = running_at - t0
+    print(f"   ✅ Container running after {container_start_s:.1f}s")
+
+    timings = wait_until_ready(port, timeout, started_at=t0)
+    timings['container_start_s'] = container_start_s
+    if 'health_up_at_s' in timings:
+        timings['health_up_s'] = timings['health_up_at_s'] - container_start_s
+    if 'first_token_ready_at_s' in timings:
+        timings['first_token_ready_s'] = timings['warmup_s']
+        timings['cold_start_total_s'] = timings['first_token_ready_at_s']
+        print(f"🧊 Cold start: {timings['cold_start_total_s']:.1f}s total "
+              f"(container {container_start_s:.1f}s, health {timings['health_up_s']:.1f}s, "
+              f"first token {timings['first_token_ready_s']:.1f}s)")
+    return timings
+
+def stop_container(name: str):
+    subprocess.run(["docker", "stop", name], capture_output=True)
+    subprocess.run(["docker", "rm", name], capture_output=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wait until an inference server can serve tokens")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--no-warmup', action='store_true')
+    args = parser.parse_args()
+
+    timings = wait_until_ready(args.port, args.timeout, warmup=not args.no_warmup)
+    raise SystemExit(0 if timings['ready'] else 1)
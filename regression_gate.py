@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Performance regression gate: compare a candidate run against a baseline run
+Runs come from the results store (results_store.py). Tests are matched by (server, test_type),
+pooling every result of a run that repeats a test; per-request latency/TTFT/TPOT are
+compared with a Mann-Whitney U test plus a bootstrap interval on the median, and
+throughput / req/s the same way over per-second windows rebuilt from the request records.
+Run-level values with nothing to test against (one number per run) are only flagged,
+never failed; error rate is compared to a threshold.
+Exits 1 when any metric regresses, so an image bump can be gated in CI:
+
+    python3 regression_gate.py --baseline 12 --candidate latest
+"""
+
+import argparse
+import json
+import math
+from typing import Dict, List, Optional, Tuple
+
+from bench_stats import bootstrap_diff_ci, mann_whitney_u, mean, median, quantile
+from results_store import DEFAULT_DB, ResultsStore
+
+# Per-request metrics: (SQL expression over the requests table, higher is better)
+REQUEST_METRICS = {
+    'latency_ms': ('latency_s * 1000', False),
+    'ttft_ms': ('ttft_ms', False),
+    'tpot_ms': ('tpot_ms', False),
+    'decode_tok_s': ('decode_tok_s', True)
+}
+
+# Run-level metrics (one value per test); a worsening beyond the threshold is only flagged
+# 'unverified' unless the metric can be rebuilt as windowed samples (WINDOWED_METRICS)
+RESULT_METRICS = {
+    'throughput_tok_s': True,
+    'steady_throughput_tok_s': True,
+    'goodput_tok_s': True,
+    'requests_per_second': True,
+    'latency_p50_ms': False,
+    'latency_p99_ms': False,
+    'ttft_p99_ms': False
+}
+
+# Run-level metrics rebuilt per window from request send/finish times and tested like latency
+WINDOWED_METRICS = ('throughput_tok_s', 'requests_per_second')
+WINDOW_S = 1.0
+
+DEFAULT_THRESHOLD_PCT = 5.0
+DEFAULT_ERROR_RATE_PP = 1.0
+
+# Latency shifts smaller than this are never called a regression, however significant
+DEFAULT_MIN_DELTA_MS = 1.0
+
+def resolve_run(store: ResultsStore, spec: str) -> Optional[int]:
+    """Run id from '12', 'latest' or 'latest:<script>'"""
+    if spec.isdigit():
+        return int(spec)
+    if spec.startswith('latest'):
+        _, _, script = spec.partition(':')
+        sql = ("SELECT id FROM runs" + (" WHERE script = ?" if script else "") +
+               " ORDER BY started_at DESC, id DESC LIMIT 1")
+        rows = store.query(sql, (script,) if script else ())
+        return rows[0]['id'] if rows else None
+    raise ValueError(f"Invalid run spec: {spec}")
+
+def window_series(requests: List[Dict], window_s: float = WINDOW_S) -> Dict[str, List[float]]:
+    """
+    Per-window tok/s and completed req/s from request records (sent_at, latency_s, ttft_ms, tokens)
+
+    Each request's tokens are spread evenly over its decode span (first token to finish)
+    so long requests do not land in one window. The first and last windows (ramp-up and
+    drain) are dropped.
+    """
+    if not requests:
+        return {metric: [] for metric in WINDOWED_METRICS}
+    start = min(r['sent_at'] for r in requests)
+    end = max(r['sent_at'] + r['latency_s'] for r in requests)
+    count = max(1, math.ceil((end - start) / window_s))
+    tokens, completions = [0.0] * count, [0] * count
+
+    def index(t: float) -> int:
+        return min(count - 1, int((t - start) / window_s))
+
+    for r in requests:
+        finish = r['sent_at'] + r['latency_s']
+        first = min(finish, r['sent_at'] + (r['ttft_ms'] or 0) / 1000)
+        completions[index(finish)] += 1
+        if finish <= first:
+            tokens[index(finish)] += r['tokens'] or 0
+            continue
+        rate = (r['tokens'] or 0) / (finish - first)
+        for i in range(index(first), index(finish) + 1):
+            low, high = start + i * window_s, start + (i + 1) * window_s
+            tokens[i] += rate * max(0.0, min(high, finish) - max(low, first))
+
+    interior = slice(1, -1) if count > 2 else slice(0, count)
+    return {'throughput_tok_s': [t / window_s for t in tokens[interior]],
+            'requests_per_second': [c / window_s for c in completions[interior]]}
+
+def load_run(store: ResultsStore, run_id: int, server: Optional[str] = None) -> Dict[Tuple[str, str], Dict]:
+    """
+    {(server, test_type): {'result': metrics, 'requests': {metric: [values]}, ...}} for one run
+
+    A run can repeat a test (ab_benchmark.py rounds store the same test_type every round):
+    request samples and windows of every matching result are pooled, windows being built per
+    result so the gaps between rounds never enter them, and run-level metrics are averaged.
+    """
+    sql = "SELECT id, server, test_type, metrics FROM results WHERE run_id = ? ORDER BY id"
+    params = [run_id]
+    if server:
+        sql += " AND server = ?"
+        params.append(server)
+
+    tests = {}
+    for row in store.query(sql, params):
+        # One run can hold several servers (e.g. comprehensive_benchmark.py tests vLLM and SGLang)
+        test = tests.setdefault((row['server'], row['test_type']), {
+            'results': [], 'requests': {metric: [] for metric in REQUEST_METRICS},
+            'windows': {metric: [] for metric in WINDOWED_METRICS}, 'total': 0, 'ok': 0
+        })
+        test['results'].append(json.loads(row['metrics'] or '{}'))
+        for metric, (expression, _) in REQUEST_METRICS.items():
+            values = store.query(f"SELECT {expression} AS v FROM requests WHERE result_id = ? AND success = 1 "
+                                 f"AND {expression} > 0", (row['id'],))
+            test['requests'][metric] += [r['v'] for r in values]
+        counts = store.query("SELECT COUNT(*) AS total, SUM(success) AS ok FROM requests WHERE result_id = ?",
+                             (row['id'],))[0]
+        test['total'] += counts['total']
+        test['ok'] += counts['ok'] or 0
+        timed = store.query("SELECT sent_at, latency_s, ttft_ms, tokens FROM requests WHERE result_id = ? "
+                            "AND success = 1 AND sent_at IS NOT NULL", (row['id'],))
+        for metric, values in window_series(timed).items():
+            test['windows'][metric] += values
+
+    for test in tests.values():
+        test['result'] = {}
+        for metric in RESULT_METRICS:
+            values = [r[metric] for r in test['results'] if isinstance(r.get(metric), (int, float))]
+            if values:
+                test['result'][metric] = mean(values)
+        test['error_rate'] = 1 - test['ok'] / test['total'] if test['total'] else None
+    return tests
+
+def judge(change_pct: float, higher_is_better: bool, threshold_pct: float, significant: bool) -> str:
+    worse = -change_pct if higher_is_better else change_pct
+    if worse > threshold_pct and significant:
+        return 'REGRESSION'
+    if -worse > threshold_pct and significant:
+        return 'improved'
+    return 'ok'
+
+def compare_runs(baseline: Dict[Tuple[str, str], Dict], candidate: Dict[Tuple[str, str], Dict],
+                 thresholds: Dict[str, float], alpha: float = 0.05, error_rate_pp: float = DEFAULT_ERROR_RATE_PP,
+                 min_delta_ms: float = DEFAULT_MIN_DELTA_MS, min_samples: int = 5) -> List[Dict]:
+    """Compare every test present in both runs; returns one row per metric"""
+    rows = []
+    for key in [k for k in baseline if k in candidate]:
+        server, test_type = key
+        base, cand = baseline[key], candidate[key]
+
+        for metric, (_, higher_is_better) in REQUEST_METRICS.items():
+            a, b = base['requests'][metric], cand['requests'][metric]
+            if len(a) < min_samples or len(b) < min_samples:
+                continue
+            base_median, cand_median = median(a), median(b)
+            test = mann_whitney_u(a, b)
+            low, high = bootstrap_diff_ci(a, b, statistic=median)
+            change_pct = (cand_median / base_median - 1) * 100 if base_median else 0
+            threshold = thresholds.get(metric, DEFAULT_THRESHOLD_PCT)
+            # Significant when the rank test rejects and the median interval excludes zero
+            significant = test['p_value'] < alpha and (low > 0 or high < 0)
+            if metric.endswith('_ms'):
+                significant = significant and abs(cand_median - base_median) >= min_delta_ms
+            rows.append({
+                'server': server, 'test_type': test_type, 'metric': f"{metric} (median)", 'baseline': base_median,
+                'candidate': cand_median, 'change_pct': change_pct, 'p_value': test['p_value'],
+                'ci_low': low, 'ci_high': high, 'threshold_pct': threshold,
+                'status': judge(change_pct, higher_is_better, threshold, significant)
+            })
+            if metric == 'latency_ms':
+                base_p99, cand_p99 = quantile(a, 99), quantile(b, 99)
+                low, high = bootstrap_diff_ci(a, b, statistic=lambda v: quantile(v, 99))
+                change_pct = (cand_p99 / base_p99 - 1) * 100 if base_p99 else 0
+                rows.append({
+                    'server': server, 'test_type': test_type, 'metric': f"{metric} (p99)", 'baseline': base_p99,
+                    'candidate': cand_p99, 'change_pct': change_pct, 'p_value': '',
+                    'ci_low': low, 'ci_high': high, 'threshold_pct': threshold,
+                    'status': judge(change_pct, higher_is_better, threshold,
+                                    (low > 0 or high < 0) and abs(cand_p99 - base_p99) >= min_delta_ms)
+                })
+
+        has_requests = any(base['requests'][m] for m in REQUEST_METRICS)
+        for metric, higher_is_better in RESULT_METRICS.items():
+            threshold = thresholds.get(metric, DEFAULT_THRESHOLD_PCT)
+            a = base['windows'].get(metric, [])
+            b = cand['windows'].get(metric, [])
+            if len(a) >= min_samples and len(b) >= min_samples:
+                base_mean, cand_mean = mean(a), mean(b)
+                test = mann_whitney_u(a, b)
+                low, high = bootstrap_diff_ci(a, b, statistic=mean)
+                change_pct = (cand_mean / base_mean - 1) * 100 if base_mean else 0
+                rows.append({
+                    'server': server, 'test_type': test_type, 'metric': f"{metric} (per {WINDOW_S:g}s)",
+                    'baseline': base_mean, 'candidate': cand_mean, 'change_pct': change_pct,
+                    'p_value': test['p_value'], 'ci_low': low, 'ci_high': high, 'threshold_pct': threshold,
+                    'status': judge(change_pct, higher_is_better, threshold,
+                                    test['p_value'] < alpha and (low > 0 or high < 0))
+                })
+                continue
+            # Percentiles are already covered per request when records exist (legacy imports lack them)
+            if has_requests and metric.endswith('_ms'):
+                continue
+            base_value, cand_value = base['result'].get(metric), cand['result'].get(metric)
+            if not base_value or cand_value is None:
+                continue
+            change_pct = (cand_value / base_value - 1) * 100
+            # One value per run has no variance to test against: repeat the runs before calling it
+            status = judge(change_pct, higher_is_better, threshold, True)
+            rows.append({
+                'server': server, 'test_type': test_type, 'metric': metric, 'baseline': base_value,
+                'candidate': cand_value, 'change_pct': change_pct, 'p_value': '', 'ci_low': '', 'ci_high': '',
+                'threshold_pct': threshold,
+                'status': 'unverified' if status == 'REGRESSION' else status
+            })
+
+        if base['error_rate'] is not None and cand['error_rate'] is not None:
+            delta_pp = (cand['error_rate'] - base['error_rate']) * 100
+            rows.append({
+                'server': server, 'test_type': test_type, 'metric': 'error_rate', 'baseline': base['error_rate'],
+                'candidate': cand['error_rate'], 'change_pct': delta_pp, 'p_value': '', 'ci_low': '',
+                'ci_high': '', 'threshold_pct': error_rate_pp,
+                'status': 'REGRESSION' if delta_pp > error_rate_pp else 'ok'
+            })
+    return rows
+
+def print_gate_report(rows: List[Dict], baseline_id: int, candidate_id: int):
+    print(f"\n{'='*80}")
+    print(f"🚦 REGRESSION GATE: run {candidate_id} (candidate) vs run {baseline_id} (baseline)")
+    print(f"{'='*80}")
+    print("\n| Test | Metric | Baseline | Candidate | Change | p-value | Threshold | Status |")
+    print("|------|--------|----------|-----------|--------|---------|-----------|--------|")
+    for r in rows:
+        p_value = f"{r['p_value']:.4f}" if r['p_value'] != '' else '-'
+        icon = {'REGRESSION': '❌', 'improved': '✅', 'unverified': '⚠️'}.get(r['status'], '')
+        print(f"| {r['server']} {r['test_type']} | {r['metric']} | {r['baseline']:.2f} | {r['candidate']:.2f} | "
+              f"{r['change_pct']:+.1f}% | {p_value} | {r['threshold_pct']:g}% | {icon} {r['status']} |")
+
+def parse_thresholds(items: List[str]) -> Dict[str, float]:
+    """['latency_ms=3', 'throughput_tok_s=5'] -> {'latency_ms': 3.0, ...} (percent)"""
+    thresholds = {}
+    for item in items or []:
+        metric, _, value = item.partition('=')
+        thresholds[metric.strip()] = float(value)
+    return thresholds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail when a candidate run regresses against a baseline")
+    parser.add_argument('--baseline', required=True, help="run id, 'latest' or 'latest:<script>'")
+    parser.add_argument('--candidate', default='latest', help="run id, 'latest' or 'latest:<script>'")
+    parser.add_argument('--db', default=DEFAULT_DB)
+    parser.add_argument('--server', help="only compare results for this server name")
+    parser.add_argument('--threshold', action='append', metavar='METRIC=PCT',
+                        help=f"allowed worsening in percent (default {DEFAULT_THRESHOLD_PCT:g}), repeatable")
+    parser.add_argument('--error-rate-pp', type=float, default=DEFAULT_ERROR_RATE_PP,
+                        help="allowed error-rate increase in percentage points")
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="ignore latency changes smaller than this")
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        baseline_id = resolve_run(store, args.baseline)
+        candidate_id = resolve_run(store, args.candidate)
+        if baseline_id is None or candidate_id is None:
+            print("❌ Baseline or candidate run not found")
+            raise SystemExit(2)
+        rows = compare_runs(load_run(store, baseline_id, args.server), load_run(store, candidate_id, args.server),
+                            parse_thresholds(args.threshold), args.alpha, args.error_rate_pp,
+                            args.min_delta_ms)
+
+    if not rows:
+        print("❌ No comparable tests between the two runs")
+        raise SystemExit(2)
+
+    print_gate_report(rows, baseline_id, candidate_id)
+    unverified = [r for r in rows if r['status'] == 'unverified']
+    if unverified:
+        print(f"\n⚠️ {len(unverified)} run-level metric(s) worse than the threshold without per-request samples "
+              "to test; repeat both runs before treating them as regressions")
+    regressions = [r for r in rows if r['status'] == 'REGRESSION']
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) detected")
+        raise SystemExit(1)
+    print("\n✅ No regressions")
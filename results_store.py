@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite store for benchmark results
+One schema for every script: runs (one script invocation), configs (its options),
+results (one row per test, key metrics as columns plus all scalar fields as JSON),
+per-request records and GPU samples. Also imports the historical CSVs.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import socket
+import sqlite3
+import subprocess
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from gpu_sampler import SAMPLE_FIELDS
+
+DEFAULT_DB = os.environ.get('BENCH_RESULTS_DB', '/home/qwen-8b-repo/benchmark_results.db')
+
+# Result fields promoted to indexed/queryable columns; everything else lives in results.metrics
+RESULT_COLUMNS = ['server', 'test_type', 'num_users', 'successful_requests', 'failed_requests',
+                  'total_time', 'total_tokens', 'speed_tok_s', 'throughput_tok_s', 'requests_per_second',
+                  'avg_response_time', 'avg_ttft_ms', 'avg_tpot_ms', 'latency_p50_ms', 'latency_p99_ms',
+                  'ttft_p50_ms', 'ttft_p99_ms', 'itl_p50_ms', 'itl_p99_ms', 'vram_peak_gb']
+
+REQUEST_COLUMNS = ['request_id', 'success', 'time', 'tokens', 'prompt_tokens', 'ttft_ms', 'tpot_ms',
+                   'decode_tok_s', 'queue_delay_ms', 'client_cpu_ms', 'error_type', 'sent_at']
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    script TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    host TEXT,
+    git_commit TEXT,
+    source TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS configs (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (run_id, key)
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    {', '.join(f'{c} {"TEXT" if c in ("server", "test_type") else "REAL"}' for c in RESULT_COLUMNS)},
+    metrics TEXT,
+    histograms TEXT
+);
+CREATE TABLE IF NOT EXISTS requests (
+    result_id INTEGER NOT NULL REFERENCES results(id),
+    request_id TEXT, success INTEGER, latency_s REAL, tokens INTEGER, prompt_tokens INTEGER,
+    ttft_ms REAL, tpot_ms REAL, decode_tok_s REAL, queue_delay_ms REAL, client_cpu_ms REAL,
+    error_type TEXT, sent_at REAL
+);
+CREATE TABLE IF NOT EXISTS gpu_samples (
+    result_id INTEGER NOT NULL REFERENCES results(id),
+    {', '.join(f'{c} REAL' for c in SAMPLE_FIELDS)}
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id);
+CREATE INDEX IF NOT EXISTS idx_results_server_test ON results(server, test_type);
+CREATE INDEX IF NOT EXISTS idx_requests_result ON requests(result_id);
+CREATE INDEX IF NOT EXISTS idx_gpu_samples_result ON gpu_samples(result_id);
+"""
+
+# Legacy CSV column -> (store field, scale factor)
+LEGACY_COLUMNS = {
+    'concurrent_users': ('num_users', 1),
+    'overall_time': ('total_time', 1),
+    'total_time_seconds': ('total_time', 1),
+    'tokens_per_second': ('speed_tok_s', 1),
+    'avg_tokens_per_second': ('speed_tok_s', 1),
+    'p50_response_time': ('latency_p50_ms', 1000),
+    'p99_response_time': ('latency_p99_ms', 1000),
+    'p50_latency_ms': ('latency_p50_ms', 1),
+    'avg_latency_ms': ('avg_response_time', 0.001),
+    'time_to_first_token_ms': ('avg_ttft_ms', 1),
+    'completion_tokens': ('total_tokens', 1)
+}
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+def _scalar(value):
+    """Keep JSON-friendly scalars; drop lists/dicts such as per-request records"""
+    if isinstance(value, (int, float, str, bool)) or value is None:
+        return value
+    return None
+
+def _parse_csv_value(value: str):
+    if value in ('', None):
+        return None
+    if value in ('True', 'False'):
+        return value == 'True'
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+class ResultsStore:
+    """
+    Batched writer/reader for the results database
+
+        with ResultsStore() as store:
+            run_id = store.start_run('comprehensive_benchmark', config=vars(args))
+            store.add_result(run_id, result)
+
+    Per-request rows and GPU samples are buffered and written with executemany
+    every `batch_size` rows (and on flush/close), so recording stays cheap during a run.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB, batch_size: int = 1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        # Databases created before requests.sent_at existed (wall-clock send time, for windowed throughput)
+        if 'sent_at' not in [row[1] for row in self.conn.execute("PRAGMA table_info(requests)")]:
+            self.conn.execute("ALTER TABLE requests ADD COLUMN sent_at REAL")
+        self.pending: Dict[str, List[tuple]] = {'requests': [], 'gpu_samples': []}
+
+    def __enter__(self) -> 'ResultsStore':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def flush(self):
+        columns = {
+            'requests': ['result_id', 'request_id', 'success', 'latency_s', 'tokens', 'prompt_tokens',
+                         'ttft_ms', 'tpot_ms', 'decode_tok_s', 'queue_delay_ms', 'client_cpu_ms', 'error_type',
+                         'sent_at'],
+            'gpu_samples': ['result_id'] + SAMPLE_FIELDS
+        }
+        for table, rows in self.pending.items():
+            if rows:
+                self.conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns[table])}) "
+                    f"VALUES ({', '.join('?' * len(columns[table]))})", rows)
+                rows.clear()
+        self.conn.commit()
+
+    def _queue(self, table: str, row: tuple):
+        self.pending[table].append(row)
+        if len(self.pending[table]) >= self.batch_size:
+            self.flush()
+
+    def start_run(self, script: str, config: Optional[Dict] = None, started_at: Optional[str] = None,
+                  source: Optional[str] = None) -> int:
+        cursor = self.conn.execute(
+            "INSERT INTO runs (script, started_at, host, git_commit, source) VALUES (?, ?, ?, ?, ?)",
+            (script, started_at or datetime.now().isoformat(timespec='seconds'), socket.gethostname(),
+             _git_commit() if source is None else None, source))
+        run_id = cursor.lastrowid
+        if config:
+            self.conn.executemany("INSERT INTO configs (run_id, key, value) VALUES (?, ?, ?)",
+                                  [(run_id, k, json.dumps(v, default=str)) for k, v in config.items()])
+        self.conn.commit()
+        return run_id
+
+    def add_result(self, run_id: int, result: Dict) -> int:
+        """Store one result dict, plus its 'requests' and 'gpu_samples' lists when present"""
+        metrics = {k: _scalar(v) for k, v in result.items() if _scalar(v) is not None}
+        histograms = result.get('histograms')
+        cursor = self.conn.execute(
+            f"INSERT INTO results (run_id, {', '.join(RESULT_COLUMNS)}, metrics, histograms) "
+            f"VALUES ({', '.join('?' * (len(RESULT_COLUMNS) + 3))})",
+            (run_id, *[_scalar(result.get(c)) if result.get(c) != '' else None for c in RESULT_COLUMNS],
+             json.dumps(metrics),
+             json.dumps({k: h.to_dict() for k, h in histograms.items()}) if histograms else None))
+        result_id = cursor.lastrowid
+        for record in result.get('requests') or []:
+            self.add_request(result_id, record)
+        samples = result.get('gpu_samples')
+        if isinstance(samples, list):
+            for sample in samples:
+                self._queue('gpu_samples', (result_id, *[sample.get(f) for f in SAMPLE_FIELDS]))
+        self.conn.commit()
+        return result_id
+
+    def add_request(self, result_id: int, record: Dict):
+        """Buffer one per-request record (the dicts returned by BenchClient.request)"""
+        self._queue('requests', (result_id, str(record.get('request_id')), int(bool(record.get('success'))),
+                                 *[record.get(c) for c in REQUEST_COLUMNS[2:]]))
+
+    def import_csv(self, path: str) -> Optional[int]:
+        """Import a legacy results CSV as one run; returns None if it was already imported"""
+        source = os.path.abspath(path)
+        if self.conn.execute("SELECT 1 FROM runs WHERE source = ?", (source,)).fetchone():
+            return None
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        match = re.search(r'_(\d{8}_\d{6})$', name)
+        started_at = (datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").isoformat()
+                      if match else datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds'))
+        script = name[:match.start()] if match else name
+        default_server = next((s for key, s in (('sglang', 'SGLang'), ('vllm', 'vLLM')) if key in name.lower()), None)
+
+        run_id = self.start_run(script, started_at=started_at, source=source)
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                result = {}
+                for column, value in row.items():
+                    value = _parse_csv_value(value)
+                    if value is None:
+                        continue
+                    result[column] = value
+                    if column in LEGACY_COLUMNS and isinstance(value, float):
+                        field, scale = LEGACY_COLUMNS[column]
+                        result.setdefault(field, value * scale)
+                result.setdefault('server', default_server)
+                if 'test_type' not in result:
+                    users = result.get('num_users')
+                    result['test_type'] = f"concurrent_{users:g}_users" if users else script
+                self.add_result(run_id, result)
+        self.flush()
+        return run_id
+
+    def query(self, sql: str, params: Iterable = ()) -> List[Dict]:
+        self.flush()
+        cursor = self.conn.execute(sql, tuple(params))
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+class RunWriter:
+    """
+    Streams one script invocation into the store as each test completes, so an interrupted
+    benchmark keeps every finished test; storage errors are reported, never raised
+
+        writer = RunWriter('comprehensive_benchmark', config=vars(args))
+        writer.add(result)  # after each test
+        writer.close()
+    """
+
+    def __init__(self, script: str, config: Optional[Dict] = None, path: str = DEFAULT_DB):
+        self.path = path
+        self.store: Optional[ResultsStore] = None
+        self.run_id: Optional[int] = None
+        try:
+            self.store = ResultsStore(path)
+            self.run_id = self.store.start_run(script, config)
+        except sqlite3.Error as e:
+            self._fail(e)
+
+    def _fail(self, error: sqlite3.Error):
+        print(f"⚠️ Could not store results in {self.path}: {error}")
+        if self.store:
+            try:
+                self.store.conn.close()
+            except sqlite3.Error:
+                pass
+        self.store = None
+        self.run_id = None
+
+    def add(self, result: Optional[Dict]):
+        """Store one finished test and flush its buffered request/GPU-sample rows"""
+        if not result or not self.store:
+            return
+        try:
+            self.store.add_result(self.run_id, result)
+            self.store.flush()
+        except sqlite3.Error as e:
+            self._fail(e)
+
+    def close(self) -> Optional[int]:
+        if not self.store:
+            return None
+        try:
+            self.store.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not store results in {self.path}: {e}")
+            return None
+        print(f"🗄️ Results stored in {self.path} (run {self.run_id})")
+        return self.run_id
+
+def store_results(all_results: List[Dict], script: str, config: Optional[Dict] = None,
+                  path: str = DEFAULT_DB) -> Optional[int]:
+    """Record one script invocation and its results; storage errors never abort a benchmark"""
+    writer = RunWriter(script, config, path)
+    for result in all_results:
+        writer.add(result)
+    return writer.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark results store")
+    parser.add_argument('--db', default=DEFAULT_DB)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help="import legacy CSV files")
+    import_parser.add_argument('paths', nargs='+', help="CSV files or glob patterns")
+    subparsers.add_parser('runs', help="list stored runs")
+    query_parser = subparsers.add_parser('query', help="run an SQL query")
+    query_parser.add_argument('sql')
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        if args.command == 'import':
+            for pattern in args.paths:
+                for path in sorted(glob.glob(pattern)) or [pattern]:
+                    run_id = store.import_csv(path)
+                    print(f"{'✅ Imported' if run_id else '⏭️ Already imported'}: {path}")
+        elif args.command == 'runs':
+            for row in store.query("SELECT runs.id, script, started_at, COUNT(results.id) AS results "
+                                   "FROM runs LEFT JOIN results ON results.run_id = runs.id "
+                                   "GROUP BY runs.id ORDER BY started_at"):
+                print(f"{row['id']:>5} {row['started_at']} {row['script']:<40} {row['results']} results")
+        else:
+            for row in store.query(args.sql):
+                print(row)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Prometheus /metrics reader for vLLM and SGLang servers
+Includes a background poller that scrapes /metrics during a run, parses the exposition
+format incrementally (only the metrics we need), and aligns the samples with client
+request records and GPU samples.
+"""
+
+import asyncio
+import bisect
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from bench_client import BenchClient, fetch_text
+from bench_stats import quantile
+
+# Normalized gauge name -> server-specific metric names (first one present wins)
+GAUGES = {
+    'running': ['vllm:num_requests_running', 'sglang:num_running_reqs'],
+    'waiting': ['vllm:num_requests_waiting', 'sglang:num_queue_reqs'],
+    'kv_cache_usage': ['vllm:gpu_cache_usage_perc', 'vllm:kv_cache_usage_perc', 'sglang:token_usage']
+}
+
+# Normalized counter name -> counters reported as per-second rates between scrapes
+COUNTERS = {
+    'prompt_tok_s': ['vllm:prompt_tokens_total', 'sglang:prompt_tokens_total'],
+    'generation_tok_s': ['vllm:generation_tokens_total', 'sglang:generation_tokens_total']
+}
+
+# Cumulative preemption counters (SGLang only logs retractions)
+PREEMPTION_COUNTERS = ['vllm:num_preemptions_total']
+
+# Normalized name -> histogram base names reported as mean milliseconds between scrapes
+HISTOGRAMS = {
+    'server_ttft_ms': ['vllm:time_to_first_token_seconds', 'sglang:time_to_first_token_seconds'],
+    'prefill_time_ms': ['vllm:request_prefill_time_seconds'],
+    'decode_time_ms': ['vllm:request_decode_time_seconds'],
+    'queue_time_ms': ['vllm:request_queue_time_seconds', 'sglang:queue_time_seconds']
+}
+
+# Server state buckets used when correlating client latency with what the server was doing
+STATE_EDGES = {
+    'waiting': [0, 1, 5, 10, 25, 50, 100, float('inf')],
+    'running': [0, 8, 16, 32, 64, 128, 256, float('inf')],
+    'kv_cache_usage': [0, 0.5, 0.7, 0.8, 0.9, 0.95, float('inf')]
+}
+
+def poll_metric_names() -> List[str]:
+    names = [n for group in list(GAUGES.values()) + list(COUNTERS.values()) for n in group]
+    names += [f"{n}{suffix}" for group in HISTOGRAMS.values() for n in group for suffix in ('_sum', '_count')]
+    return names
+
+class PrometheusParser:
+    """
+    Incremental exposition-format parser
+
+    feed() takes raw bytes as they arrive; values of complete lines are summed across
+    label sets. With `wanted`, lines for other metrics are skipped before any parsing.
+    """
+
+    def __init__(self, wanted: Optional[Iterable[str]] = None):
+        self.wanted = set(wanted) if wanted is not None else None
+        self.buffer = b''
+        self.values: Dict[str, float] = {}
+
+    def _parse_line(self, line: bytes):
+        line = line.strip()
+        if not line or line.startswith(b'#'):
+            return
+        brace = line.find(b'{')
+        space = line.find(b' ')
+        if brace >= 0 and (space < 0 or brace < space):
+            name = line[:brace].decode()
+            if self.wanted is not None and name not in self.wanted:
+                return
+            rest = line[line.rindex(b'}') + 1:]
+        else:
+            name = line[:space].decode() if space >= 0 else line.decode()
+            if self.wanted is not None and name not in self.wanted:
+                return
+            rest = line[space:] if space >= 0 else b''
+        parts = rest.split()
+        if not parts:
+            return
+        try:
+            value = float(parts[0])
+        except ValueError:
+            return
+        self.values[name] = self.values.get(name, 0.0) + value
+
+    def feed(self, data: bytes):
+        self.buffer += data
+        lines = self.buffer.split(b'\n')
+        self.buffer = lines.pop()
+        for line in lines:
+            self._parse_line(line)
+
+    def close(self) -> Dict[str, float]:
+        if self.buffer:
+            self._parse_line(self.buffer)
+            self.buffer = b''
+        return self.values
+
+def parse_prometheus_text(text: str, wanted: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """Parse exposition text into {metric_name: value}, summing samples across label sets"""
+    parser = PrometheusParser(wanted)
+    parser.feed(text.encode('utf-8'))
+    return parser.close()
+
+def scrape_metrics(port: int, timeout: float = 5) -> Dict[str, float]:
+    """Fetch and parse http://localhost:{port}/metrics (empty dict when unavailable)"""
+    try:
+        return parse_prometheus_text(fetch_text(f"http://localhost:{port}/metrics", timeout))
+    except Exception as e:
+        print(f"Error scraping metrics: {e}")
+        return {}
+
+def prefix_cache_hit_rate(before: Dict[str, float], after: Dict[str, float]) -> Optional[float]:
+    """
+    Server-reported prefix cache hit rate over the interval between two scrapes
+
+    vLLM V1 exports token counters (prefix_cache_hits_total / prefix_cache_queries_total);
+    older vLLM and SGLang only export a running hit-rate gauge, used as a fallback. Counters
+    that did not move while requests were sent mean caching is off, reported as 0.
+    """
+    for prefix in ('vllm:', 'sglang:'):
+        hits = after.get(f'{prefix}prefix_cache_hits_total')
+        queries = after.get(f'{prefix}prefix_cache_queries_total')
+        if hits is not None and queries is not None:
+            delta_queries = queries - before.get(f'{prefix}prefix_cache_queries_total', 0)
+            if delta_queries > 0:
+                return (hits - before.get(f'{prefix}prefix_cache_hits_total', 0)) / delta_queries
+            return 0.0
+    for gauge in ('vllm:gpu_prefix_cache_hit_rate', 'sglang:cache_hit_rate'):
+        if gauge in after:
+            return after[gauge]
+    return None
+
+def counter_delta(before: Dict[str, float], after: Dict[str, float], names: List[str]) -> Optional[float]:
+    """Increase of the first exported counter in `names` between two scrapes (None when not exported)"""
+    for counter in names:
+        if counter in after:
+            return after[counter] - before.get(counter, 0)
+    return None
+
+def histogram_mean_ms(before: Dict[str, float], after: Dict[str, float], names: List[str]) -> Optional[float]:
+    """Mean (ms) of the first exported histogram in `names` over the observations between two scrapes"""
+    for name in names:
+        if f"{name}_count" in after and f"{name}_sum" in after:
+            count = after[f"{name}_count"] - before.get(f"{name}_count", 0)
+            total = after[f"{name}_sum"] - before.get(f"{name}_sum", 0)
+            return total / count * 1000 if count > 0 else None
+    return None
+
+def preemptions(before: Dict[str, float], after: Dict[str, float]) -> Optional[float]:
+    """
+    Sequences the server preempted between two scrapes (None when not exported)
+
+    Preempted sequences lose their KV blocks and are recomputed later, so any preemption
+    means the running batch did not fit in the KV cache.
+    """
+    return counter_delta(before, after, PREEMPTION_COUNTERS)
+
+def normalize_sample(raw: Dict[str, float], previous: Optional[Dict[str, float]], timestamp: float,
+                     previous_timestamp: Optional[float]) -> Dict:
+    """Map raw vLLM/SGLang metrics onto common names; counters/histograms become interval rates/means"""
+    sample = {'timestamp': timestamp}
+    for name, candidates in GAUGES.items():
+        value = next((raw[c] for c in candidates if c in raw), None)
+        if value is not None:
+            sample[name] = value
+    if previous is None or previous_timestamp is None or timestamp <= previous_timestamp:
+        return sample
+    elapsed = timestamp - previous_timestamp
+    for name, candidates in COUNTERS.items():
+        counter = next((c for c in candidates if c in raw and c in previous), None)
+        if counter:
+            sample[name] = max(0.0, raw[counter] - previous[counter]) / elapsed
+    for name, candidates in HISTOGRAMS.items():
+        base = next((c for c in candidates if f"{c}_count" in raw and f"{c}_count" in previous), None)
+        if base:
+            count = raw[f"{base}_count"] - previous[f"{base}_count"]
+            if count > 0:
+                sample[name] = (raw[f"{base}_sum"] - previous[f"{base}_sum"]) / count * 1000
+    return sample
+
+class MetricsPoller:
+    """
+    Scrape /metrics every `interval` seconds on a background thread
+
+        with MetricsPoller(8000, interval=0.5) as poller:
+            ...run load...
+        print(poller.summary())
+
+    Samples use time.time() timestamps, like GPUSampler, so both series line up.
+    """
+
+    def __init__(self, port: int, interval: float = 1.0, timeout: float = 5):
+        self.url = f"http://localhost:{port}/metrics"
+        self.interval = interval
+        self.timeout = timeout
+        self.samples: List[Dict] = []
+        self.errors = 0
+        self._wanted = poll_metric_names()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def _scrape(self, client: BenchClient) -> Dict[str, float]:
+        parser = PrometheusParser(self._wanted)
+        async with client.session.get(self.url) as response:
+            response.raise_for_status()
+            async for data in response.content.iter_any():
+                parser.feed(data)
+        return parser.close()
+
+    async def _poll(self):
+        previous = previous_timestamp = None
+        async with BenchClient(pool_size=1, timeout=self.timeout) as client:
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                try:
+                    raw = await self._scrape(client)
+                    timestamp = time.time()
+                    self.samples.append(normalize_sample(raw, previous, timestamp, previous_timestamp))
+                    previous, previous_timestamp = raw, timestamp
+                except Exception:
+                    self.errors += 1
+                await asyncio.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def start(self) -> 'MetricsPoller':
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._poll()), name='metrics-poller',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + self.timeout + 1)
+
+    def __enter__(self) -> 'MetricsPoller':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def summary(self) -> Dict:
+        """Peak/mean server state over the run (empty dict when nothing was scraped)"""
+        summary = {}
+        for name in list(GAUGES) + list(COUNTERS) + list(HISTOGRAMS):
+            values = [s[name] for s in self.samples if name in s]
+            if values:
+                key = name if name.startswith('server_') else f"server_{name}"
+                summary[f"{key}_peak"] = max(values)
+                summary[f"{key}_mean"] = sum(values) / len(values)
+        if summary:
+            summary['server_scrapes'] = len(self.samples)
+        return summary
+
+def state_at(samples: List[Dict], timestamp: float) -> Optional[Dict]:
+    """Most recent sample taken at or before `timestamp` (samples sorted by time)"""
+    times = [s['timestamp'] for s in samples]
+    index = bisect.bisect_right(times, timestamp) - 1
+    return samples[index] if index >= 0 else None
+
+def align_samples(server_samples: List[Dict], gpu_samples: List[Dict]) -> List[Dict]:
+    """One row per server sample with the GPU sample closest in time merged in"""
+    gpu_times = [s['timestamp'] for s in gpu_samples]
+    rows = []
+    for sample in server_samples:
+        row = dict(sample)
+        if gpu_samples:
+            i = bisect.bisect_left(gpu_times, sample['timestamp'])
+            nearest = min((j for j in (i - 1, i) if 0 <= j < len(gpu_samples)),
+                          key=lambda j: abs(gpu_times[j] - sample['timestamp']))
+            row.update({f"gpu_{k}": v for k, v in gpu_samples[nearest].items() if k != 'timestamp'})
+        rows.append(row)
+    return rows
+
+def server_fields(poller: Optional[MetricsPoller], gpu_samples: List[Dict]) -> Dict:
+    """Result-dict fields for a run: the poller summary plus server samples aligned with GPU samples"""
+    if poller is None:
+        return {}
+    return {**poller.summary(), 'server_samples': align_samples(poller.samples, gpu_samples)}
+
+def correlate(records: List[Dict], samples: List[Dict], metric: str = 'ttft_ms', state: str = 'waiting',
+              edges: Optional[List[float]] = None) -> List[Dict]:
+    """
+    Bucket successful requests by the server `state` when they were sent and report
+    p50/p99 of `metric` per bucket (records need 'sent_at', as set by BenchClient)
+    """
+    edges = edges or STATE_EDGES[state]
+    samples = sorted((s for s in samples if state in s), key=lambda s: s['timestamp'])
+    buckets: Dict[int, List[float]] = {}
+    for r in records:
+        if not r.get('success') or metric not in r or 'sent_at' not in r:
+            continue
+        sample = state_at(samples, r['sent_at'])
+        if sample is None:
+            continue
+        value = r[metric] * 1000 if metric == 'time' else r[metric]
+        index = max(0, bisect.bisect_right(edges, sample[state]) - 1)
+        buckets.setdefault(index, []).append(value)
+    return [{'state': state, 'low': edges[i], 'high': edges[i + 1], 'requests': len(values),
+             'p50': quantile(values, 50), 'p99': quantile(values, 99)}
+            for i, values in sorted(buckets.items())]
+
+def print_correlation(rows: List[Dict], metric: str = 'ttft_ms'):
+    if not rows:
+        return
+    print(f"   {metric} by server {rows[0]['state']} at send time:")
+    for row in rows:
+        high = '+' if row['high'] == float('inf') else f"{row['high']:g}"
+        print(f"     {row['low']:g}-{high}: p50 {row['p50']:.1f} / p99 {row['p99']:.1f} ({row['requests']} requests)")
+
+def print_server_report(poller: MetricsPoller, records: List[Dict], metric: str = 'ttft_ms'):
+    """Print the server-side summary and how client latency moved with queue depth and KV use"""
+    summary = poller.summary()
+    if not summary:
+        print("   ⚠️ No /metrics samples collected")
+        return
+    print(f"   Server: running peak {summary.get('server_running_peak', 0):.0f}, "
+          f"waiting peak {summary.get('server_waiting_peak', 0):.0f}, "
+          f"KV cache peak {summary.get('server_kv_cache_usage_peak', 0) * 100:.0f}% "
+          f"({summary['server_scrapes']} scrapes)")
+    if not any(metric in r for r in records):
+        metric = 'time'
+    for state in ('waiting', 'kv_cache_usage'):
+        print_correlation(correlate(records, poller.samples, metric, state), metric)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Multi-turn chat session benchmark
+Each virtual user holds a conversation: every turn resends the whole history (system
+prompt, earlier questions and the model's earlier answers) through /v1/chat/completions,
+then waits an exponentially distributed think time before the next question. Reports
+TTFT and throughput per turn as the history grows, next to the server's prefix cache hit
+rate, which shows whether prefix caching keeps later turns fast.
+"""
+
+import asyncio
+import argparse
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bench_client import BenchClient, check_health, encode_payload
+from bench_stats import mean, quantile
+from chat_benchmark import SAMPLING
+from comprehensive_benchmark import get_gpu_memory_usage, save_results, summarize_stream_results
+from gpu_sampler import GPUSampler
+from latency_histogram import build_histograms, correct_coordinated_omission, percentile_fields, print_percentiles
+from load_generator import PROMPTS
+from server_metrics import (MetricsPoller, prefix_cache_hit_rate, print_server_report, scrape_metrics,
+                            server_fields)
+
+SYSTEM_PROMPT = ("You are a helpful assistant for an engineering team. Answer clearly, keep answers "
+                 "focused on the question, and build on what was already said in the conversation.")
+
+# Asked in order after the opening question (wrapping around for long sessions)
+FOLLOW_UPS = [
+    "Can you give a concrete example of that?",
+    "What are the main trade-offs to keep in mind?",
+    "How would you explain this to a beginner?",
+    "What changes when this has to work at a much larger scale?",
+    "Which part of this is most often misunderstood?",
+    "Summarize our discussion so far in three bullet points.",
+    "What would you recommend as a first step?",
+    "Are there any common mistakes to avoid?"
+]
+
+SESSION_FIELDS = ['server', 'test_type', 'turn', 'num_users', 'turns', 'think_time_s', 'successful_requests',
+                  'failed_requests', 'avg_prompt_tokens', 'avg_ttft_ms', 'ttft_p50_ms', 'ttft_p99_ms',
+                  'ttft_ms_per_1k_prompt_tokens', 'avg_tpot_ms', 'decode_tok_s', 'latency_p50_ms',
+                  'latency_p99_ms', 'corrected_latency_p99_ms', 'co_interval_ms',
+                  'total_time', 'total_tokens', 'throughput_tok_s', 'requests_per_second',
+                  'prefix_cache_hit_rate', 'reusable_prompt_share', 'history_growth', 'ttft_growth',
+                  'vram_peak_gb']
+
+def question(user_id: int, turn: int) -> str:
+    if turn == 0:
+        return PROMPTS[user_id % len(PROMPTS)]
+    return FOLLOW_UPS[(turn - 1) % len(FOLLOW_UPS)]
+
+async def run_sessions(port: int, server_name: str, num_users: int, turns: int = 8, think_time: float = 5.0,
+                       max_tokens: int = 256, thinking: bool = False, model: str = "Qwen/Qwen3-8B",
+                       seed: int = 0, gpu_backend: str = 'auto', gpu_interval: float = 0.1,
+                       scrape_interval: Optional[float] = None) -> Dict:
+    """Run `num_users` concurrent conversations of `turns` turns each"""
+    url = f"http://localhost:{port}/v1/chat/completions"
+
+    print(f"\n{'='*60}")
+    print(f"Testing {server_name} - SESSIONS: {num_users} users x {turns} turns, think time {think_time:g}s")
+    print(f"{'='*60}")
+
+    initial_gpu = get_gpu_memory_usage()
+    sampler = GPUSampler(gpu_backend, gpu_interval).start()
+    poller = MetricsPoller(port, scrape_interval).start() if scrape_interval else None
+    async with BenchClient(pool_size=0, keep_text=True) as client:
+        await client.prewarm(f"http://localhost:{port}/health", num_users)
+        # Counters are read after prewarm so only session traffic enters the hit rate
+        before = await asyncio.to_thread(scrape_metrics, port)
+
+        async def virtual_user(user_id: int) -> List[Dict]:
+            rng = random.Random(seed * 100003 + user_id)
+            messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+            records = []
+            # Stagger session starts so users do not move through turns in lockstep
+            if think_time > 0:
+                await asyncio.sleep(rng.uniform(0, think_time))
+            for turn in range(turns):
+                messages.append({"role": "user", "content": question(user_id, turn)})
+                payload = {
+                    "model": model,
+                    "messages": list(messages),
+                    "max_tokens": max_tokens,
+                    "chat_template_kwargs": {"enable_thinking": thinking},
+                    "stream": True,
+                    "stream_options": {"include_usage": True},
+                    **SAMPLING[thinking]
+                }
+                record = await client.request(url, payload, f"{user_id}-{turn}", encode_payload(payload))
+                record.update({'user': user_id, 'turn': turn})
+                records.append(record)
+                # The chat template drops earlier reasoning, so only the answer joins the history
+                answer = record.pop('text', None)
+                record.pop('reasoning_text', None)
+                if not record.get('success'):
+                    break
+                messages.append({"role": "assistant", "content": answer or ''})
+                if think_time > 0 and turn < turns - 1:
+                    await asyncio.sleep(rng.expovariate(1 / think_time))
+            return records
+
+        start_time = time.perf_counter()
+        per_user = await asyncio.gather(*(virtual_user(u) for u in range(num_users)))
+        end_time = time.perf_counter()
+        after = await asyncio.to_thread(scrape_metrics, port)
+
+    sampler.stop()
+    gpu_stats = sampler.summary()
+    if poller:
+        poller.stop()
+
+    results = [r for records in per_user for r in records]
+    successful = [r for r in results if r.get('success', False)]
+    failed = [r for r in results if not r.get('success', False)]
+    total_time = end_time - start_time
+    total_tokens = sum(r.get('tokens', 0) for r in successful)
+    histograms = build_histograms(successful)
+    # A user's cycle is one response plus one think time; a stall delays every turn behind it
+    co_interval = correct_coordinated_omission(histograms, histograms['latency'].percentile(50) + think_time * 1000)
+    hit_rate = prefix_cache_hit_rate(before, after)
+
+    print(f"✅ Completed {len(successful)}/{len(results)} turns in {total_time:.2f}s")
+    print(f"   Throughput: {total_tokens / total_time if total_time > 0 else 0:.2f} tok/s")
+    print_percentiles(histograms)
+    print(f"   CO correction assumes one turn per user every {co_interval:.1f} ms")
+    if hit_rate is not None:
+        print(f"   Prefix cache hit rate (server): {hit_rate * 100:.1f}%")
+    if poller:
+        print_server_report(poller, results)
+    if failed:
+        print(f"   ⚠️ Failed turns: {len(failed)} (a session stops at its first failure)")
+
+    return {
+        'server': server_name,
+        'test_type': f"session_{num_users}_users_{turns}_turns",
+        'turn': 'all',
+        'num_users': num_users,
+        'turns': turns,
+        'think_time_s': think_time,
+        'co_interval_ms': co_interval,
+        'successful_requests': len(successful),
+        'failed_requests': len(failed),
+        'total_time': total_time,
+        'total_tokens': total_tokens,
+        'throughput_tok_s': total_tokens / total_time if total_time > 0 else 0,
+        'requests_per_second': len(successful) / total_time if total_time > 0 else 0,
+        'avg_prompt_tokens': mean([r.get('prompt_tokens', 0) for r in successful]),
+        'prefix_cache_hit_rate': hit_rate if hit_rate is not None else '',
+        'vram_initial_gb': initial_gpu.get('memory_used_gb', 0),
+        'vram_peak_gb': gpu_stats.get('vram_peak_gb', 0),
+        'gpu_samples': sampler.samples,
+        'histograms': histograms,
+        'requests': results,
+        **server_fields(poller, sampler.samples),
+        **percentile_fields(histograms),
+        **summarize_stream_results(successful)
+    }
+
+def test_sessions(port: int, server_name: str, num_users: int, **options) -> Dict:
+    """run_sessions plus the session-level fields: resent-history share and growth from first to last turn"""
+    summary = asyncio.run(run_sessions(port, server_name, num_users, **options))
+    summary['reusable_prompt_share'] = reusable_share(summary['requests'])
+    summary.update(session_growth(turn_stats(summary)))
+    return summary
+
+def turn_stats(summary: Dict) -> List[Dict]:
+    """One row per turn index: history size, TTFT and throughput of that turn across users"""
+    rows = []
+    for turn in range(summary['turns']):
+        records = [r for r in summary['requests'] if r['turn'] == turn]
+        if not records:
+            break
+        successful = [r for r in records if r.get('success')]
+        ttft = [r['ttft_ms'] for r in successful if 'ttft_ms' in r]
+        prompt_tokens = mean([r.get('prompt_tokens', 0) for r in successful])
+        # Turn throughput: tokens of the turn over the span from its first send to its last completion
+        span = (max(r['sent_at'] + r['time'] for r in successful) - min(r['sent_at'] for r in successful)
+                if successful else 0)
+        tokens = sum(r.get('tokens', 0) for r in successful)
+        rows.append({
+            'server': summary['server'],
+            'test_type': f"session_turn_{turn + 1}",
+            'turn': turn + 1,
+            'num_users': summary['num_users'],
+            'turns': summary['turns'],
+            'think_time_s': summary['think_time_s'],
+            'successful_requests': len(successful),
+            'failed_requests': len(records) - len(successful),
+            'avg_prompt_tokens': prompt_tokens,
+            'avg_ttft_ms': mean(ttft),
+            'ttft_p50_ms': quantile(ttft, 50),
+            'ttft_p99_ms': quantile(ttft, 99),
+            'ttft_ms_per_1k_prompt_tokens': quantile(ttft, 50) / (prompt_tokens / 1000) if prompt_tokens else 0,
+            'latency_p50_ms': quantile([r['time'] * 1000 for r in successful], 50),
+            'total_tokens': tokens,
+            'throughput_tok_s': tokens / span if span > 0 else 0,
+            **summarize_stream_results(successful)
+        })
+    return rows
+
+def session_growth(rows: List[Dict]) -> Dict:
+    """How much the prompt (history) and TTFT p50 grew from the first turn to the last"""
+    if len(rows) < 2 or not rows[0]['avg_prompt_tokens'] or not rows[0]['ttft_p50_ms']:
+        return {'history_growth': '', 'ttft_growth': ''}
+    return {
+        'history_growth': rows[-1]['avg_prompt_tokens'] / rows[0]['avg_prompt_tokens'],
+        'ttft_growth': rows[-1]['ttft_p50_ms'] / rows[0]['ttft_p50_ms']
+    }
+
+def reusable_share(records: List[Dict]) -> float:
+    """
+    Fraction of all prompt tokens that a perfect prefix cache could serve
+
+    A turn can reuse its user's previous prompt plus the answer to it; only the new question
+    (and the first turn) must be prefilled.
+    """
+    previous = {}
+    reusable = total = 0
+    for r in sorted((r for r in records if r.get('success')), key=lambda r: (r['user'], r['turn'])):
+        prompt_tokens = r.get('prompt_tokens', 0)
+        last = previous.get(r['user'])
+        if last and last['turn'] == r['turn'] - 1:
+            reusable += min(prompt_tokens, last.get('prompt_tokens', 0) + last.get('tokens', 0))
+        total += prompt_tokens
+        previous[r['user']] = r
+    return reusable / total if total else 0
+
+def print_session_report(summary: Dict, rows: List[Dict]):
+    print(f"\n{'='*80}")
+    print(f"📊 {summary['server']} PER-TURN RESULTS ({summary['num_users']} users, think time "
+          f"{summary['think_time_s']:g}s)")
+    print(f"{'='*80}")
+    print("\n| Turn | Prompt tok | TTFT p50 ms | TTFT p99 ms | ms / 1k prompt tok | Decode tok/s | Turn tok/s |")
+    print("|------|------------|-------------|-------------|--------------------|--------------|------------|")
+    for r in rows:
+        print(f"| {r['turn']:>4} | {r['avg_prompt_tokens']:>10.0f} | {r['ttft_p50_ms']:>11.1f} | "
+              f"{r['ttft_p99_ms']:>11.1f} | {r['ttft_ms_per_1k_prompt_tokens']:>18.1f} | "
+              f"{r.get('decode_tok_s', 0):>12.1f} | {r['throughput_tok_s']:>10.1f} |")
+
+    if summary['history_growth'] == '':
+        return
+    print(f"\n   History grew {summary['history_growth']:.1f}x over {len(rows)} turns; "
+          f"TTFT p50 grew {summary['ttft_growth']:.2f}x")
+
+    # TTFT growth alone cannot tell: fixed per-request overhead dominates short first turns.
+    # Judge reuse by the server's hit rate against the share of prompt tokens that were resent.
+    hit_rate = summary['prefix_cache_hit_rate']
+    reusable = summary['reusable_prompt_share']
+    print(f"   Resent history: {reusable * 100:.1f}% of prompt tokens could come from the prefix cache")
+    if hit_rate == '':
+        print("   ⚠️ The server exports no prefix cache metrics, so reuse cannot be confirmed")
+        return
+    print(f"   Prefix cache hit rate (server): {hit_rate * 100:.1f}%")
+    if hit_rate >= 0.5 * reusable:
+        print("   ✅ Later turns reuse the cache: most of the resent history is served from the prefix cache")
+    else:
+        print("   ⚠️ The resent history is mostly recomputed "
+              "(is --enable-prefix-caching on, or is the cache evicting sessions?)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-turn chat session benchmark")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server', default='vLLM')
+    parser.add_argument('--model', default="Qwen/Qwen3-8B")
+    parser.add_argument('--users', type=int, nargs='+', default=[10], help="concurrent sessions per run")
+    parser.add_argument('--turns', type=int, default=8)
+    parser.add_argument('--think-time', type=float, default=5.0, help="mean seconds between turns (exponential)")
+    parser.add_argument('--max-tokens', type=int, default=256)
+    parser.add_argument('--thinking', action='store_true', help="leave Qwen3 thinking mode on")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scrape-interval', type=float, help="poll /metrics every N seconds during each run")
+    parser.add_argument('--gpu-backend', choices=['auto', 'nvml', 'nvidia-smi', 'none'], default='auto')
+    parser.add_argument('--gpu-interval', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if not check_health(f"http://localhost:{args.port}/health"):
+        print(f"❌ {args.server} is not healthy on port {args.port}")
+        raise SystemExit(1)
+
+    all_rows = []
+    for num_users in args.users:
+        summary = test_sessions(args.port, args.server, num_users, turns=args.turns, think_time=args.think_time,
+                                max_tokens=args.max_tokens, thinking=args.thinking, model=args.model,
+                                seed=args.seed, gpu_backend=args.gpu_backend, gpu_interval=args.gpu_interval,
+                                scrape_interval=args.scrape_interval)
+        rows = turn_stats(summary)
+        print_session_report(summary, rows)
+        all_rows += [summary] + rows
+        time.sleep(5)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_results(all_rows, f"session_benchmark_{args.server.lower()}_{timestamp}", SESSION_FIELDS,
+                 config=vars(args))
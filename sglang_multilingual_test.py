@@ -3,11 +3,13 @@
 SGLang Multilingual Test - Force generation in Chinese, Korean, and English
 """
 
-import requests
 import time
 import json
 from datetime import datetime
 
+from bench_client import run_request
+from readiness import wait_until_ready
+
 def test_sglang_multilingual(max_tokens=3000):
     """Test SGLang with explicit multilingual prompts - same as vLLM"""
     url = "http://localhost:8000/v1/completions"
@@ -61,19 +63,17 @@ New life begins this beautiful day.
     print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
     try:
-        start_time = time.time()
-        response = requests.post(url, json=payload, timeout=300)
-        response.raise_for_status()
-        end_time = time.time()
-        total_time = end_time - start_time
+        result = run_request(url, payload, timeout=300, keep_text=True)
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        total_time = result['time']
 
-        result = response.json()
-        generated_text = result['choices'][0]['text']
+        generated_text = result['text']
 
         # Token counts
-        prompt_tokens = result.get('usage', {}).get('prompt_tokens', 0)
-        completion_tokens = result.get('usage', {}).get('completion_tokens', 0)
-        total_tokens = result.get('usage', {}).get('total_tokens', 0)
+        prompt_tokens = result['prompt_tokens']
+        completion_tokens = result['tokens']
+        total_tokens = prompt_tokens + completion_tokens
 
         # Speed calculation
         tokens_per_second = completion_tokens / total_time if total_time > 0 else 0
@@ -131,8 +131,8 @@ New life begins this beautiful day.
         return None
 
 if __name__ == "__main__":
-    print("⏳ Waiting 60 seconds for SGLang to fully initialize...")
-    time.sleep(60)
+    if not wait_until_ready(8000)['ready']:
+        raise SystemExit(1)
 
     # Test with explicit prompt
     result = test_sglang_multilingual(max_tokens=3000)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Multi-process sharded load generator for high concurrency
+Virtual users are split across worker processes (one asyncio loop each, optionally pinned
+to a core). All workers open their connections, meet at a start barrier, run, and send
+back mergeable histograms and counters that the coordinator combines into one result,
+so generated load scales with client cores instead of one event loop.
+"""
+
+import asyncio
+import argparse
+import multiprocessing
+import os
+import queue
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bench_client import BenchClient, check_health, encode_payload
+from comprehensive_benchmark import get_gpu_memory_usage, save_results
+from gpu_sampler import GPUSampler
+from latency_histogram import (PERCENTILE_FIELDS, ReplayStats, correct_coordinated_omission, percentile_fields,
+                               print_percentiles)
+from load_generator import PROMPTS
+
+SHARDED_FIELDS = ['server', 'test_type', 'num_users', 'workers', 'successful_requests', 'failed_requests',
+                  'total_time', 'total_tokens', 'throughput_tok_s', 'requests_per_second', 'avg_response_time',
+                  'start_skew_ms', 'co_interval_ms', 'vram_initial_gb', 'vram_peak_gb', 'gpu_util_mean',
+                  'avg_ttft_ms', 'avg_tpot_ms', 'decode_tok_s', 'client_cpu_utilization',
+                  'client_cpu_ms_per_request'] + PERCENTILE_FIELDS
+
+def shard_users(num_users: int, workers: int) -> List[List[int]]:
+    """Split user ids 0..num_users-1 into `workers` nearly equal contiguous shards"""
+    base, extra = divmod(num_users, workers)
+    shards, start = [], 0
+    for w in range(workers):
+        size = base + (1 if w < extra else 0)
+        shards.append(list(range(start, start + size)))
+        start += size
+    return [s for s in shards if s]
+
+async def _run_shard(port: int, user_ids: List[int], duration: Optional[float], max_tokens: int,
+                     stream: bool, barrier) -> Dict:
+    url = f"http://localhost:{port}/v1/completions"
+    stats = ReplayStats()
+
+    async with BenchClient(pool_size=0) as client:
+        await client.prewarm(f"http://localhost:{port}/health", len(user_ids))
+
+        def payload_for(user_id: int, turn: int) -> Dict:
+            payload = {
+                "model": "Qwen/Qwen3-8B",
+                "prompt": PROMPTS[(user_id + turn) % len(PROMPTS)],
+                "max_tokens": max_tokens,
+                "temperature": 0.7,
+                "stream": stream
+            }
+            if stream:
+                payload["stream_options"] = {"include_usage": True}
+            return payload
+
+        async def virtual_user(user_id: int):
+            turn = 0
+            while True:
+                payload = payload_for(user_id, turn)
+                # A burst request is due at the barrier release; closed-loop requests have no schedule
+                stats.add(await client.request(url, payload, f"{user_id}-{turn}", encode_payload(payload),
+                                               released_at if duration is None else None))
+                turn += 1
+                # Burst mode (no duration): one request per user, like test_multiple_users
+                if duration is None or time.perf_counter() >= deadline:
+                    return
+
+        # Every worker is connected and ready; release them together
+        barrier.wait()
+        start_wall = time.time()
+        released_at = time.perf_counter()
+        deadline = released_at + (duration or 0)
+        await asyncio.gather(*(virtual_user(u) for u in user_ids))
+        end_wall = time.time()
+        client_stats = client.stats()
+
+    return {'stats': stats.to_dict(), 'start_wall': start_wall, 'end_wall': end_wall,
+            'client_stats': client_stats}
+
+def _worker(worker_index: int, core: Optional[int], port: int, user_ids: List[int],
+            duration: Optional[float], max_tokens: int, stream: bool, barrier, results):
+    if core is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {core})
+    try:
+        outcome = asyncio.run(_run_shard(port, user_ids, duration, max_tokens, stream, barrier))
+    except Exception as e:
+        outcome = {'error': f"{type(e).__name__}: {e}"}
+    outcome['worker'] = worker_index
+    results.put(outcome)
+
+def test_sharded(port: int, server_name: str, num_users: int, workers: Optional[int] = None,
+                 duration: Optional[float] = None, max_tokens: int = 200, stream: bool = False,
+                 pin: bool = True, gpu_backend: str = 'auto', gpu_interval: float = 0.1,
+                 start_timeout: float = 120) -> Dict:
+    """
+    Run `num_users` virtual users across `workers` processes (default: one per usable core)
+
+    duration=None sends one request per user (same workload as test_multiple_users);
+    otherwise each user loops closed-loop until `duration` seconds have passed.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    workers = max(1, min(workers or len(cores), num_users))
+    shards = shard_users(num_users, workers)
+
+    mode = f"{duration:g}s closed loop" if duration else "one request per user"
+    print(f"\n{'='*60}")
+    print(f"Testing {server_name} - {num_users} users over {len(shards)} processes ({mode})")
+    print(f"{'='*60}")
+
+    initial_gpu = get_gpu_memory_usage()
+    print(f"📊 Initial VRAM: {initial_gpu.get('memory_used_gb', 'N/A')} GB")
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(len(shards), timeout=start_timeout)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(i, cores[i % len(cores)] if pin else None, port, shard,
+                                              duration, max_tokens, stream, barrier, results))
+        for i, shard in enumerate(shards)
+    ]
+
+    sampler = GPUSampler(gpu_backend, gpu_interval).start()
+    for process in processes:
+        process.start()
+    print(f"🚀 Started {len(processes)} workers{' pinned to cores' if pin else ''}...")
+    outcomes = []
+    while len(outcomes) < len(processes):
+        try:
+            outcomes.append(results.get(timeout=1))
+        except queue.Empty:
+            # A worker that died without reporting (e.g. killed) must not hang the coordinator
+            if not any(p.is_alive() for p in processes) and results.empty():
+                break
+    for process in processes:
+        process.join()
+    sampler.stop()
+    gpu_stats = sampler.summary()
+
+    errors = [o for o in outcomes if 'error' in o]
+    for o in errors:
+        print(f"❌ Worker {o['worker']} failed: {o['error']}")
+    outcomes = [o for o in outcomes if 'error' not in o]
+    if not outcomes:
+        return None
+
+    stats = ReplayStats()
+    for o in outcomes:
+        stats.merge(ReplayStats.from_dict(o['stats']))
+    start_wall = min(o['start_wall'] for o in outcomes)
+    end_wall = max(o['end_wall'] for o in outcomes)
+    start_skew_ms = (max(o['start_wall'] for o in outcomes) - start_wall) * 1000
+    total_time = end_wall - start_wall
+    histograms = stats.histograms
+    # Closed-loop users stop sending while a response stalls; burst requests were timed from the release
+    co_interval_ms = correct_coordinated_omission(histograms) if duration else None
+    stream_stats = stats.stream_stats()
+
+    # CPU time is summed over workers; utilization is reported for the busiest worker's core
+    client_cpu_s = sum(o['client_stats']['client_cpu_s'] for o in outcomes)
+    requests_made = max(sum(o['client_stats']['client_requests'] for o in outcomes), 1)
+    busiest_worker = max(o['client_stats']['client_cpu_utilization'] for o in outcomes)
+
+    print(f"✅ Completed {stats.successful}/{stats.successful + stats.failed} requests in {total_time:.2f}s")
+    print(f"   Throughput: {stats.total_tokens / total_time if total_time > 0 else 0:.2f} tok/s")
+    print(f"   Start skew across workers: {start_skew_ms:.2f} ms")
+    print_percentiles(histograms)
+    if co_interval_ms:
+        print(f"   CO correction assumes one request per user every {co_interval_ms:.1f} ms (median latency)")
+    if stream_stats:
+        print(f"   Avg TTFT: {stream_stats['avg_ttft_ms']:.1f} ms")
+    print(f"   Client CPU: {client_cpu_s * 1000 / requests_made:.2f} ms/request, busiest worker at "
+          f"{busiest_worker * 100:.0f}% of its core")
+    if busiest_worker > 0.8:
+        print("   ⚠️ A worker is near CPU saturation - add workers or cores")
+    if stats.failed or errors:
+        print(f"   ⚠️ Failed requests: {stats.failed} {stats.errors}, failed workers: {len(errors)}")
+
+    return {
+        'server': server_name,
+        'test_type': f'sharded_{num_users}_users',
+        'num_users': num_users,
+        'workers': len(outcomes),
+        'successful_requests': stats.successful,
+        'failed_requests': stats.failed,
+        'total_time': total_time,
+        'total_tokens': stats.total_tokens,
+        'throughput_tok_s': stats.total_tokens / total_time if total_time > 0 else 0,
+        'requests_per_second': stats.successful / total_time if total_time > 0 else 0,
+        'avg_response_time': stats.total_time / stats.successful if stats.successful else 0,
+        'start_skew_ms': start_skew_ms,
+        'co_interval_ms': co_interval_ms or '',
+        'vram_initial_gb': initial_gpu.get('memory_used_gb', 0),
+        'vram_peak_gb': gpu_stats.get('vram_peak_gb', get_gpu_memory_usage().get('memory_used_gb', 0)),
+        'gpu_util_mean': gpu_stats.get('gpu_util_mean', 0),
+        'gpu_samples': sampler.samples,
+        'histograms': histograms,
+        'client_cpu_s': client_cpu_s,
+        'client_cpu_utilization': busiest_worker,
+        'client_cpu_ms_per_request': client_cpu_s * 1000 / requests_made,
+        **percentile_fields(histograms),
+        **stream_stats
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-process load generator")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server', default='vLLM')
+    parser.add_argument('--users', type=int, nargs='+', default=[100, 200, 400])
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per usable core)")
+    parser.add_argument('--duration', type=float,
+                        help="closed-loop seconds per test (default: one request per user)")
+    parser.add_argument('--max-tokens', type=int, default=200)
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--no-pin', action='store_true', help="do not pin workers to cores")
+    args = parser.parse_args()
+
+    if not check_health(f"http://localhost:{args.port}/health"):
+        print(f"❌ {args.server} is not healthy on port {args.port}")
+        raise SystemExit(1)
+
+    results = []
+    for num_users in args.users:
+        result = test_sharded(args.port, args.server, num_users, args.workers, args.duration,
+                              args.max_tokens, args.stream, not args.no_pin)
+        if result:
+            results.append(result)
+        time.sleep(5)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_results(results, f"sharded_load_{args.server.lower()}_{timestamp}", SHARDED_FIELDS, config=vars(args))
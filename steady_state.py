@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Warmup/cooldown exclusion and steady-state detection for throughput
+End-to-end throughput (total tokens / wall time) includes the ramp-up at the start of a
+test and the long-request tail at the end. This module rebuilds a tok/s time series
+from per-request records, trims a fixed warmup/cooldown, and detects the window where
+the rolling rate has reached its plateau.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from bench_stats import mean, median
+
+DEFAULT_BUCKETS = 40      # buckets across the measured window when no bucket size is given
+MIN_BUCKET_S = 0.05
+DEFAULT_WINDOW = 5        # buckets in the rolling mean
+DEFAULT_TOLERANCE = 0.15  # rolling rate within 15% of the plateau counts as steady
+
+def token_series(records: List[Dict], start: float, end: float, bucket_s: float) -> List[float]:
+    """
+    Tokens generated per time bucket between wall-clock `start` and `end`
+
+    Each successful record's tokens are spread evenly from its first token (sent_at +
+    ttft_ms) to its completion; non-streaming records have no TTFT and are spread over
+    the whole request.
+    """
+    n = max(1, int(round((end - start) / bucket_s)))
+    bucket_s = (end - start) / n
+    buckets = [0.0] * n
+    for r in records:
+        if not r.get('success') or 'sent_at' not in r or not r.get('tokens'):
+            continue
+        gen_start = r['sent_at'] + r.get('ttft_ms', 0) / 1000
+        gen_end = r['sent_at'] + r['time']
+        if gen_end <= gen_start:
+            if start <= gen_end < end:
+                buckets[min(n - 1, int((gen_end - start) / bucket_s))] += r['tokens']
+            continue
+        rate = r['tokens'] / (gen_end - gen_start)
+        first = max(0, int((gen_start - start) / bucket_s))
+        last = min(n - 1, int((gen_end - start) / bucket_s))
+        for i in range(first, last + 1):
+            overlap = min(gen_end, start + (i + 1) * bucket_s) - max(gen_start, start + i * bucket_s)
+            if overlap > 0:
+                buckets[i] += rate * overlap
+    return buckets
+
+def detect_steady_state(rates: List[float], window: int = DEFAULT_WINDOW,
+                        tolerance: float = DEFAULT_TOLERANCE) -> Optional[Tuple[int, int]]:
+    """
+    Bucket range [first, last) of the steady state, or None
+
+    The plateau level is the median of the centered rolling mean over the middle half of
+    the run; the steady window runs from the first to the last bucket whose rolling mean
+    reaches `1 - tolerance` of it, so ramp-up and tail are cut while brief dips in the
+    middle are kept. Windows shorter than `window` buckets do not count.
+    """
+    if len(rates) < window:
+        return None
+    half = window // 2
+    rolling = [mean(rates[max(0, i - half):i + half + 1]) for i in range(len(rates))]
+    quarter = len(rolling) // 4
+    level = median(rolling[quarter:len(rolling) - quarter])
+    if level <= 0:
+        return None
+    inside = [i for i, value in enumerate(rolling) if value >= (1 - tolerance) * level]
+    first, last = inside[0], inside[-1] + 1
+    if last - first < window:
+        return None
+    return first, last
+
+def steady_state_fields(records: List[Dict], start_wall: float, end_wall: float, warmup_s: float = 0,
+                        cooldown_s: float = 0, bucket_s: Optional[float] = None,
+                        window: int = DEFAULT_WINDOW, tolerance: float = DEFAULT_TOLERANCE) -> Dict:
+    """
+    Throughput after dropping `warmup_s`/`cooldown_s` from the run, plus the detected
+    steady-state throughput (steady_* fields are absent when no plateau is found)
+    """
+    measured_start = start_wall + warmup_s
+    measured_end = end_wall - cooldown_s
+    if measured_end <= measured_start:
+        return {}
+    measured_s = measured_end - measured_start
+    bucket_s = bucket_s or max(MIN_BUCKET_S, measured_s / DEFAULT_BUCKETS)
+    tokens = token_series(records, measured_start, measured_end, bucket_s)
+    bucket_s = measured_s / len(tokens)
+    rates = [t / bucket_s for t in tokens]
+
+    fields = {
+        'warmup_s': warmup_s,
+        'cooldown_s': cooldown_s,
+        'window_s': measured_s,
+        'window_throughput_tok_s': sum(tokens) / measured_s
+    }
+    steady = detect_steady_state(rates, window, tolerance)
+    if steady:
+        first, last = steady
+        fields.update({
+            'steady_throughput_tok_s': mean(rates[first:last]),
+            'steady_start_s': warmup_s + first * bucket_s,
+            'steady_duration_s': (last - first) * bucket_s,
+            'steady_fraction': (last - first) / len(rates)
+        })
+    return fields
+
+def print_steady_state(fields: Dict, raw_tok_s: float):
+    """Print steady-state throughput next to the end-to-end figure"""
+    if not fields:
+        return
+    if fields.get('warmup_s') or fields.get('cooldown_s'):
+        print(f"   Throughput excluding {fields['warmup_s']:g}s warmup / {fields['cooldown_s']:g}s cooldown: "
+              f"{fields['window_throughput_tok_s']:.2f} tok/s")
+    if 'steady_throughput_tok_s' not in fields:
+        print("   ⚠️ No steady-state window detected (run too short or never stable)")
+        return
+    steady = fields['steady_throughput_tok_s']
+    change = (steady / raw_tok_s - 1) * 100 if raw_tok_s > 0 else 0
+    print(f"   Steady-state throughput: {steady:.2f} tok/s vs {raw_tok_s:.2f} end-to-end ({change:+.0f}%), "
+          f"{fields['steady_duration_s']:.1f}s window from t={fields['steady_start_s']:.1f}s")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Per-request lifecycle timelines exported as Chrome Trace Event JSON
+Open the exported file in https://ui.perfetto.dev (or chrome://tracing) to see queueing,
+connection setup, time to first byte, token chunk arrivals and errors for every request.
+Collection is bounded: requests are sampled, kept in a ring buffer, and token chunk
+events per request are capped.
+"""
+
+import json
+import random
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+class TimelineRecorder:
+    """
+    Collects request timelines from BenchClient (pass it as BenchClient(timeline=...))
+
+    sample_rate: fraction of requests recorded
+    capacity:    ring buffer size; the oldest timelines are dropped beyond it
+    max_chunks:  token chunk events kept per request (evenly thinned beyond it)
+    """
+
+    def __init__(self, sample_rate: float = 1.0, capacity: int = 20000, max_chunks: int = 512,
+                 seed: int = 0):
+        self.sample_rate = sample_rate
+        self.capacity = capacity
+        self.max_chunks = max_chunks
+        self.rng = random.Random(seed)
+        self.timelines: deque = deque(maxlen=capacity)
+        self.origin = time.perf_counter()
+        self.seen = 0
+        self.recorded = 0
+
+    def sample(self) -> bool:
+        """Decide whether the next request is recorded"""
+        self.seen += 1
+        return self.sample_rate >= 1 or self.rng.random() < self.sample_rate
+
+    @property
+    def dropped(self) -> int:
+        return self.recorded - len(self.timelines)
+
+    def add(self, timeline: Dict):
+        """
+        Store one request timeline (perf_counter timestamps): enqueue, pool_wait_start/end,
+        connect_start/end, send, first_byte, chunks, end, plus request_id/tokens/error
+        """
+        chunks = timeline.get('chunks') or []
+        if len(chunks) > self.max_chunks:
+            step = len(chunks) / self.max_chunks
+            timeline['chunks'] = [chunks[int(i * step)] for i in range(self.max_chunks)]
+            timeline['chunks_thinned_from'] = len(chunks)
+        self.recorded += 1
+        self.timelines.append(timeline)
+
+    def _us(self, t: float) -> float:
+        return round((t - self.origin) * 1e6, 1)
+
+    def _lanes(self) -> List[tuple]:
+        """Greedy interval partitioning so concurrent requests get separate rows"""
+        lane_free_at: List[float] = []
+        lanes = []
+        for timeline in sorted(self.timelines, key=lambda t: t['enqueue']):
+            start = timeline['enqueue']
+            for lane, free_at in enumerate(lane_free_at):
+                if free_at <= start:
+                    lane_free_at[lane] = timeline['end']
+                    break
+            else:
+                lane = len(lane_free_at)
+                lane_free_at.append(timeline['end'])
+            lanes.append((timeline, lane))
+        return lanes
+
+    def to_chrome_trace(self, gpu_samples: Optional[List[Dict]] = None,
+                        server_samples: Optional[List[Dict]] = None) -> Dict:
+        """Build the trace: one row per concurrency lane, plus in-flight, GPU and /metrics counter tracks"""
+        events = [
+            {'ph': 'M', 'pid': 1, 'name': 'process_name', 'args': {'name': 'client requests'}},
+            {'ph': 'M', 'pid': 2, 'name': 'process_name', 'args': {'name': 'counters'}}
+        ]
+        edges = []
+
+        for timeline, lane in self._lanes():
+            tid = lane + 1
+            request_name = f"request {timeline.get('request_id')}"
+            args = {k: timeline[k] for k in ('request_id', 'tokens', 'prompt_tokens', 'error', 'error_type',
+                                             'chunks_thinned_from') if timeline.get(k) is not None}
+            events.append({'ph': 'X', 'pid': 1, 'tid': tid, 'name': request_name, 'cat': 'request',
+                           'ts': self._us(timeline['enqueue']),
+                           'dur': self._us(timeline['end']) - self._us(timeline['enqueue']), 'args': args})
+
+            phases = [
+                ('queued', timeline['enqueue'], timeline.get('send')),
+                ('pool wait', timeline.get('pool_wait_start'), timeline.get('pool_wait_end')),
+                ('connect', timeline.get('connect_start'), timeline.get('connect_end')),
+                ('waiting for first byte', timeline.get('send'), timeline.get('first_byte')),
+                ('receiving', timeline.get('first_byte'), timeline['end'])
+            ]
+            for name, start, end in phases:
+                if start is not None and end is not None and end > start:
+                    events.append({'ph': 'X', 'pid': 1, 'tid': tid, 'name': name, 'cat': 'phase',
+                                   'ts': self._us(start), 'dur': self._us(end) - self._us(start)})
+
+            for i, chunk_time in enumerate(timeline.get('chunks') or []):
+                events.append({'ph': 'i', 'pid': 1, 'tid': tid, 's': 't', 'cat': 'token',
+                               'name': 'first token' if i == 0 else 'token', 'ts': self._us(chunk_time)})
+            if timeline.get('error'):
+                events.append({'ph': 'i', 'pid': 1, 'tid': tid, 's': 't', 'cat': 'error', 'name': 'error',
+                               'ts': self._us(timeline['end']), 'args': {'error': timeline['error']}})
+
+            edges.append((timeline.get('send') or timeline['enqueue'], 1))
+            edges.append((timeline['end'], -1))
+
+        in_flight = 0
+        for t, delta in sorted(edges):
+            in_flight += delta
+            events.append({'ph': 'C', 'pid': 2, 'name': 'in-flight requests', 'ts': self._us(t),
+                           'args': {'requests': in_flight}})
+
+        # GPU and /metrics samples carry wall-clock timestamps; map them onto the perf_counter origin
+        wall_offset = time.time() - time.perf_counter()
+        for sample in gpu_samples or []:
+            ts = self._us(sample['timestamp'] - wall_offset)
+            events.append({'ph': 'C', 'pid': 2, 'name': 'GPU utilization %', 'ts': ts,
+                           'args': {'util': sample.get('gpu_utilization', 0)}})
+            events.append({'ph': 'C', 'pid': 2, 'name': 'VRAM used (GB)', 'ts': ts,
+                           'args': {'vram': round(sample.get('memory_used_mb', 0) / 1024, 2)}})
+        for sample in server_samples or []:
+            ts = self._us(sample['timestamp'] - wall_offset)
+            for name, value in sample.items():
+                # GPU columns merged in by align_samples are already drawn from gpu_samples
+                if name != 'timestamp' and not name.startswith('gpu_'):
+                    events.append({'ph': 'C', 'pid': 2, 'name': f"server {name}", 'ts': ts,
+                                   'args': {name: value}})
+
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'requests_seen': self.seen, 'requests_recorded': self.recorded,
+                          'requests_dropped': self.dropped, 'sample_rate': self.sample_rate}
+        }
+
+    def export(self, path: str, gpu_samples: Optional[List[Dict]] = None,
+               server_samples: Optional[List[Dict]] = None):
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(gpu_samples, server_samples), f)
+        print(f"🧭 Timeline ({len(self.timelines)} requests) saved to: {path}")
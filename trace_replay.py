@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Replay a production request trace against an endpoint
+The trace is JSONL (optionally .gz), one request per line:
+
+    {"timestamp": 12.5, "prompt": "...", "max_tokens": 256, "stream": true, "endpoint": "/v1/completions"}
+    {"timestamp": 12.9, "prompt_tokens": 1800, "max_tokens": 64, "endpoint": "/v1/chat/completions"}
+
+timestamp is in seconds (relative or epoch; offsets are taken from the first line).
+Lines are read lazily and results are folded into histograms as they complete, so
+memory stays bounded by the number of requests in flight, not the trace length.
+"""
+
+import asyncio
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+from bench_client import BenchClient, check_health, print_client_stats
+from comprehensive_benchmark import get_gpu_memory_usage, save_results
+from gpu_sampler import GPUSampler
+from latency_histogram import PERCENTILE_FIELDS, ReplayStats, percentile_fields, print_percentiles
+from load_generator import timed_request
+from prompt_synth import filler
+
+REPLAY_FIELDS = ['server', 'test_type', 'trace', 'speed', 'trace_requests', 'trace_duration_s',
+                 'offered_rate_rps', 'successful_requests', 'failed_requests', 'total_time', 'total_tokens',
+                 'prompt_tokens', 'throughput_tok_s', 'requests_per_second', 'avg_response_time',
+                 'avg_queue_delay_ms', 'p99_queue_delay_ms', 'max_in_flight_observed', 'vram_initial_gb',
+                 'vram_peak_gb', 'gpu_util_mean', 'avg_ttft_ms', 'avg_tpot_ms', 'decode_tok_s',
+                 'client_cpu_ms_per_request', 'client_cpu_utilization'] + PERCENTILE_FIELDS
+
+def read_trace(path: str, limit: Optional[int] = None) -> Iterator[Dict]:
+    """Yield trace entries one line at a time (blank lines and '#' comments are skipped)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    count = 0
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if limit is not None and count >= limit:
+                return
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Skipping malformed trace line {line_number}: {e}")
+                continue
+            if 'timestamp' not in entry:
+                print(f"⚠️ Skipping trace line {line_number}: no timestamp")
+                continue
+            count += 1
+            yield entry
+
+def trace_payload(entry: Dict, index: int, model: str = "Qwen/Qwen3-8B") -> Dict:
+    """Build the request body for one trace entry; prompt_tokens-only entries get filler text"""
+    prompt = entry.get('prompt')
+    if prompt is None:
+        prompt = filler(random.Random(index), int(entry.get('prompt_tokens', 32)), 'rag')
+
+    stream = bool(entry.get('stream', False))
+    payload = {
+        "model": entry.get('model', model),
+        "max_tokens": int(entry.get('max_tokens', 200)),
+        "temperature": entry.get('temperature', 0.7),
+        "stream": stream
+    }
+    if entry.get('endpoint', '/v1/completions').endswith('/chat/completions'):
+        payload["messages"] = [{"role": "user", "content": prompt}]
+    else:
+        payload["prompt"] = prompt
+    if stream:
+        payload["stream_options"] = {"include_usage": True}
+    return payload
+
+async def replay_trace(port: int, server_name: str, path: str, speed: float = 1.0,
+                       limit: Optional[int] = None, max_in_flight: Optional[int] = None,
+                       drain_timeout: float = 120, model: str = "Qwen/Qwen3-8B",
+                       gpu_backend: str = 'auto', gpu_interval: float = 0.1) -> Dict:
+    """
+    Send every trace entry at its (time-scaled) arrival time and wait for the stragglers
+
+    speed=2 replays twice as fast. max_in_flight optionally caps outstanding requests;
+    arrivals beyond it wait (and the wait shows up as queueing delay).
+    """
+    base_url = f"http://localhost:{port}"
+
+    print(f"\n{'='*60}")
+    print(f"Testing {server_name} - TRACE REPLAY {path} ({speed:g}x)")
+    print(f"{'='*60}")
+
+    initial_gpu = get_gpu_memory_usage()
+    print(f"📊 Initial VRAM: {initial_gpu.get('memory_used_gb', 'N/A')} GB")
+
+    stats = ReplayStats()
+    pending = set()
+    sent = 0
+    max_in_flight_observed = 0
+    first_timestamp = last_timestamp = None
+
+    def on_done(task: asyncio.Task):
+        pending.discard(task)
+        if not task.cancelled():
+            stats.add(task.result())
+
+    sampler = GPUSampler(gpu_backend, gpu_interval).start()
+    async with BenchClient(pool_size=0) as client:
+        print("🚀 Replaying trace...")
+        start_time = time.perf_counter()
+
+        for i, entry in enumerate(read_trace(path, limit)):
+            timestamp = float(entry['timestamp'])
+            if first_timestamp is None:
+                first_timestamp = timestamp
+            last_timestamp = timestamp
+            intended_time = start_time + (timestamp - first_timestamp) / speed
+            delay = intended_time - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            while max_in_flight and len(pending) >= max_in_flight:
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            url = base_url + entry.get('endpoint', '/v1/completions')
+            task = asyncio.create_task(timed_request(client, url, trace_payload(entry, i, model), i,
+                                                     intended_time))
+            task.add_done_callback(on_done)
+            pending.add(task)
+            sent += 1
+            max_in_flight_observed = max(max_in_flight_observed, len(pending))
+            if sent % 1000 == 0:
+                print(f"   {sent} sent, {stats.successful + stats.failed} done, {len(pending)} in flight")
+
+        send_end_time = time.perf_counter()
+        timed_out = 0
+        if pending:
+            _, still_pending = await asyncio.wait(set(pending), timeout=drain_timeout)
+            timed_out = len(still_pending)
+            for task in still_pending:
+                task.cancel()
+        end_time = time.perf_counter()
+        client_stats = client.stats()
+
+    sampler.stop()
+    gpu_stats = sampler.summary()
+
+    total_time = end_time - start_time
+    trace_duration = (last_timestamp - first_timestamp) if sent else 0
+    send_duration = send_end_time - start_time
+    histograms = stats.histograms
+    stream_stats = stats.stream_stats()
+
+    print(f"✅ Completed {stats.successful}/{sent} requests in {total_time:.2f}s "
+          f"({timed_out} still pending after drain)")
+    print(f"   Trace span: {trace_duration:.1f}s, replayed in {send_duration:.1f}s")
+    print(f"   Throughput: {stats.total_tokens / total_time if total_time > 0 else 0:.2f} tok/s")
+    print_percentiles(histograms)
+    print(f"   Queueing delay p50/p99: {stats.queue_delay.percentile(50):.1f} ms / "
+          f"{stats.queue_delay.percentile(99):.1f} ms")
+    if stream_stats:
+        print(f"   Avg TTFT: {stream_stats['avg_ttft_ms']:.1f} ms")
+    print_client_stats(client_stats)
+    if stats.failed or timed_out:
+        print(f"   ⚠️ Failed requests: {stats.failed} {stats.errors}, timed out in drain: {timed_out}")
+
+    return {
+        'server': server_name,
+        'test_type': 'trace_replay',
+        'trace': path,
+        'speed': speed,
+        'trace_requests': sent,
+        'trace_duration_s': trace_duration,
+        'offered_rate_rps': sent / send_duration if send_duration > 0 else 0,
+        'successful_requests': stats.successful,
+        'failed_requests': stats.failed + timed_out,
+        'errors': stats.errors,
+        'total_time': total_time,
+        'total_tokens': stats.total_tokens,
+        'prompt_tokens': stats.prompt_tokens,
+        'throughput_tok_s': stats.total_tokens / total_time if total_time > 0 else 0,
+        'requests_per_second': stats.successful / total_time if total_time > 0 else 0,
+        'avg_response_time': stats.total_time / stats.successful if stats.successful else 0,
+        'avg_queue_delay_ms': stats.queue_delay.mean(),
+        'p99_queue_delay_ms': stats.queue_delay.percentile(99),
+        'max_in_flight_observed': max_in_flight_observed,
+        'vram_initial_gb': initial_gpu.get('memory_used_gb', 0),
+        'vram_peak_gb': gpu_stats.get('vram_peak_gb', get_gpu_memory_usage().get('memory_used_gb', 0)),
+        'gpu_util_mean': gpu_stats.get('gpu_util_mean', 0),
+        'gpu_samples': sampler.samples,
+        'histograms': histograms,
+        **percentile_fields(histograms),
+        **stream_stats,
+        **client_stats
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a JSONL request trace against an endpoint")
+    parser.add_argument('--trace', required=True, help="JSONL trace (.jsonl or .jsonl.gz)")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server', default='vLLM')
+    parser.add_argument('--speed', type=float, default=1.0, help="time scaling, e.g. 2 = twice as fast")
+    parser.add_argument('--limit', type=int, help="replay only the first N requests")
+    parser.add_argument('--max-in-flight', type=int, help="cap on outstanding requests")
+    parser.add_argument('--drain-timeout', type=float, default=120)
+    parser.add_argument('--model', default="Qwen/Qwen3-8B", help="model for entries without one")
+    args = parser.parse_args()
+
+    if not check_health(f"http://localhost:{args.port}/health"):
+        print(f"❌ {args.server} is not healthy on port {args.port}")
+        raise SystemExit(1)
+
+    result = asyncio.run(replay_trace(args.port, args.server, args.trace, args.speed, args.limit,
+                                      args.max_in_flight, args.drain_timeout, args.model))
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_results([result], f"trace_replay_{args.server.lower()}_{timestamp}", REPLAY_FIELDS, config=vars(args))
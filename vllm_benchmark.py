@@ -3,16 +3,19 @@
 vLLM Benchmark with VRAM monitoring
 """
 
-import requests
 import time
 import asyncio
-import aiohttp
+import argparse
 import subprocess
 import json
 import csv
 from datetime import datetime
 from typing import Dict, List
 
+from bench_client import BenchClient, encode_payload, print_client_stats, run_request
+from readiness import wait_until_ready
+from results_store import store_results
+
 def get_gpu_memory_usage() -> Dict:
     """Get current GPU memory usage using nvidia-smi"""
     try:
@@ -60,20 +63,18 @@ def test_single_user(port: int = 8000, max_tokens: int = 500) -> Dict:
     print(f"📊 Initial VRAM: {initial_gpu.get('memory_used_gb', 'N/A')} GB / {initial_gpu.get('memory_total_gb', 'N/A')} GB")
 
     try:
-        start_time = time.time()
-        response = requests.post(url, json=payload, timeout=120)
-        response.raise_for_status()
-        end_time = time.time()
+        result = run_request(url, payload, timeout=120)
+        if not result['success']:
+            raise RuntimeError(result['error'])
 
         # Get GPU memory during inference
         inference_gpu = get_gpu_memory_usage()
 
-        result = response.json()
-        total_time = end_time - start_time
+        total_time = result['time']
 
         # Extract metrics
-        completion_tokens = result.get('usage', {}).get('completion_tokens', 0)
-        prompt_tokens = result.get('usage', {}).get('prompt_tokens', 0)
+        completion_tokens = result['tokens']
+        prompt_tokens = result['prompt_tokens']
         tokens_per_second = completion_tokens / total_time if total_time > 0 else 0
 
         print(f"✅ Request completed")
@@ -98,26 +99,9 @@ def test_single_user(port: int = 8000, max_tokens: int = 500) -> Dict:
         print(f"❌ Error: {e}")
         return None
 
-async def concurrent_request(session, url, payload, request_id):
+async def concurrent_request(client: BenchClient, url, payload, request_id, body: bytes = None):
     """Make a single async request"""
-    try:
-        start_time = time.time()
-        async with session.post(url, json=payload) as response:
-            result = await response.json()
-            end_time = time.time()
-
-            return {
-                'request_id': request_id,
-                'success': True,
-                'time': end_time - start_time,
-                'tokens': result.get('usage', {}).get('completion_tokens', 0)
-            }
-    except Exception as e:
-        return {
-            'request_id': request_id,
-            'success': False,
-            'error': str(e)
-        }
+    return await client.request(url, payload, request_id, body)
 
 async def test_multiple_users(num_users: int = 10, port: int = 8000, max_tokens: int = 200) -> Dict:
     """Test multiple concurrent users with VRAM monitoring"""
@@ -144,8 +128,10 @@ async def test_multiple_users(num_users: int = 10, port: int = 8000, max_tokens:
     initial_gpu = get_gpu_memory_usage()
     print(f"📊 Initial VRAM: {initial_gpu.get('memory_used_gb', 'N/A')} GB")
 
-    # Create tasks
-    async with aiohttp.ClientSession() as session:
+    # Create tasks on one pooled keep-alive client (no 100-connection cap)
+    async with BenchClient(pool_size=0) as client:
+        await client.prewarm(f"http://localhost:{port}/health", num_users)
+
         tasks = []
         for i in range(num_users):
             payload = {
@@ -155,11 +141,11 @@ async def test_multiple_users(num_users: int = 10, port: int = 8000, max_tokens:
                 "temperature": 0.7,
                 "stream": False
             }
-            tasks.append(concurrent_request(session, url, payload, i))
+            tasks.append(concurrent_request(client, url, payload, i, encode_payload(payload)))
 
         # Start all requests
         print(f"🚀 Sending {num_users} concurrent requests...")
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         # Execute all requests
         results = await asyncio.gather(*tasks)
@@ -167,8 +153,9 @@ async def test_multiple_users(num_users: int = 10, port: int = 8000, max_tokens:
         # Get peak GPU memory
         peak_gpu = get_gpu_memory_usage()
 
-        end_time = time.time()
+        end_time = time.perf_counter()
         total_time = end_time - start_time
+        client_stats = client.stats()
 
     # Analyze results
     successful = [r for r in results if r.get('success', False)]
@@ -186,6 +173,7 @@ async def test_multiple_users(num_users: int = 10, port: int = 8000, max_tokens:
         print(f"   Avg response time: {avg_response_time:.2f}s")
         print(f"   Peak VRAM: {peak_gpu.get('memory_used_gb', 'N/A')} GB")
         print(f"   VRAM increase: {peak_gpu.get('memory_used_gb', 0) - initial_gpu.get('memory_used_gb', 0):.2f} GB")
+        print_client_stats(client_stats)
 
         if failed:
             print(f"   ⚠️ Failed requests: {len(failed)}")
@@ -201,15 +189,21 @@ async def test_multiple_users(num_users: int = 10, port: int = 8000, max_tokens:
             'avg_response_time': avg_response_time,
             'vram_initial_gb': initial_gpu.get('memory_used_gb', 0),
             'vram_peak_gb': peak_gpu.get('memory_used_gb', 0),
-            'vram_increase_gb': peak_gpu.get('memory_used_gb', 0) - initial_gpu.get('memory_used_gb', 0)
+            'vram_increase_gb': peak_gpu.get('memory_used_gb', 0) - initial_gpu.get('memory_used_gb', 0),
+            **client_stats
         }
     else:
         print(f"❌ All requests failed")
         return None
 
 if __name__ == "__main__":
-    print("⏳ Waiting 60 seconds for vLLM to initialize...")
-    time.sleep(60)
+    parser = argparse.ArgumentParser(description="vLLM benchmark with VRAM monitoring")
+    parser.add_argument('--users', type=int, nargs='+', default=[5, 10, 20, 50],
+                        help="concurrent user counts to test (see concurrency_sweep.py for SLO search)")
+    args = parser.parse_args()
+
+    if not wait_until_ready(8000)['ready']:
+        raise SystemExit(1)
 
     results = []
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -226,7 +220,7 @@ if __name__ == "__main__":
     time.sleep(5)
 
     # Multiple users tests
-    for num_users in [5, 10, 20, 50]:
+    for num_users in args.users:
         print(f"\n{num_users}️⃣ Testing {num_users} Concurrent Users")
         multi_result = asyncio.run(test_multiple_users(num_users, max_tokens=200))
         if multi_result:
@@ -255,6 +249,7 @@ if __name__ == "__main__":
                 writer.writerow(row)
 
         print(f"\n💾 Results saved to: {csv_path}")
+        store_results(results, "vllm_benchmark", vars(args))
 
         # Print summary
         print(f"\n{'='*60}")